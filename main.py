@@ -1,8 +1,30 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import messages, database, verification, services, auth, specialties, ichi
+from fastapi.responses import JSONResponse
+from routers import messages, database, verification, services, auth, specialties, ichi, metrics
+from utils.http_client import close_http_client
+from utils.readiness import WARMUP_ON_STARTUP, get_readiness, warm_up
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warmup runs in the background: "/" answers right away and "/ready"
+    # returns 503 until the model, catalog and pools are loaded.
+    warmup = asyncio.create_task(warm_up()) if WARMUP_ON_STARTUP else None
+    try:
+        yield
+    finally:
+        if warmup is not None and not warmup.done():
+            warmup.cancel()
+            with suppress(asyncio.CancelledError):
+                await warmup
+        await close_http_client()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,7 +41,15 @@ app.include_router(services.router,      prefix="/services",     tags=["services
 app.include_router(auth.router,          prefix="/auth",         tags=["auth"])
 app.include_router(specialties.router,   prefix="/specialties",  tags=["specialties"])
 app.include_router(ichi.router,          prefix="/ichi",         tags=["ICHI"])
+app.include_router(metrics.router,       prefix="/metrics",      tags=["metrics"])
 
 @app.get("/")
 async def root():
-    return {"message": "App is alive"}
\ No newline at end of file
+    return {"message": "App is alive"}
+
+
+@app.get("/ready")
+async def ready():
+    """Warmup state per component; 503 until the instance is ready."""
+    readiness = get_readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
+import base64
 from bson import ObjectId
 from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel
 from utils.db_tools import db  # reutilizar conexion existente
+from utils.partner_cards import invalidate_partner_cards, prerender_partner_cards
+from utils.partner_catalog import refresh_partner_catalog
+from utils.service_backfill import run_service_backfill
+from utils.service_ids import sync_partner_service_ids
 
 router = APIRouter()
 
@@ -22,6 +27,8 @@ def serialize(value):
         return str(value)
     if isinstance(value, datetime):
         return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
     if isinstance(value, dict):
         return {k: serialize(v) for k, v in value.items()}
     if isinstance(value, list):
@@ -82,6 +89,8 @@ def get_document(collection: str, id: str):
 def bulk_update_status(body: BulkStatusUpdate):
     """Activa o desactiva TODOS los socios de una sola vez."""
     result = db["partners"].update_many({}, {"$set": {"is_active": body.is_active}})
+    # El catálogo en memoria usado para las referencias se recarga de inmediato
+    refresh_partner_catalog("bulk_update_status")
     return {
         "is_active": body.is_active,
         "matched_count": result.matched_count,
@@ -90,7 +99,7 @@ def bulk_update_status(body: BulkStatusUpdate):
 
 
 @router.patch("/partners/{id}")
-def update_partner(id: str, body: PartnerUpdate):
+def update_partner(id: str, body: PartnerUpdate, background_tasks: BackgroundTasks):
     """Edita partner_name, partner_category, partner_services, partner_whatsapp e is_active."""
     try:
         oid = ObjectId(id)
@@ -106,7 +115,23 @@ def update_partner(id: str, body: PartnerUpdate):
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Socio no encontrado")
 
+    # Ids enteros de los servicios, alineados con partner_services
+    if "partner_services" in fields:
+        sync_partner_service_ids([oid])
+
     updated = db["partners"].find_one({"_id": oid})
+    refresh_partner_catalog("update_partner")
+
+    # Las tarjetas localizadas del socio quedan obsoletas: se descartan y se
+    # vuelven a generar en segundo plano para la próxima referencia.
+    invalidate_partner_cards(oid)
+    background_tasks.add_task(prerender_partner_cards, updated)
+
+    # Servicios nuevos sin embedding puntuarían 0 en el ranking: se calculan
+    # en segundo plano y se insertan en `services`.
+    if "partner_services" in fields:
+        background_tasks.add_task(run_service_backfill, "update_partner")
+
     return serialize(updated)
 
 
@@ -3,6 +3,7 @@ from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timezone
 from utils.db_tools import db
+from utils.code_index import refresh_code_index
 import openpyxl
 import io
 
@@ -123,6 +124,8 @@ def save_ichi(partner_id: str, body: ICHIPayload):
         }},
         upsert=True,
     )
+    # Índice código -> partners usado por el ranking de referencias
+    refresh_code_index("save_ichi")
     return {"ok": True, "saved": len(body.ichi_classes)}
 
 
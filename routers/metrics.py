@@ -0,0 +1,45 @@
+from fastapi import APIRouter
+from utils.code_index import get_code_index
+from utils.embedding_cache import get_embedding_cache_stats
+from utils.embedding_service import get_embedding_service
+from utils.geocode_cache import get_geocode_cache_stats
+from utils.partner_catalog import get_partner_catalog
+from utils.ranking_cache import get_ranking_cache
+
+router = APIRouter()
+
+
+@router.get("/geocode-cache")
+def geocode_cache_metrics():
+    """Hits/misses del caché de geocodificación (LRU en proceso + colección geocode_cache)."""
+    return get_geocode_cache_stats()
+
+
+@router.get("/partner-catalog")
+def partner_catalog_metrics():
+    """Tamaño, versión y modo de actualización del catálogo de socios en memoria."""
+    return get_partner_catalog().stats()
+
+
+@router.get("/embedding-cache")
+def embedding_cache_metrics():
+    """Hits/misses del caché de embeddings de fragmentos de síntomas."""
+    return get_embedding_cache_stats()
+
+
+@router.get("/embeddings")
+def embedding_service_metrics():
+    """Tiempo en cola, tiempo de inferencia y tamaño de lote del servicio de embeddings."""
+    return get_embedding_service().stats()
+
+
+@router.get("/ranking-cache")
+def ranking_cache_metrics():
+    """Aciertos del caché de resultados de ranking (síntomas + celda geohash)."""
+    return get_ranking_cache().stats()
+
+
+@router.get("/code-index")
+def code_index_metrics():
+    """Tamaño y versión del índice invertido de códigos CIE-11/ICHI -> socios."""
+    return get_code_index().stats()
@@ -19,4 +19,56 @@ async def get_services():
 
         return {"services": services}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/embeddings/status")
+async def get_embeddings_status():
+    """
+    Estado del almacén de embeddings de servicios en memoria:
+    cantidad de servicios, versión (hash del contenido) y tiempo de carga.
+    """
+    from utils.embedding_store import get_service_embedding_store
+
+    return get_service_embedding_store().stats()
+
+
+@router.post("/embeddings/reload")
+async def reload_embeddings():
+    """
+    Fuerza la recarga de los embeddings desde la colección `services` (con el
+    sidecar, primero le pide releer Mongo y publicar la matriz nueva).
+    La carga corre en un hilo y la matriz nueva reemplaza a la anterior de forma
+    atómica, así que las referencias en curso no se bloquean.
+    """
+    import asyncio
+    from utils.embedding_store import get_service_embedding_store, reload_service_embeddings
+
+    try:
+        await asyncio.to_thread(reload_service_embeddings, "admin")
+        return get_service_embedding_store().stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/embeddings/backfill")
+async def backfill_embeddings():
+    """
+    Calcula los embeddings de los nombres en `partner_services` que aún no
+    están en `services` (en lotes, con el modelo configurado), los inserta con
+    bulk_write y recarga el almacén. Devuelve cuántos se calcularon y el tiempo.
+    """
+    import asyncio
+    from utils.service_backfill import get_service_backfill
+
+    try:
+        return await asyncio.to_thread(get_service_backfill().run, "admin")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/embeddings/backfill")
+async def get_backfill_status():
+    """Resultado de la última ejecución del backfill de embeddings."""
+    from utils.service_backfill import get_service_backfill
+
+    return get_service_backfill().stats()
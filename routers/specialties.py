@@ -3,6 +3,7 @@ from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timezone
 from utils.db_tools import db
+from utils.code_index import refresh_code_index
 import httpx
 import os
 import time
@@ -252,4 +253,6 @@ def save_specialties(partner_id: str, body: SpecialtiesPayload):
         }},
         upsert=True,
     )
+    # Índice código -> partners usado por el ranking de referencias
+    refresh_code_index("save_specialties")
     return {"ok": True, "saved": len(body.cie)}
\ No newline at end of file
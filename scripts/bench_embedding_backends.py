@@ -0,0 +1,104 @@
+"""
+Latency, RSS and startup time of the torch and int8 ONNX embedding backends.
+
+Each backend runs in its own interpreter so imports and resident memory are
+measured in isolation:
+
+    python -m scripts.bench_embedding_backends
+    python -m scripts.bench_embedding_backends --backends onnx --repeat 200
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+QUERIES = [
+    "dolor de muelas",
+    "fiebre alta y tos desde hace tres días",
+    "fractura",
+    "mi hijo se cayó y tiene el brazo hinchado, le duele mucho",
+    "sangrado de encías al cepillarse",
+    "dolor de cabeza",
+    "control prenatal",
+    "toothache",
+]
+
+
+def _rss_mb() -> float:
+    """Resident set size of this process (Linux /proc)."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def worker(backend: str, repeat: int, onnx_dir: str | None) -> dict:
+    rss_start = _rss_mb()
+    start = time.perf_counter()
+    if backend == "onnx":
+        from utils.onnx_encoder import DEFAULT_ONNX_DIR, OnnxSentenceEncoder
+        model = OnnxSentenceEncoder(onnx_dir or DEFAULT_ONNX_DIR)
+    else:
+        from sentence_transformers import SentenceTransformer
+        from scripts.export_onnx_encoder import MODEL_NAME
+        model = SentenceTransformer(MODEL_NAME, device="cpu")
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model.encode([QUERIES[0]], convert_to_numpy=True)
+    first_ms = (time.perf_counter() - start) * 1000
+
+    single, batch = [], []
+    for i in range(repeat):
+        start = time.perf_counter()
+        model.encode([QUERIES[i % len(QUERIES)]], convert_to_numpy=True)
+        single.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        model.encode(QUERIES, convert_to_numpy=True)
+        batch.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "backend": backend,
+        "startup_s": round(load_s, 2),
+        "first_encode_ms": round(first_ms, 1),
+        "single_ms_p50": round(_percentile(single, 50), 2),
+        "single_ms_p95": round(_percentile(single, 95), 2),
+        f"batch{len(QUERIES)}_ms_p50": round(_percentile(batch, 50), 2),
+        "rss_mb": round(_rss_mb(), 1),
+        "rss_model_mb": round(_rss_mb() - rss_start, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"], choices=["torch", "onnx"])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--onnx-dir", default=None)
+    parser.add_argument("--worker", choices=["torch", "onnx"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.worker, args.repeat, args.onnx_dir)))
+        return
+
+    for backend in args.backends:
+        cmd = [sys.executable, "-m", "scripts.bench_embedding_backends", "--worker", backend, "--repeat", str(args.repeat)]
+        if args.onnx_dir:
+            cmd += ["--onnx-dir", args.onnx_dir]
+        result = subprocess.run(cmd, capture_output=True, text=True, cwd=os.getcwd())
+        if result.returncode != 0:
+            print({"backend": backend, "error": result.stderr.strip().splitlines()[-1:]})
+            continue
+        print(json.loads(result.stdout.strip().splitlines()[-1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Benchmark and parity check for utils.ranking.RankingEngine.
+
+Builds a synthetic catalog (services with random embeddings, partners with a
+few services and locations around Guatemala) and compares the vectorized
+engine against the original per-partner Python loop.
+
+    python -m scripts.bench_ranking
+    python -m scripts.bench_ranking --sizes 100 10000 100000 --queries 20
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from utils.embedding_store import ServiceEmbeddings
+from utils.ranking import (
+    DISTANCE_SIGMA_KM,
+    EMERGENCY_KEYWORDS,
+    EMERGENCY_SERVICE_BOOST_FACTOR,
+    SIMILARITY_SIGMA,
+    RankingEngine,
+)
+
+EMBEDDING_DIM = 384
+TOP_K = 2
+
+# Bounding box roughly covering Guatemala
+LAT_RANGE = (13.8, 17.8)
+LON_RANGE = (-92.2, -88.3)
+
+
+# ---------------------------------------------------------------------------
+# Reference implementation (the loop RankingEngine replaced)
+# ---------------------------------------------------------------------------
+
+def _cosine_similarity(a, b):
+    denom = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(np.dot(a, b) / denom) if denom != 0 else 0.0
+
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    r = 6371.0
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dlon / 2) ** 2
+    return r * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def legacy_rank(partners, service_embedding_map, query_emb, is_emergency, lat, lon, max_distance_km):
+    ranked = []
+    for partner in partners:
+        service_scores = []
+        for svc_name in (str(s).strip().lower() for s in partner.get("partner_services", [])):
+            emb = service_embedding_map.get(svc_name)
+            if emb is None:
+                continue
+            raw_sim = _cosine_similarity(query_emb, emb)
+            sim_score = math.exp(-0.5 * ((raw_sim - 1.0) / SIMILARITY_SIGMA) ** 2)
+            if svc_name in EMERGENCY_KEYWORDS and is_emergency:
+                sim_score *= EMERGENCY_SERVICE_BOOST_FACTOR
+            service_scores.append(sim_score)
+        service_score = max(service_scores) if service_scores else 0.0
+
+        best_combined, best_distance = -1.0, None
+        for geo in partner.get("partner_geo_locations", []):
+            distance_km = _haversine_km(lat, lon, geo["lat"], geo["lon"]) if lat and lon else None
+            distance_score = (
+                math.exp(-0.5 * (distance_km / DISTANCE_SIGMA_KM) ** 2)
+                if distance_km is not None else 0.0
+            )
+            combined = service_score * distance_score
+            if combined > best_combined:
+                best_combined, best_distance = combined, distance_km
+        if best_combined < 0:
+            best_combined = service_score
+
+        ranked.append({"_id": partner["_id"], "final_score": best_combined, "distance_km": best_distance})
+
+    ranked.sort(key=lambda x: x["final_score"], reverse=True)
+    if max_distance_km is not None:
+        ranked = [p for p in ranked if p["distance_km"] is not None and p["distance_km"] <= max_distance_km]
+    return ranked[:TOP_K]
+
+
+# ---------------------------------------------------------------------------
+# Synthetic catalog
+# ---------------------------------------------------------------------------
+
+def build_catalog(n_partners, n_services, rng):
+    names = [f"servicio {i}" for i in range(n_services - len(EMERGENCY_KEYWORDS))] + list(EMERGENCY_KEYWORDS)
+    service_embedding_map = {
+        name: rng.standard_normal(EMBEDDING_DIM).astype(np.float32) for name in names
+    }
+
+    partners = []
+    for i in range(n_partners):
+        services = rng.choice(len(names), size=rng.integers(1, 9), replace=True)
+        locations = [
+            {
+                "lat": float(rng.uniform(*LAT_RANGE)),
+                "lon": float(rng.uniform(*LON_RANGE)),
+                "address": f"Dirección {i}-{j}",
+            }
+            for j in range(rng.integers(0, 4))
+        ]
+        partners.append({
+            "_id": i,
+            "partner_name": f"Socio {i}",
+            "partner_services": [names[s].upper() for s in services],
+            "partner_geo_locations": locations,
+            "is_active": True,
+        })
+    return partners, service_embedding_map
+
+
+def _timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def run(size, n_services, n_queries, legacy_limit, rng, top_n=0):
+    partners, service_embedding_map = build_catalog(size, n_services, rng)
+
+    start = time.perf_counter()
+    engine = RankingEngine(partners, ServiceEmbeddings.from_map(service_embedding_map))
+    build_ms = (time.perf_counter() - start) * 1000
+
+    engine_ms, legacy_ms, mismatches = [], [], 0
+    for q in range(n_queries):
+        query_emb = rng.standard_normal(EMBEDDING_DIM).astype(np.float32)
+        is_emergency = bool(q % 3 == 0)
+        lat, lon = float(rng.uniform(*LAT_RANGE)), float(rng.uniform(*LON_RANGE))
+        radius = (30, 60, None)[q % 3]
+
+        got, ms = _timed(lambda: engine.rank(query_emb, is_emergency, lat, lon, radius, TOP_K, top_n=top_n), 3)
+        engine_ms.append(ms)
+
+        if size <= legacy_limit:
+            expected, ms = _timed(lambda: legacy_rank(
+                partners, service_embedding_map, query_emb, is_emergency, lat, lon, radius,
+            ), 1)
+            legacy_ms.append(ms)
+            same_ids = [p["_id"] for p in got] == [p["_id"] for p in expected]
+            same_scores = np.allclose(
+                [p["final_score"] for p in got], [p["final_score"] for p in expected], rtol=1e-5, atol=1e-7,
+            )
+            if not (same_ids and same_scores):
+                mismatches += 1
+
+    row = {
+        "partners": size,
+        "build_ms": round(build_ms, 1),
+        "engine_ms_p50": round(float(np.median(engine_ms)), 3),
+        "legacy_ms_p50": round(float(np.median(legacy_ms)), 3) if legacy_ms else None,
+        "speedup": round(float(np.median(legacy_ms) / np.median(engine_ms)), 1) if legacy_ms else None,
+        "parity_mismatches": mismatches if legacy_ms else None,
+    }
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--services", type=int, default=1_500)
+    parser.add_argument("--queries", type=int, default=12)
+    parser.add_argument("--legacy-limit", type=int, default=100_000,
+                        help="skip the slow reference loop above this catalog size")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--top-n", type=int, default=0,
+                        help="two-stage retrieval: services considered per query (0 = exhaustive, exact parity)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    failed = False
+    for size in args.sizes:
+        row = run(size, args.services, args.queries, args.legacy_limit, rng, args.top_n)
+        print(row)
+        failed |= bool(row["parity_mismatches"])
+
+    if failed and not args.top_n:
+        raise SystemExit("RankingEngine results differ from the reference loop")
+
+
+if __name__ == "__main__":
+    main()
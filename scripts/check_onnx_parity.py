@@ -0,0 +1,108 @@
+"""
+Parity check between the torch and the int8 ONNX embedding backends.
+
+Encodes every service name of the `services` collection plus a set of common
+symptom queries with both backends and compares:
+  - per-text cosine between the torch and the ONNX vector
+  - for each query, the cosine ranking of the services (stored embeddings):
+    top-K overlap and the largest score difference
+
+Exits non-zero when a tolerance is violated.
+
+    python -m scripts.check_onnx_parity
+    python -m scripts.check_onnx_parity --top-k 10 --min-vector-cosine 0.98
+"""
+import argparse
+
+import numpy as np
+
+from utils.embedding_store import ServiceEmbeddings
+
+PROBE_QUERIES = [
+    "dolor de muelas",
+    "fiebre",
+    "fractura de brazo",
+    "dolor de cabeza fuerte y mareos",
+    "mi hijo tiene tos y fiebre desde hace tres días",
+    "sangrado de encías",
+    "dolor en el pecho al respirar",
+    "necesito una limpieza dental",
+    "embarazo, control prenatal",
+    "me duele el oído",
+    "toothache and swollen cheek",
+    "broken tooth after a fall",
+    "ansiedad y problemas para dormir",
+    "vómitos y diarrea",
+    "revisión de la vista, veo borroso",
+]
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms != 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--onnx-dir", default=None)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--min-vector-cosine", type=float, default=0.98)
+    parser.add_argument("--min-topk-overlap", type=float, default=0.8,
+                        help="mean fraction of the torch top-K also in the ONNX top-K")
+    parser.add_argument("--max-score-diff", type=float, default=0.03,
+                        help="largest allowed |cos_torch - cos_onnx| on the top-K services")
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+    from scripts.export_onnx_encoder import MODEL_NAME
+    from utils.onnx_encoder import DEFAULT_ONNX_DIR, OnnxSentenceEncoder
+
+    services = ServiceEmbeddings.load()
+    if not len(services):
+        raise SystemExit("The services collection has no embeddings")
+
+    torch_model = SentenceTransformer(MODEL_NAME, device="cpu")
+    onnx_model = OnnxSentenceEncoder(args.onnx_dir or DEFAULT_ONNX_DIR)
+
+    texts = PROBE_QUERIES + services.names
+    torch_vectors = _normalize(np.asarray(torch_model.encode(texts, convert_to_numpy=True), dtype=np.float32))
+    onnx_vectors = _normalize(onnx_model.encode(texts))
+    vector_cosine = (torch_vectors * onnx_vectors).sum(axis=1)
+
+    # Rank the catalog (stored torch embeddings) with each backend's query vector
+    k = min(args.top_k, len(services))
+    overlaps, score_diffs, top1_agree = [], [], 0
+    for row in range(len(texts)):
+        torch_scores = services.matrix @ torch_vectors[row]
+        onnx_scores = services.matrix @ onnx_vectors[row]
+        torch_top = np.argsort(-torch_scores, kind="stable")[:k]
+        onnx_top = np.argsort(-onnx_scores, kind="stable")[:k]
+        overlaps.append(len(set(torch_top) & set(onnx_top)) / k)
+        score_diffs.append(float(np.abs(torch_scores[torch_top] - onnx_scores[torch_top]).max()))
+        top1_agree += int(torch_top[0] == onnx_top[0])
+
+    report = {
+        "texts": len(texts),
+        "services": len(services),
+        "vector_cosine_min": round(float(vector_cosine.min()), 4),
+        "vector_cosine_mean": round(float(vector_cosine.mean()), 4),
+        f"top{k}_overlap_mean": round(float(np.mean(overlaps)), 4),
+        "top1_agreement": round(top1_agree / len(texts), 4),
+        "score_diff_max": round(float(np.max(score_diffs)), 4),
+    }
+    print(report)
+
+    failures = []
+    if report["vector_cosine_min"] < args.min_vector_cosine:
+        worst = texts[int(vector_cosine.argmin())]
+        failures.append(f"vector cosine {report['vector_cosine_min']} < {args.min_vector_cosine} ({worst!r})")
+    if report[f"top{k}_overlap_mean"] < args.min_topk_overlap:
+        failures.append(f"top-{k} overlap {report[f'top{k}_overlap_mean']} < {args.min_topk_overlap}")
+    if report["score_diff_max"] > args.max_score_diff:
+        failures.append(f"score diff {report['score_diff_max']} > {args.max_score_diff}")
+    if failures:
+        raise SystemExit("ONNX backend out of tolerance: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
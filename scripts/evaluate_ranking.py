@@ -0,0 +1,344 @@
+"""
+Replay historical referrals against the current ranking code (and optionally
+a candidate engine) to check that performance work did not change the
+recommendations.
+
+Each referral event (the records saved together by save_referrals) is
+replayed from its stored signals: symptoms_raw, symptoms_extracted,
+services_extracted, is_emergency and patient_location, with the same
+CIE-11/ICHI code matches rank_partners boosts. The Groq extraction is not
+called again, so results are deterministic.
+
+Reports:
+  - agreement of the current engine with what was actually sent
+    (top-1 and overlap@K), and final/service score drift for those partners
+  - with a candidate: top-K agreement and score drift against the baseline
+  - per-query latency (perf_counter) and peak allocation (tracemalloc)
+
+    python -m scripts.evaluate_ranking --limit 500
+    python -m scripts.evaluate_ranking --candidate-top-n 64
+    python -m scripts.evaluate_ranking --candidate mypkg.engines:build_engine --out eval.jsonl
+"""
+import argparse
+import importlib
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Records of one event are inserted together; their referred_at differ by microseconds
+EVENT_GAP = timedelta(seconds=30)
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+def load_events(limit: int, since: datetime | None) -> list[dict]:
+    """Group referral records into the queries that produced them (newest first)."""
+    from utils.db_tools import db
+
+    query = {"symptoms_raw": {"$exists": True}}
+    if since:
+        query["referred_at"] = {"$gte": since}
+    cursor = db["referrals"].find(query).sort("referred_at", -1)
+
+    events: list[dict] = []
+    for record in cursor:
+        last = events[-1] if events else None
+        same_event = (
+            last is not None
+            and last["patient"] == record.get("patient_phone_number")
+            and last["symptoms_raw"] == record.get("symptoms_raw")
+            and last["is_fallback"] == record.get("is_fallback", False)
+            and abs(last["referred_at"] - record["referred_at"]) <= EVENT_GAP
+        )
+        if same_event:
+            last["records"].append(record)
+            continue
+        if len(events) >= limit:
+            break
+        events.append({
+            "patient": record.get("patient_phone_number"),
+            "symptoms_raw": record.get("symptoms_raw"),
+            "is_fallback": record.get("is_fallback", False),
+            "referred_at": record["referred_at"],
+            "records": [record],
+        })
+
+    for event in events:
+        # save_referrals stores partners in ranking order
+        event["records"].sort(key=lambda r: r.get("final_score") or 0, reverse=True)
+    return events
+
+
+def query_chunks(record: dict) -> list[str]:
+    """
+    Same chunks rank_partners averages: each distinct symptom (embedded as the
+    conversation went) or, with INCREMENTAL_SYMPTOM_EMBEDDINGS off, the joined
+    symptom string; then the extracted symptoms and services.
+    """
+    from utils.symptom_embeddings import INCREMENTAL_SYMPTOM_EMBEDDINGS, symptom_texts
+
+    symptoms = record.get("symptoms_raw") or []
+    head = list(symptom_texts(symptoms).values()) if INCREMENTAL_SYMPTOM_EMBEDDINGS else [", ".join(symptoms)]
+    chunks = head + list(record.get("symptoms_extracted") or []) + list(record.get("services_extracted") or [])
+    return [c for c in chunks if c and str(c).strip()]
+
+
+def code_phrases(record: dict) -> list[str]:
+    """Phrases rank_partners looks up in the code index: the joined symptoms plus the extractions."""
+    phrases = [", ".join(record.get("symptoms_raw") or [])]
+    phrases += list(record.get("symptoms_extracted") or []) + list(record.get("services_extracted") or [])
+    return [p for p in phrases if p and str(p).strip()]
+
+
+def _load_candidate(spec: str):
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+
+def _timed_rank(engine, args, top_n, code_partner_ids=None):
+    kwargs = {"code_partner_ids": code_partner_ids}
+    if top_n is not None:
+        kwargs["top_n"] = top_n
+    start = time.perf_counter()
+    result = engine.score(*args, **kwargs)
+    ranked = result.global_top if args[4] is None else result.in_radius
+    return ranked, (time.perf_counter() - start) * 1000
+
+
+def _peak_kib(engine, args, top_n, code_partner_ids=None) -> float:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    _timed_rank(engine, args, top_n, code_partner_ids)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def _partner_scores(engine, partner_index: dict, service_score, patient, partner_id):
+    """Recomputed (final_score, service_score) for one partner, or None if not in the catalog."""
+    p = partner_index.get(partner_id)
+    if p is None:
+        return None
+    scored = engine.score_partners(service_score, patient, np.array([p], dtype=np.int64))
+    return float(scored["final_score"][0]), float(service_score[p])
+
+
+def replay(events, engine, model, top_k, code_index, candidate=None, candidate_top_n=None, out=None) -> dict:
+    from utils.medical_referral import MAX_DISTANCE_GPS, MAX_DISTANCE_TEXT
+
+    partner_index = {partner.get("_id"): p for p, partner in enumerate(engine.partners)}
+    stats = {
+        "events": 0,
+        "code_match_events": 0,
+        "historical_top1_match": 0,
+        "historical_overlap": [],
+        "historical_missing_partners": 0,
+        "final_score_drift": [],
+        "service_score_drift": [],
+        "candidate_exact_match": 0,
+        "candidate_top1_match": 0,
+        "candidate_overlap": [],
+        "candidate_score_drift": [],
+        "encode_ms": [],
+        "baseline_ms": [],
+        "candidate_ms": [],
+        "baseline_peak_kib": [],
+        "candidate_peak_kib": [],
+    }
+
+    for event in events:
+        first = event["records"][0]
+        # Encoded as written, like embed_texts does
+        chunks = [str(c).strip() for c in query_chunks(first)]
+        if not chunks:
+            continue
+        location = first.get("patient_location") or {}
+        radius = None if event["is_fallback"] else (
+            MAX_DISTANCE_GPS if location.get("location_type", "gps") == "gps" else MAX_DISTANCE_TEXT
+        )
+
+        start = time.perf_counter()
+        query_emb = np.mean(np.asarray(model.encode(chunks, convert_to_numpy=True), dtype=np.float32), axis=0)
+        stats["encode_ms"].append((time.perf_counter() - start) * 1000)
+
+        # Partners curating a matched CIE-11/ICHI code, as in rank_partners
+        matched_codes, code_partner_ids = code_index.match_partners(code_phrases(first))
+        stats["code_match_events"] += int(bool(code_partner_ids))
+
+        args = (query_emb, bool(first.get("is_emergency")), location.get("lat"), location.get("lon"), radius, top_k)
+        baseline, ms = _timed_rank(engine, args, None, code_partner_ids)
+        stats["baseline_ms"].append(ms)
+        stats["baseline_peak_kib"].append(_peak_kib(engine, args, None, code_partner_ids))
+        baseline_ids = [p["_id"] for p in baseline]
+
+        # --- Against what was actually sent -----------------------------------
+        sent_ids = [r.get("partner_id") for r in event["records"]]
+        k = max(len(sent_ids), 1)
+        stats["historical_top1_match"] += int(bool(baseline_ids) and baseline_ids[0] == sent_ids[0])
+        stats["historical_overlap"].append(len(set(sent_ids) & set(baseline_ids[:k])) / k)
+
+        service_score = engine.boost_code_matches(
+            engine.service_scores(query_emb, bool(first.get("is_emergency"))),
+            engine.partner_rows(code_partner_ids),
+        )
+        patient = engine._patient_point(location.get("lat"), location.get("lon"))
+        for record in event["records"]:
+            now = _partner_scores(engine, partner_index, service_score, patient, record.get("partner_id"))
+            if now is None:
+                stats["historical_missing_partners"] += 1
+                continue
+            if record.get("final_score") is not None:
+                stats["final_score_drift"].append(abs(now[0] - record["final_score"]))
+            if record.get("service_score") is not None:
+                stats["service_score_drift"].append(abs(now[1] - record["service_score"]))
+
+        # --- Candidate engine --------------------------------------------------
+        row = {
+            "referred_at": event["referred_at"].isoformat(),
+            "radius_km": radius,
+            "matched_codes": sorted(matched_codes),
+            "sent": [str(i) for i in sent_ids],
+            "baseline": [str(i) for i in baseline_ids],
+            "baseline_ms": round(ms, 3),
+        }
+        if candidate is not None:
+            ranked, ms = _timed_rank(candidate, args, candidate_top_n, code_partner_ids)
+            stats["candidate_ms"].append(ms)
+            stats["candidate_peak_kib"].append(_peak_kib(candidate, args, candidate_top_n, code_partner_ids))
+            candidate_ids = [p["_id"] for p in ranked]
+            stats["candidate_exact_match"] += int(candidate_ids == baseline_ids)
+            stats["candidate_top1_match"] += int(candidate_ids[:1] == baseline_ids[:1])
+            stats["candidate_overlap"].append(
+                len(set(candidate_ids) & set(baseline_ids)) / len(baseline_ids) if baseline_ids
+                else float(not candidate_ids)
+            )
+            stats["candidate_score_drift"].extend(
+                abs(a["final_score"] - b["final_score"]) for a, b in zip(ranked, baseline)
+            )
+            row.update({"candidate": [str(i) for i in candidate_ids], "candidate_ms": round(ms, 3)})
+
+        stats["events"] += 1
+        if out is not None:
+            out.write(json.dumps(row) + "\n")
+
+    return summarize(stats, candidate is not None)
+
+
+def summarize(stats: dict, with_candidate: bool) -> dict:
+    def pct(values, q):
+        return round(float(np.percentile(values, q)), 3) if values else None
+
+    def mean(values):
+        return round(float(np.mean(values)), 4) if values else None
+
+    events = max(stats["events"], 1)
+    summary = {
+        "events": stats["events"],
+        "code_match_events": stats["code_match_events"],
+        "historical": {
+            "top1_match_rate": round(stats["historical_top1_match"] / events, 4),
+            "overlap_at_k": mean(stats["historical_overlap"]),
+            "missing_partners": stats["historical_missing_partners"],
+            "final_score_drift_mean": mean(stats["final_score_drift"]),
+            "final_score_drift_max": round(max(stats["final_score_drift"]), 6) if stats["final_score_drift"] else None,
+            "service_score_drift_mean": mean(stats["service_score_drift"]),
+        },
+        "latency_ms": {
+            "encode_p50": pct(stats["encode_ms"], 50),
+            "baseline_p50": pct(stats["baseline_ms"], 50),
+            "baseline_p95": pct(stats["baseline_ms"], 95),
+        },
+        "memory_peak_kib": {
+            "baseline_p50": pct(stats["baseline_peak_kib"], 50),
+            "baseline_max": pct(stats["baseline_peak_kib"], 100),
+        },
+    }
+    if with_candidate:
+        summary["candidate"] = {
+            "exact_match_rate": round(stats["candidate_exact_match"] / events, 4),
+            "top1_match_rate": round(stats["candidate_top1_match"] / events, 4),
+            "overlap_at_k": mean(stats["candidate_overlap"]),
+            "score_drift_max": round(max(stats["candidate_score_drift"]), 6) if stats["candidate_score_drift"] else None,
+        }
+        summary["latency_ms"].update({
+            "candidate_p50": pct(stats["candidate_ms"], 50),
+            "candidate_p95": pct(stats["candidate_ms"], 95),
+        })
+        summary["memory_peak_kib"].update({
+            "candidate_p50": pct(stats["candidate_peak_kib"], 50),
+            "candidate_max": pct(stats["candidate_peak_kib"], 100),
+        })
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=500, help="referral events to replay (newest first)")
+    parser.add_argument("--since", type=lambda s: datetime.fromisoformat(s), default=None,
+                        help="only referrals on/after this ISO date")
+    parser.add_argument("--top-k", type=int, default=None, help="defaults to medical_referral.TOP_K")
+    parser.add_argument("--candidate", default=None,
+                        help="MODULE:FACTORY called as factory(partners, services) -> engine with RankingEngine.score()'s signature")
+    parser.add_argument("--candidate-top-n", type=int, default=None,
+                        help="two-stage retrieval N for the candidate (RankingEngine if no --candidate)")
+    parser.add_argument("--out", default=None, help="write per-event rows (JSON lines) here")
+    parser.add_argument("--min-historical-top1", type=float, default=None,
+                        help="exit non-zero if the historical top-1 match rate falls below this")
+    parser.add_argument("--min-candidate-exact", type=float, default=None,
+                        help="exit non-zero if the candidate's exact top-K match rate falls below this")
+    args = parser.parse_args()
+
+    from utils.code_index import CodeIndex
+    from utils.embedding_store import ServiceEmbeddings
+    from utils.medical_referral import TOP_K, get_embedding_model
+    from utils.partner_catalog import PartnerCatalog
+    from utils.ranking import RankingEngine
+
+    catalog = PartnerCatalog()
+    catalog.refresh("evaluation")
+    snapshot = catalog.snapshot()
+    services = ServiceEmbeddings.load_from_db()
+    engine = RankingEngine(snapshot.partners, services, snapshot.service_ids)
+
+    candidate = None
+    if args.candidate:
+        candidate = _load_candidate(args.candidate)(snapshot.partners, services)
+    elif args.candidate_top_n is not None:
+        candidate = RankingEngine(snapshot.partners, services, snapshot.service_ids)
+
+    code_index = CodeIndex()
+    code_index.rebuild("evaluation")
+    events = load_events(args.limit, args.since)
+    model = get_embedding_model()
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else None
+    try:
+        summary = replay(
+            events, engine, model, args.top_k or TOP_K, code_index,
+            candidate=candidate, candidate_top_n=args.candidate_top_n, out=out,
+        )
+    finally:
+        if out is not None:
+            out.close()
+
+    summary["catalog"] = {"partners": len(catalog.partners), "services": len(services), "services_version": services.version}
+    print(json.dumps(summary, indent=2, default=str))
+
+    if args.min_historical_top1 is not None and summary["historical"]["top1_match_rate"] < args.min_historical_top1:
+        raise SystemExit("Historical top-1 agreement below threshold")
+    if candidate is not None and args.min_candidate_exact is not None \
+            and summary["candidate"]["exact_match_rate"] < args.min_candidate_exact:
+        raise SystemExit("Candidate top-K differs from the baseline above threshold")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Export paraphrase-multilingual-MiniLM-L12-v2 to ONNX and quantize it to int8
+for the EMBEDDING_BACKEND=onnx encoder (utils.onnx_encoder).
+
+Needs the torch stack (requirements-base.txt) only at export time:
+
+    python -m scripts.export_onnx_encoder
+    python -m scripts.export_onnx_encoder --out models/minilm-int8 --keep-fp32
+"""
+import argparse
+import json
+import os
+import time
+
+from utils.onnx_encoder import CONFIG_FILE, DEFAULT_ONNX_DIR, ONNX_MODEL_FILE, TOKENIZER_FILE
+
+MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+FP32_MODEL_FILE = "model_fp32.onnx"
+OPSET = 17
+
+
+def export(out_dir: str, keep_fp32: bool) -> dict:
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    st_model = SentenceTransformer(MODEL_NAME, device="cpu")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+    max_seq_length = int(st_model.max_seq_length)
+
+    # Fast tokenizer -> tokenizer.json, loadable by `tokenizers` without transformers
+    tokenizer.backend_tokenizer.save(os.path.join(out_dir, TOKENIZER_FILE))
+
+    sample = tokenizer(["dolor de muelas", "fiebre alta y tos desde hace tres días"],
+                       padding=True, return_tensors="pt")
+    fp32_path = os.path.join(out_dir, FP32_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=OPSET,
+        )
+
+    int8_path = os.path.join(out_dir, ONNX_MODEL_FILE)
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    if not keep_fp32:
+        os.remove(fp32_path)
+
+    config = {
+        "source_model": MODEL_NAME,
+        "model_file": ONNX_MODEL_FILE,
+        "max_seq_length": max_seq_length,
+        "dim": int(st_model.get_sentence_embedding_dimension()),
+        "pad_token_id": int(tokenizer.pad_token_id),
+        "pad_token": tokenizer.pad_token,
+        "pooling": "mean",
+        "quantization": "dynamic-int8",
+        "opset": OPSET,
+    }
+    with open(os.path.join(out_dir, CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+    return {
+        "out_dir": out_dir,
+        "int8_mb": round(os.path.getsize(int8_path) / 2**20, 1),
+        "seconds": round(time.perf_counter() - start, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=DEFAULT_ONNX_DIR)
+    parser.add_argument("--keep-fp32", action="store_true", help="keep the unquantized export next to the int8 one")
+    args = parser.parse_args()
+    print(export(args.out, args.keep_fp32))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+utils.db_tools connects to MongoDB when imported, so tests replace it with a
+stub module and import the modules under test afresh against the stub.
+"""
+import importlib
+import sys
+import types
+from unittest.mock import MagicMock
+
+import pytest
+
+
+@pytest.fixture
+def db_tools(monkeypatch):
+    """Stub utils.db_tools: set the collections a test needs; any other attribute is a MagicMock."""
+    module = types.ModuleType("utils.db_tools")
+    module.__getattr__ = lambda name: MagicMock(name=name)
+    module.log_to_db = lambda *args, **kwargs: None
+    monkeypatch.setitem(sys.modules, "utils.db_tools", module)
+    return module
+
+
+@pytest.fixture
+def fresh_import(db_tools, monkeypatch):
+    """
+    Drop the given modules from sys.modules and import them again, so their
+    module-level state (singletons, `from utils.db_tools import ...`) binds to
+    the stub. Returns the first module.
+    """
+    def fresh_import(*names):
+        for name in names:
+            monkeypatch.delitem(sys.modules, name, raising=False)
+        modules = [importlib.import_module(name) for name in names]
+        return modules[0]
+
+    return fresh_import
@@ -0,0 +1,27 @@
+class FakeCursor(list):
+    def sort(self, *args, **kwargs):
+        return self
+
+    def skip(self, n):
+        return FakeCursor(self[n:])
+
+    def limit(self, n):
+        return FakeCursor(self[:n])
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, *args, **kwargs):
+        return FakeCursor(self.docs)
+
+    def find_one(self, query, projection=None):
+        return next((d for d in self.docs if all(d.get(k) == v for k, v in query.items())), None)
+
+    def update_one(self, query, update):
+        doc = self.find_one(query)
+        doc.update(update["$set"])
+
+    def count_documents(self, query):
+        return len(self.docs)
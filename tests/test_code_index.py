@@ -0,0 +1,66 @@
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+SPECIALTIES = [
+    {"partner_id": "p1", "cie": [
+        {"code": "8B80", "title": "Dolor de cabeza tensional"},
+        {"code": "1D40", "title": "Fiebre tifoidea"},
+        {"code": "MG26", "title": "Fiebre"},
+    ]},
+    {"partner_id": "p2", "ichi": [{"code": "SG.AA", "title": "Consulta de seguimiento"}]},
+]
+
+
+@pytest.fixture
+def code_index(db_tools, fresh_import):
+    specialties = MagicMock(**{"find.return_value": SPECIALTIES})
+    versions = MagicMock(**{"find_one.return_value": {"version": 1}})
+    db_tools.db = {"specialties": specialties, "catalog_versions": versions}
+    module = fresh_import("utils.code_index")
+
+    index = module.CodeIndex()
+    index.rebuild("test")
+    return module, index, specialties
+
+
+def test_generic_single_words_do_not_match(code_index):
+    _, index, _ = code_index
+
+    assert index.match_partners(["dolor", "consulta", "cabeza"]) == (set(), set())
+
+
+def test_single_word_matches_only_the_code_it_names(code_index):
+    _, index, _ = code_index
+
+    assert index.match_codes(["fiebre"]) == {"cie:MG26"}
+
+
+def test_multi_term_phrase_matches_titles_containing_it(code_index):
+    _, index, _ = code_index
+
+    codes, partners = index.match_partners(["dolor de cabeza", "consulta de seguimiento"])
+
+    assert codes == {"cie:8B80", "ichi:SG.AA"}
+    assert partners == {"p1", "p2"}
+
+
+def test_get_code_index_does_not_query_mongo_on_the_caller(code_index, monkeypatch):
+    module, _, specialties = code_index
+    specialties.find.reset_mock()
+    started = []
+    monkeypatch.setattr(module.CodeIndex, "start_watcher", lambda self: started.append(True))
+
+    module.get_code_index()
+
+    assert started and not specialties.find.called
+
+
+def test_code_matches_are_not_boosted_by_default():
+    from utils.ranking import CODE_MATCH_BOOST_FACTOR, RankingEngine
+
+    score = np.array([0.2, 0.5, 0.7])
+
+    assert CODE_MATCH_BOOST_FACTOR == 1.0
+    assert RankingEngine.boost_code_matches(score, np.array([1])) is score
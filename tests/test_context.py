@@ -0,0 +1,57 @@
+import asyncio
+from unittest.mock import MagicMock
+
+from utils.context import (
+    conversation_scope,
+    get_conversation_context,
+    set_conversation_context,
+    update_conversation_context,
+)
+
+
+def test_context_is_only_visible_inside_the_scope_and_for_its_sender():
+    assert get_conversation_context("502") is None
+
+    with conversation_scope("502", {"language": "Spanish"}):
+        assert get_conversation_context("502")["language"] == "Spanish"
+        assert get_conversation_context("503") is None
+        update_conversation_context("503", language="English")
+        set_conversation_context("503", {"language": "English"})
+        assert get_conversation_context("502")["language"] == "Spanish"
+
+    assert get_conversation_context("502") is None
+
+
+def test_set_replaces_the_state_and_keeps_the_sender():
+    with conversation_scope("502", {"language": "Spanish", "symptoms": ["fiebre"]}):
+        set_conversation_context("502", {"language": None})
+        update_conversation_context("502", symptoms=[])
+
+        assert get_conversation_context("502") == {"language": None, "symptoms": [], "sender_id": "502"}
+
+
+def test_concurrent_turns_do_not_share_state():
+    async def turn(sender_id, language, started, other_started):
+        with conversation_scope(sender_id):
+            update_conversation_context(sender_id, language=language)
+            started.set()
+            await other_started.wait()
+            return get_conversation_context(sender_id)["language"]
+
+    async def run():
+        a, b = asyncio.Event(), asyncio.Event()
+        return await asyncio.gather(turn("502", "Spanish", a, b), turn("502", "English", b, a))
+
+    assert asyncio.run(run()) == ["Spanish", "English"]
+
+
+def test_user_language_is_read_from_the_turn_without_a_query(db_tools, fresh_import, monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    db_tools.ongoing_conversations = MagicMock()
+    translation = fresh_import("utils.translation")
+
+    with conversation_scope("502", {"language": "Spanish"}):
+        language = asyncio.run(translation.get_user_language("502"))
+
+    assert language == "Spanish"
+    assert not db_tools.ongoing_conversations.find_one.called
@@ -0,0 +1,58 @@
+import asyncio
+import base64
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from tests.fakes import FakeCollection
+
+
+@pytest.fixture
+def conversations(db_tools, fresh_import, monkeypatch):
+    """An ongoing conversation whose symptoms were embedded by utils.symptom_embeddings."""
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    docs = [{"_id": ObjectId(), "sender_id": "50255550000", "symptoms": []}]
+    collection = FakeCollection(docs)
+
+    db_tools.db = {"ongoing_conversations": collection, "historical_conversations": collection}
+    db_tools.ongoing_conversations = collection
+    db_tools.embedding_cache = MagicMock()
+    embedding_cache = fresh_import("utils.embedding_cache", "utils.symptom_embeddings", "routers.database")
+    import utils.embedding_service as embedding_service
+
+    monkeypatch.setattr(embedding_cache, "PERSIST_EMBEDDINGS", False)
+
+    class Encoder:
+        model_key = "test-model"
+
+        async def encode(self, texts):
+            return np.random.default_rng(0).normal(size=(len(texts), 8)).astype(np.float32)
+
+    monkeypatch.setattr(embedding_service, "_service", Encoder())
+
+    from utils.symptom_embeddings import add_symptom_embeddings
+
+    asyncio.run(add_symptom_embeddings("50255550000", ["fiebre", "tos"]))
+    return docs
+
+
+def test_get_conversation_with_symptom_embedding(conversations):
+    from routers.database import router
+
+    app = FastAPI()
+    app.include_router(router, prefix="/db")
+    client = TestClient(app)
+
+    for collection in ("ongoing_conversations", "historical_conversations"):
+        response = client.get(f"/db/{collection}")
+        assert response.status_code == 200
+        state = response.json()["data"][0]["symptom_embedding"]
+        assert state["count"] == 2
+        assert len(base64.b64decode(state["sum"])) == 8 * 4
+
+    response = client.get(f"/db/ongoing_conversations/{conversations[0]['_id']}")
+    assert response.status_code == 200
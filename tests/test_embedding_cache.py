@@ -0,0 +1,29 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def embedding_cache(db_tools, fresh_import, monkeypatch):
+    db_tools.embedding_cache = MagicMock()
+    embedding_cache = fresh_import("utils.embedding_cache")
+
+    monkeypatch.setattr(embedding_cache, "PERSIST_EMBEDDINGS", False)
+    return embedding_cache
+
+
+def test_encodes_the_text_as_written_and_caches_the_normalized_key(embedding_cache):
+    seen = []
+
+    async def encode(texts):
+        seen.extend(texts)
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    vectors = asyncio.run(embedding_cache.embed_texts(["Dolor de MUELAS.", "dolor  de muelas"], "m", encode))
+    asyncio.run(embedding_cache.embed_texts(["  DOLOR DE MUELAS "], "m", encode))
+
+    assert seen == ["Dolor de MUELAS."]
+    assert vectors.shape == (2, 4)
+    assert embedding_cache.get_embedding_cache_stats()["lru_hits"] == 1
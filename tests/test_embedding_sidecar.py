@@ -0,0 +1,46 @@
+import asyncio
+
+from utils.embedding_sidecar import SidecarClient, pack_frame, read_frame
+
+
+def test_fetch_info_caches_the_model_key(tmp_path, monkeypatch):
+    socket_path = str(tmp_path / "sidecar.sock")
+
+    async def handle(reader, writer):
+        header, _ = await read_frame(reader)
+        assert header == {"op": "info"}
+        writer.write(pack_frame({"ok": True, "model_key": "minilm:abc", "version": "v1"}))
+        await writer.drain()
+        writer.close()
+
+    async def run():
+        server = await asyncio.start_unix_server(handle, path=socket_path)
+        async with server:
+            client = SidecarClient(socket_path)
+            info = await client.fetch_info()
+        return client, info
+
+    client, info = asyncio.run(run())
+
+    def blocked(header):
+        raise AssertionError("model_key must not block once fetched")
+
+    monkeypatch.setattr(client, "request_sync", blocked)
+    assert info["version"] == "v1"
+    assert client.model_key == "minilm:abc"
+
+
+def test_reload_asks_the_sidecar_to_reread_mongo_first(monkeypatch):
+    import utils.embedding_service as embedding_service
+    import utils.embedding_store as embedding_store
+
+    calls = []
+    client = SidecarClient("/tmp/unused.sock")
+    monkeypatch.setattr(client, "request_sync", lambda header: calls.append(header["op"]) or ({"ok": True}, b""))
+    monkeypatch.setattr(embedding_service, "_service", client)
+    monkeypatch.setattr(embedding_store, "bump_services_version", lambda: calls.append("bump"))
+    monkeypatch.setattr(embedding_store._store, "reload", lambda reason: calls.append(f"store:{reason}"))
+
+    embedding_store.reload_service_embeddings("admin")
+
+    assert calls == ["reload", "bump", "store:admin"]
@@ -0,0 +1,32 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+
+@pytest.fixture
+def store(db_tools, fresh_import):
+    version = {"version": 1}
+    services = MagicMock(**{"find.return_value": [
+        {"og_service_name": "Cardiología", "embedding": [0.1, 0.2, 0.3], "service_id": 1},
+    ]})
+    versions = MagicMock()
+    versions.find_one.side_effect = lambda query: dict(version)
+    db_tools.db = {"services": services, "catalog_versions": versions}
+    embedding_store = fresh_import("utils.embedding_store")
+
+    return embedding_store.ServiceEmbeddingStore(poll_seconds=0), version
+
+
+def test_reloads_only_when_the_version_document_moves(store):
+    store, version = store
+    swaps = []
+    store.subscribe(swaps.append)
+
+    first = store.get()
+    assert swaps == [first]
+    assert store.check_version() is False
+
+    version["version"] = 2
+    assert store.check_version() is True
+    assert len(swaps) == 2 and store.get() is swaps[1]
+    assert store.check_version() is False
@@ -0,0 +1,72 @@
+import pytest
+
+
+@pytest.fixture
+def gazetteer(fresh_import):
+    module = fresh_import("utils.gazetteer")
+    return module.Gazetteer.load()
+
+
+# ---------------------------------------------------------------------------
+# Forward lookup
+# ---------------------------------------------------------------------------
+
+def test_nicknames_and_country_suffixes_resolve_exactly(gazetteer):
+    lat, lon, address = gazetteer.lookup("Xela, Guatemala")
+
+    assert (lat, lon) == (14.8347, -91.5181)
+    assert address == "Quetzaltenango, Guatemala"
+    assert gazetteer.lookup("mixco guatemala")[2] == "Mixco, Guatemala"
+
+
+def test_typos_match_through_the_trigram_index(gazetteer):
+    assert gazetteer.lookup("Quetzaltenago")[2] == "Quetzaltenango, Guatemala"
+    assert gazetteer.lookup("Chimaltenang")[2] == "Chimaltenango, Guatemala"
+
+
+def test_short_names_are_not_fuzzy_matched(gazetteer):
+    assert gazetteer.lookup("xelx") is None
+
+
+def test_zonas_resolve_only_in_the_capital(gazetteer):
+    assert gazetteer.lookup("z. 10, ciudad de guatemala")[:2] == (14.6, -90.505)
+    assert gazetteer.lookup("zona 1 de mixco") is None
+
+
+@pytest.mark.parametrize("text", [
+    "Santa Catarina", "Santa Lucía", "San Lucas", "Petén", "Alta Verapaz", "Quiché", "Izabal", "Guatemala",
+])
+def test_ambiguous_names_are_left_to_the_geocoder(gazetteer, text):
+    assert gazetteer.lookup(text) is None
+
+
+def test_department_still_qualifies_its_capital(gazetteer):
+    assert gazetteer.lookup("Cobán, Alta Verapaz")[2] == "Cobán, Alta Verapaz, Guatemala"
+    assert gazetteer.lookup("Santa Lucía Cotzumalguapa")[2] == "Santa Lucía Cotzumalguapa, Escuintla, Guatemala"
+
+
+def test_conflicting_qualifiers_are_left_to_the_geocoder(gazetteer):
+    assert gazetteer.lookup("Mixco, Quetzaltenango") is None
+    assert gazetteer.lookup("Colonia Las Flores, Mixco") is None
+
+
+# ---------------------------------------------------------------------------
+# Reverse lookup
+# ---------------------------------------------------------------------------
+
+def test_pin_maps_to_the_nearest_zona_or_municipality(gazetteer):
+    entry, distance_km = gazetteer.reverse_lookup(14.601, -90.506)
+
+    assert entry["name"] == "Zona 10"
+    assert distance_km < 1
+    assert entry["formatted_address"] == "Zona 10, Ciudad de Guatemala, Guatemala"
+
+
+def test_landmarks_are_not_used_as_areas(gazetteer):
+    entry, _ = gazetteer.reverse_lookup(14.5833, -90.5275)
+
+    assert entry["type"] in ("zona", "municipality")
+
+
+def test_pins_far_from_every_centroid_get_no_area(gazetteer):
+    assert gazetteer.reverse_lookup(13.0, -93.5) is None
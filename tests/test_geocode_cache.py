@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+
+
+class Clock:
+    now = datetime(2026, 1, 1)
+
+    @classmethod
+    def utcnow(cls):
+        return cls.now
+
+
+@pytest.fixture
+def geocode_cache(db_tools, fresh_import, monkeypatch):
+    db_tools.geocode_cache = MagicMock(**{"find_one.return_value": None})
+    module = fresh_import("utils.geocode_cache")
+    monkeypatch.setattr(module, "datetime", Clock)
+    monkeypatch.setattr(Clock, "now", datetime(2026, 1, 1))
+    return module, db_tools.geocode_cache
+
+
+def test_spellings_of_one_place_share_an_entry(geocode_cache):
+    module, _ = geocode_cache
+
+    module.store_geocode("Zona 10, Ciudad de Guatemala", 14.6, -90.5, "Zona 10")
+
+    assert module.get_cached_geocode("  zona 10 ,  ciudad de GUATEMALA. ") == (True, (14.6, -90.5, "Zona 10"))
+    assert module.get_geocode_cache_stats()["lru_hits"] == 1
+
+
+def test_negative_results_expire_before_positive_ones(geocode_cache):
+    module, collection = geocode_cache
+    module.store_geocode("Xela", 14.8, -91.5, "Quetzaltenango")
+    module.store_geocode("Lugar inventado", None, None, None)
+
+    Clock.now += module.NEGATIVE_TTL + timedelta(seconds=1)
+
+    assert module.get_cached_geocode("Lugar inventado") == (False, None)
+    assert module.get_cached_geocode("Xela") == (True, (14.8, -91.5, "Quetzaltenango"))
+    query = collection.find_one.call_args.args[0]
+    assert query == {"key": "lugar inventado", "expires_at": {"$gt": Clock.now}}
+
+
+def test_least_recently_used_entry_is_evicted_to_mongo(geocode_cache, monkeypatch):
+    module, collection = geocode_cache
+    monkeypatch.setattr(module, "LRU_MAX_ENTRIES", 2)
+    module.store_geocode("Antigua", 14.56, -90.73, "Antigua Guatemala")
+    module.store_geocode("Cobán", 15.47, -90.37, "Cobán")
+    module.get_cached_geocode("Antigua")
+    module.store_geocode("Flores", 16.93, -89.89, "Flores")
+
+    assert module.get_cached_geocode("Antigua")[0] is True
+    assert not collection.find_one.called
+
+    collection.find_one.return_value = {
+        "key": "coban", "found": True, "lat": 15.47, "lon": -90.37,
+        "formatted_address": "Cobán", "expires_at": Clock.now + module.POSITIVE_TTL,
+    }
+    assert module.get_cached_geocode("Cobán") == (True, (15.47, -90.37, "Cobán"))
+    assert module.get_geocode_cache_stats()["mongo_hits"] == 1
@@ -0,0 +1,83 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+
+def answer(lat, lon, country="GT"):
+    return {"status": "OK", "results": [{
+        "address_components": [{"types": ["country"], "short_name": country}],
+        "geometry": {"location": {"lat": lat, "lng": lon}},
+        "formatted_address": f"{lat}, {lon}",
+    }]}
+
+
+class FakeClient:
+    """Answers each query variant after its own delay."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.started = []
+
+    async def get(self, url, params):
+        self.started.append(params["address"])
+        delay, data = self.answers[params["address"]]
+        await asyncio.sleep(delay)
+        if isinstance(data, Exception):
+            raise data
+        return MagicMock(**{"json.return_value": data})
+
+
+@pytest.fixture
+def geocode(db_tools, fresh_import, monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setenv("GOOGLE_MAPS_API_KEY", "test")
+    db_tools.geocode_cache = MagicMock(**{"find_one.return_value": None})
+    geocode_cache = fresh_import("utils.geocode_cache")
+    gazetteer = fresh_import("utils.gazetteer")
+    llm = fresh_import("utils.llm")
+    monkeypatch.setattr(gazetteer, "lookup_location", lambda text: None)
+
+    def run(answers):
+        client = FakeClient(answers)
+        monkeypatch.setattr(llm, "get_http_client", lambda: client)
+        return asyncio.run(llm.geocode_location("Mixco")), client
+
+    return run, geocode_cache
+
+
+def test_guatemala_variant_wins_even_when_it_answers_last(geocode):
+    run, _ = geocode
+
+    result, client = run({
+        "Mixco, Guatemala": (0.05, answer(14.63, -90.60)),
+        "Mixco": (0, answer(14.0, -90.0)),
+        "Mixco, GT": (0.01, answer(15.0, -91.0)),
+    })
+
+    assert result == (14.63, -90.60, "14.63, -90.6")
+    assert client.started == ["Mixco, Guatemala", "Mixco", "Mixco, GT"]
+
+
+def test_next_variant_is_used_when_a_higher_one_misses(geocode):
+    run, _ = geocode
+
+    result, _ = run({
+        "Mixco, Guatemala": (0.01, answer(19.4, -99.1, country="MX")),
+        "Mixco": (0.02, {"status": "ZERO_RESULTS", "results": []}),
+        "Mixco, GT": (0, answer(15.0, -91.0)),
+    })
+
+    assert result[:2] == (15.0, -91.0)
+
+
+def test_only_clean_misses_are_cached_as_not_found(geocode):
+    run, geocode_cache = geocode
+    miss = {"status": "ZERO_RESULTS", "results": []}
+
+    result, _ = run({"Mixco, Guatemala": (0, miss), "Mixco": (0, RuntimeError("timeout")), "Mixco, GT": (0, miss)})
+    assert result == (None, None, None)
+    assert geocode_cache.get_geocode_cache_stats()["negative_stores"] == 0
+
+    run({"Mixco, Guatemala": (0, miss), "Mixco": (0, miss), "Mixco, GT": (0, miss)})
+    assert geocode_cache.get_geocode_cache_stats()["negative_stores"] == 1
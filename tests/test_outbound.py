@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def outbound(db_tools, fresh_import, monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    logs = []
+    db_tools.log_to_db = lambda level, message, extra: logs.append(message)
+    translation = fresh_import("utils.translation")
+    whatsapp = fresh_import("utils.whatsapp")
+    outbound = fresh_import("utils.outbound")
+
+    calls = {"translate": [], "sent": []}
+
+    async def get_user_language(sender_id):
+        return "Spanish"
+
+    async def translate_messages(messages, language, sender_id=None):
+        calls["translate"].append(list(messages))
+        return [f"[{language}] {m}" for m in messages]
+
+    async def deliver_text_message(sender_id, message):
+        if message == "fails":
+            raise RuntimeError("WhatsApp API down")
+        calls["sent"].append((sender_id, "text", message))
+
+    async def deliver_location_request(sender_id, message):
+        calls["sent"].append((sender_id, "location_request", message))
+
+    monkeypatch.setattr(translation, "get_user_language", get_user_language)
+    monkeypatch.setattr(translation, "translate_messages", translate_messages)
+    monkeypatch.setattr(whatsapp, "deliver_text_message", deliver_text_message)
+    monkeypatch.setattr(whatsapp, "deliver_location_request", deliver_location_request)
+    return outbound, translation, whatsapp, calls, logs
+
+
+def test_turn_is_translated_in_one_call_and_sent_in_order(outbound):
+    module, translation, whatsapp, calls, _ = outbound
+
+    async def turn():
+        async with module.outbound_turn("502"):
+            await translation.send_translated_message("502", "Hello")
+            await whatsapp.send_text_message("502", "Already final")
+            await whatsapp.send_initial_location_request("502")
+            assert calls["sent"] == []
+
+    asyncio.run(turn())
+
+    assert calls["translate"] == [["Hello", whatsapp.LOCATION_REQUEST_MESSAGE]]
+    assert calls["sent"] == [
+        ("502", "text", "[Spanish] Hello"),
+        ("502", "text", "Already final"),
+        ("502", "location_request", f"[Spanish] {whatsapp.LOCATION_REQUEST_MESSAGE}"),
+    ]
+
+
+def test_queued_messages_are_flushed_when_the_turn_raises(outbound):
+    module, translation, _, calls, _ = outbound
+
+    async def turn():
+        async with module.outbound_turn("502"):
+            await translation.send_translated_message("502", "Something went wrong")
+            raise ValueError("handler failed")
+
+    with pytest.raises(ValueError):
+        asyncio.run(turn())
+
+    assert calls["sent"] == [("502", "text", "[Spanish] Something went wrong")]
+
+
+def test_a_failed_send_does_not_drop_the_rest_of_the_turn(outbound):
+    module, _, whatsapp, calls, logs = outbound
+
+    async def turn():
+        async with module.outbound_turn("502") as current:
+            await whatsapp.send_text_message("502", "fails")
+            await whatsapp.send_text_message("502", "still sent")
+            return await current.flush()
+
+    assert asyncio.run(turn()) == 1
+    assert calls["sent"] == [("502", "text", "still sent")]
+    assert logs == ["Error sending queued message"]
+
+
+def test_messages_to_another_recipient_are_not_batched(outbound):
+    module, _, whatsapp, calls, _ = outbound
+
+    async def turn():
+        async with module.outbound_turn("502"):
+            await whatsapp.send_text_message("503", "direct")
+            assert calls["sent"] == [("503", "text", "direct")]
+
+    asyncio.run(turn())
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def partner_cards(fresh_import, monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    translation = fresh_import("utils.translation")
+    partner_cards = fresh_import("utils.partner_cards")
+
+    calls = {"templates": [], "messages": []}
+
+    async def translate_message(text, language, sender_id=None):
+        calls["messages"].append(text)
+        return f"[{language}] {text}"
+
+    async def translate_template(template, language, sender_id=None):
+        calls["templates"].append(template)
+        return template
+
+    monkeypatch.setattr(translation, "translate_message", translate_message)
+    monkeypatch.setattr(partner_cards, "translate_template", translate_template)
+    return partner_cards, calls
+
+
+def test_category_is_translated_as_a_label_not_a_template(partner_cards):
+    module, calls = partner_cards
+    partner = {"_id": "p1", "partner_name": "Clínica", "partner_category": "Dentist"}
+
+    card = asyncio.run(module.get_partner_card(partner, {}, "Spanish"))
+    asyncio.run(module.get_partner_card(dict(partner, _id="p2"), {}, "spanish"))
+
+    assert card.category == "[Spanish] Dentist"
+    assert "Dentist" not in calls["templates"]
+    assert calls["messages"] == ["Dentist"]
+
+
+def test_rendered_languages_are_normalized(partner_cards):
+    module, _ = partner_cards
+    partner = {"_id": "p1", "partner_name": "Clínica"}
+
+    asyncio.run(module.get_partner_card(partner, {}, " Spanish "))
+    asyncio.run(module.get_partner_card(partner, {}, "French"))
+
+    assert module._rendered_languages == {"spanish", "french"}
+
+
+def test_braces_in_partner_data_are_sent_verbatim(partner_cards):
+    module, _ = partner_cards
+    partner = {
+        "_id": "p1",
+        "partner_name": "Clínica {prefix} {nombre}",
+        "partner_category": "Dentist",
+        "partner_locations": ["5a calle {distance_text} zona 1 {phone}"],
+        "partner_phone_number": ["2222-0000"],
+        "distance_km": 3.14,
+        "closest_location": {"location_index": 0},
+    }
+
+    block = asyncio.run(module.render_partner_card(partner, index=2, language="Spanish"))
+
+    assert "*2. Clínica {prefix} {nombre}*" in block
+    assert "_[Spanish] Dentist · 3.1 km_" in block
+    assert "5a calle {distance_text} zona 1 {phone}" in block
+    assert "*Phone:* 2222-0000" in block
@@ -0,0 +1,119 @@
+import copy
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from utils.service_ids import service_names_hash
+
+
+class SlowPartners:
+    def __init__(self, docs):
+        self.docs = docs
+        self.loads = 0
+
+    def find(self, query, projection=None):
+        self.loads += 1
+        self.projection = projection
+        time.sleep(0.05)
+        return [copy.deepcopy(doc) for doc in self.docs]
+
+
+class FakeStream:
+    """A change stream that has `pending` events queued."""
+
+    def __init__(self, pending):
+        self.pending = pending
+        self.alive = True
+
+    def try_next(self):
+        if self.pending:
+            self.pending -= 1
+            return {"operationType": "update"}
+        return None
+
+
+@pytest.fixture
+def partner_catalog(db_tools, fresh_import, monkeypatch):
+    partners = SlowPartners([{
+        "_id": "p1",
+        "partner_services": ["Cardiología"],
+        "partner_service_ids": [1],
+        "partner_service_names_hash": service_names_hash(["Cardiología"]),
+    }])
+    services = MagicMock(**{"find.return_value": [
+        {"og_service_name": "Cardiología", "embedding": [0.1, 0.2, 0.3], "service_id": 1},
+    ]})
+    versions = MagicMock(**{"find_one.return_value": None})
+    db_tools.db = {"partners": partners, "services": services, "catalog_versions": versions}
+    fresh_import("utils.embedding_store")
+    partner_catalog = fresh_import("utils.partner_catalog")
+
+    monkeypatch.setattr(partner_catalog.PartnerCatalog, "start_watcher", lambda self: None)
+    monkeypatch.setattr(partner_catalog, "PARTNER_CATALOG_DEBOUNCE_SECONDS", 0.05)
+    return partner_catalog, partners
+
+
+def test_concurrent_first_load_runs_once(partner_catalog):
+    module, partners = partner_catalog
+    catalog = module.PartnerCatalog()
+
+    threads = [threading.Thread(target=catalog.ensure_loaded) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert partners.loads == 1
+    assert catalog.version == 1
+
+
+def test_snapshot_is_replaced_whole(partner_catalog):
+    module, _ = partner_catalog
+    catalog = module.PartnerCatalog()
+
+    before = catalog.snapshot()
+    catalog.refresh("test")
+    after = catalog.snapshot()
+
+    assert before.version == 1 and after.version == 2
+    assert before.partners is not after.partners
+    assert len(after.service_ids[0]) == len(after.partners) + 1
+
+
+def test_change_events_are_coalesced(partner_catalog):
+    module, _ = partner_catalog
+    stream = FakeStream(pending=50)
+
+    assert module.PartnerCatalog._drain(stream) == 50
+    assert stream.pending == 0
+
+
+def test_engine_is_built_with_the_snapshot_and_rebuilt_on_service_reload(partner_catalog):
+    module, _ = partner_catalog
+    from utils.embedding_store import get_service_embedding_store
+
+    catalog = module.PartnerCatalog()
+    engine = catalog.get_engine()
+
+    assert catalog.current_engine() is engine
+    assert engine.svc_rows.tolist() == [0]
+
+    services = get_service_embedding_store().reload("test")
+
+    rebuilt = catalog.current_engine()
+    assert rebuilt is not engine and rebuilt.services is services
+    assert catalog.snapshot().partners is engine.partners
+
+
+def test_snapshot_keeps_only_the_fields_it_serves(partner_catalog):
+    module, partners = partner_catalog
+    catalog = module.PartnerCatalog()
+
+    snapshot = catalog.snapshot()
+
+    assert partners.projection == module.PARTNER_FIELDS
+    assert "partner_service_ids" not in snapshot.partners[0]
+    assert "partner_service_names_hash" not in snapshot.partners[0]
+    assert snapshot.service_ids[1].tolist() == [1]
@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from utils.embedding_store import ServiceEmbeddings
+from utils.ranking import RankingEngine
+
+SERVICES = {"cardiologia": [1.0, 0.0], "pediatria": [0.0, 1.0]}
+PARTNERS = [
+    {"_id": "zona10", "partner_services": ["Cardiologia"],
+     "partner_geo_locations": [{"lat": 14.600, "lon": -90.505}]},
+    {"_id": "zona1", "partner_services": ["Cardiologia", "Pediatria"],
+     "partner_geo_locations": [{"lat": 14.640, "lon": -90.513}]},
+]
+
+
+def build_engine():
+    return RankingEngine([dict(p) for p in PARTNERS], ServiceEmbeddings.from_map(SERVICES))
+
+
+@pytest.fixture
+def ranking_cache(fresh_import, monkeypatch):
+    module = fresh_import("utils.ranking_cache")
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(module, "time", SimpleNamespace(monotonic=lambda: clock["now"]))
+    return module, clock
+
+
+def test_key_ignores_symptom_order_and_formatting(ranking_cache):
+    module, _ = ranking_cache
+    cache = module.RankingCache(precision=5)
+
+    assert cache.key(["Fiebre", "tos "], 14.6001, -90.5051) == cache.key(["tos", "FIEBRE"], 14.6002, -90.5052)
+    assert cache.key(["fiebre"], 14.6, -90.5)[1] != cache.key(["fiebre"], 14.8, -91.5)[1]
+    assert cache.key(["fiebre"], None, None)[1] == cache.key(["fiebre"], 0.0, -90.5)[1] == ""
+
+
+def test_hit_reuses_scores_but_measures_distance_from_the_exact_point(ranking_cache):
+    module, _ = ranking_cache
+    cache = module.RankingCache()
+    engine = build_engine()
+    query = np.array([1.0, 0.2], dtype=np.float32)
+    key = cache.key(["dolor de pecho"], 14.6, -90.505)
+
+    cache.put(key, engine.score(query, False, 14.6, -90.505, 30, 2, top_n=0))
+    cached = cache.get(key, engine, 14.62, -90.51, 30, 2)
+
+    expected = engine.score(query, False, 14.62, -90.51, 30, 2, top_n=0).in_radius
+    assert [p["_id"] for p in cached.in_radius] == [p["_id"] for p in expected]
+    np.testing.assert_allclose([p["distance_km"] for p in cached.in_radius], [p["distance_km"] for p in expected])
+    assert cache.stats()["hits"] == 1
+
+
+def test_new_engine_invalidates_every_entry(ranking_cache):
+    module, _ = ranking_cache
+    cache = module.RankingCache()
+    engine = build_engine()
+    key = cache.key(["fiebre"], 14.6, -90.505)
+    cache.put(key, engine.score(np.array([1.0, 0.0]), False, 14.6, -90.505, 30, 2, top_n=0))
+
+    assert cache.get(key, build_engine(), 14.6, -90.505, 30, 2) is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_entries_expire_and_the_oldest_is_evicted(ranking_cache):
+    module, clock = ranking_cache
+    cache = module.RankingCache(ttl_seconds=60, max_entries=2)
+    engine = build_engine()
+    result = engine.score(np.array([1.0, 0.0]), False, 14.6, -90.505, 30, 2, top_n=0)
+    keys = [cache.key([symptom], 14.6, -90.505) for symptom in ("fiebre", "tos", "dolor")]
+
+    for key in keys:
+        cache.put(key, result)
+    assert cache.get(keys[0], engine, 14.6, -90.505, 30, 2) is None
+    assert cache.get(keys[1], engine, 14.6, -90.505, 30, 2) is not None
+
+    clock["now"] += 61
+    assert cache.get(keys[2], engine, 14.6, -90.505, 30, 2) is None
+    assert cache.stats()["expired"] == 1
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from scripts.bench_ranking import EMBEDDING_DIM, LAT_RANGE, LON_RANGE, TOP_K, build_catalog, legacy_rank
+from utils.embedding_store import ServiceEmbeddings
+from utils.ranking import EMERGENCY_KEYWORDS, RankingEngine
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    rng = np.random.default_rng(11)
+    partners, service_embedding_map = build_catalog(300, 40, rng)
+    engine = RankingEngine(partners, ServiceEmbeddings.from_map(service_embedding_map))
+    return engine, partners, service_embedding_map, rng
+
+
+def assert_same_ranking(got, expected):
+    assert [p["_id"] for p in got] == [p["_id"] for p in expected]
+    np.testing.assert_allclose(
+        [p["final_score"] for p in got], [p["final_score"] for p in expected], rtol=1e-5, atol=1e-7,
+    )
+
+
+@pytest.mark.parametrize("radius", [30, 60, None])
+@pytest.mark.parametrize("is_emergency", [False, True])
+def test_rank_matches_the_legacy_loop(catalog, radius, is_emergency):
+    engine, partners, service_embedding_map, rng = catalog
+
+    for _ in range(5):
+        query = rng.standard_normal(EMBEDDING_DIM).astype(np.float32)
+        if is_emergency:
+            # Close to an emergency service, so the boost decides the order
+            query += 4 * service_embedding_map[EMERGENCY_KEYWORDS[-1]]
+        lat, lon = float(rng.uniform(*LAT_RANGE)), float(rng.uniform(*LON_RANGE))
+
+        got = engine.rank(query, is_emergency, lat, lon, radius, TOP_K, top_n=0)
+
+        assert_same_ranking(got, legacy_rank(partners, service_embedding_map, query, is_emergency, lat, lon, radius))
+
+
+@pytest.mark.parametrize("is_emergency", [False, True])
+def test_rank_without_patient_location_matches_the_legacy_loop(catalog, is_emergency):
+    engine, partners, service_embedding_map, rng = catalog
+    query = rng.standard_normal(EMBEDDING_DIM).astype(np.float32)
+
+    result = engine.score(query, is_emergency, None, None, 30, TOP_K, top_n=0)
+
+    assert result.in_radius == []
+    assert_same_ranking(
+        result.global_top, legacy_rank(partners, service_embedding_map, query, is_emergency, None, None, None),
+    )
+
+
+def test_in_radius_and_global_top_share_one_score(catalog):
+    engine, partners, service_embedding_map, rng = catalog
+    query = rng.standard_normal(EMBEDDING_DIM).astype(np.float32)
+    lat, lon = 14.6, -90.5
+
+    result = engine.score(query, False, lat, lon, 30, TOP_K, top_n=0)
+
+    assert_same_ranking(result.in_radius, legacy_rank(partners, service_embedding_map, query, False, lat, lon, 30))
+    assert_same_ranking(result.global_top, legacy_rank(partners, service_embedding_map, query, False, lat, lon, None))
+
+
+# ---------------------------------------------------------------------------
+# Two-stage retrieval falls back to every partner
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def pruned_catalog():
+    # "lejano" is the only service near the query and its one partner is far
+    # from the patient; the partners around the patient offer "cercano"
+    service_embedding_map = {
+        "lejano": np.array([1.0, 0.0, 0.0], dtype=np.float32),
+        "cercano": np.array([0.0, 1.0, 0.0], dtype=np.float32),
+        "otro": np.array([0.0, 0.0, 1.0], dtype=np.float32),
+    }
+    partners = [
+        {"_id": "far", "partner_services": ["Lejano"],
+         "partner_geo_locations": [{"lat": 17.5, "lon": -89.5}]},
+        {"_id": "near", "partner_services": ["Cercano"],
+         "partner_geo_locations": [{"lat": 14.61, "lon": -90.51}]},
+        {"_id": "nearer", "partner_services": ["Cercano", "Otro"],
+         "partner_geo_locations": [{"lat": 14.601, "lon": -90.501}]},
+    ]
+    engine = RankingEngine(partners, ServiceEmbeddings.from_map(service_embedding_map))
+    return engine, partners, service_embedding_map
+
+
+def test_in_radius_widens_when_the_candidates_fall_short(pruned_catalog):
+    engine, partners, service_embedding_map = pruned_catalog
+    query = np.array([1.0, 0.1, 0.0], dtype=np.float32)
+
+    result = engine.score(query, False, 14.6, -90.5, 30, 2, top_n=1)
+
+    assert result.candidates.tolist() == [0]
+    assert {p["_id"] for p in result.in_radius} == {"near", "nearer"}
+    assert result.candidates is None
+    expected = legacy_rank(partners, service_embedding_map, query, False, 14.6, -90.5, 30)
+    assert_same_ranking(result.in_radius, expected)
+
+
+def test_global_top_widens_when_the_candidates_fall_short(pruned_catalog):
+    engine, partners, service_embedding_map = pruned_catalog
+    query = np.array([1.0, 0.1, 0.0], dtype=np.float32)
+
+    result = engine.score(query, False, 14.6, -90.5, None, 2, top_n=1)
+
+    assert result.candidates.tolist() == [0]
+    assert len(result.global_top) == 2
+    assert result.candidates is None
+    expected = legacy_rank(partners, service_embedding_map, query, False, 14.6, -90.5, None)
+    assert_same_ranking(result.global_top, expected)
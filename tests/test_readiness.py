@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def readiness(db_tools, fresh_import, monkeypatch):
+    logs = []
+    db_tools.log_to_db = lambda level, message, extra: logs.append((level, message, extra))
+    module = fresh_import("utils.readiness")
+    monkeypatch.setattr(module, "WARMUP_ON_STARTUP", True)
+    monkeypatch.setattr(module, "WARMUP_RETRIES", 2)
+    monkeypatch.setattr(module, "WARMUP_RETRY_DELAY_SECONDS", 0)
+
+    calls = []
+
+    def install(failures: dict[str, int]):
+        """Replace every step; `failures[name]` is how many attempts fail (-1: all)."""
+        def make(name):
+            async def step():
+                calls.append(name)
+                remaining = failures.get(name, 0)
+                if remaining:
+                    failures[name] = remaining - 1
+                    raise RuntimeError(f"{name} unavailable")
+                return {"step": name}
+            return step
+
+        steps = tuple((name, make(name), required) for name, _, required in module.WARMUP_STEPS)
+        monkeypatch.setattr(module, "WARMUP_STEPS", steps)
+
+    return module, install, calls, logs
+
+
+def messages(logs):
+    return [message for _, message, _ in logs]
+
+
+def test_failed_required_step_is_retried_and_logged(readiness):
+    module, install, calls, logs = readiness
+    install({"service_embeddings": 1})
+
+    asyncio.run(module.warm_up())
+
+    state = module.get_readiness()
+    assert state["ready"] is True
+    assert state["components"]["service_embeddings"]["attempts"] == 2
+    assert calls.count("service_embeddings") == 2
+    assert calls.index("partner_catalog") > calls.index("service_embeddings")
+    assert messages(logs) == ["Warmup step failed", "Retrying warmup steps", "Warmup finished"]
+    assert logs[1][2]["components"] == ["service_embeddings"]
+
+
+def test_optional_failures_do_not_block_readiness_or_retry(readiness):
+    module, install, calls, logs = readiness
+    install({"groq": -1})
+
+    asyncio.run(module.warm_up())
+
+    assert module.is_ready() is True
+    assert calls.count("groq") == 1
+    assert module.get_readiness()["components"]["groq"]["state"] == "failed"
+
+
+def test_giving_up_on_a_required_step_is_logged(readiness):
+    module, install, calls, logs = readiness
+    install({"mongo": -1})
+
+    asyncio.run(module.warm_up())
+
+    assert module.is_ready() is False
+    assert calls.count("mongo") == 3
+    assert messages(logs).count("Retrying warmup steps") == 2
+    level, _, extra = next(entry for entry in logs if entry[1] == "Warmup gave up on required steps")
+    assert level == "ERROR" and extra["components"] == {"mongo": "mongo unavailable"}
+
+
+def test_ready_endpoint_returns_503_until_warm(readiness, fresh_import, monkeypatch):
+    module, install, _, _ = readiness
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    main = fresh_import("main")
+    client = TestClient(main.app)
+
+    install({"partner_catalog": -1})
+    asyncio.run(module.warm_up())
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["components"]["partner_catalog"]["state"] == "failed"
+
+    install({})
+    asyncio.run(module.warm_up())
+    assert client.get("/ready").status_code == 200
@@ -0,0 +1,58 @@
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+
+class FakeServices:
+    def __init__(self, docs):
+        self.docs = docs
+        self.operations = []
+
+    def find(self, *args, **kwargs):
+        return list(self.docs)
+
+    def bulk_write(self, operations, ordered=True):
+        self.operations.extend(operations)
+        return MagicMock(upserted_count=0, modified_count=len(operations))
+
+
+@pytest.fixture
+def backfill(db_tools, fresh_import, monkeypatch):
+    existing_id = ObjectId()
+    services = FakeServices([
+        {"_id": ObjectId(), "og_service_name": "cardiología", "embedding": [0.1]},
+        {"_id": existing_id, "og_service_name": "pediatría"},
+    ])
+    partners = MagicMock()
+    partners.distinct.return_value = ["Cardiología", " Pediatría ", "Dermatología"]
+
+    db_tools.db = {"services": services, "partners": partners}
+    import utils.embedding_service as embedding_service
+
+    service_backfill = fresh_import("utils.service_backfill")
+
+    class Encoder:
+        model_key = "test-model"
+
+        def encode_sync(self, texts):
+            return np.ones((len(texts), 4), dtype=np.float32)
+
+    monkeypatch.setattr(embedding_service, "_service", Encoder())
+    monkeypatch.setattr(service_backfill, "ensure_service_ids", lambda: 0)
+    monkeypatch.setattr(service_backfill, "sync_partner_service_ids", lambda: 0)
+    monkeypatch.setattr(service_backfill.ServiceBackfill, "_publish", staticmethod(lambda: None))
+    return service_backfill, services, existing_id
+
+
+def test_unembedded_service_is_filled_in_place_not_duplicated(backfill):
+    module, services, existing_id = backfill
+
+    report = module.ServiceBackfill().run("test")
+
+    assert report["missing"] == 2
+    filters = [op._filter for op in services.operations]
+    assert {"_id": existing_id} in filters
+    assert {"og_service_name": "Dermatología"} in filters
+    assert not any(f.get("og_service_name") == "Pediatría" for f in filters)
@@ -0,0 +1,26 @@
+from utils.service_ids import pack_partner_service_ids, service_names_hash
+
+
+def test_pack_uses_ids_resolved_from_the_current_names():
+    names = ["Cardiología", "Pediatría"]
+    partner = {"partner_services": names, "partner_service_ids": [7, None],
+               "partner_service_names_hash": service_names_hash(names)}
+
+    ptr, ids = pack_partner_service_ids([partner])
+
+    assert ptr.tolist() == [0, 2]
+    assert ids.tolist() == [7, -1]
+
+
+def test_pack_ignores_ids_when_names_changed_at_the_same_length():
+    partner = {"partner_services": ["Dermatología", "Pediatría"], "partner_service_ids": [7, 9],
+               "partner_service_names_hash": service_names_hash(["Cardiología", "Pediatría"])}
+
+    _, ids = pack_partner_service_ids([partner])
+
+    assert ids.tolist() == [-1, -1]
+
+
+def test_names_hash_uses_the_normalized_names():
+    assert service_names_hash([" Pediatría "]) == service_names_hash(["pediatría"])
+    assert service_names_hash(["a", "b"]) != service_names_hash(["b", "a"])
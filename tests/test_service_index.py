@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from utils.embedding_store import ServiceEmbeddings
+from utils.ranking import RankingEngine
+from utils.service_index import BruteForceServiceIndex
+
+
+@pytest.fixture
+def engine():
+    service_embedding_map = {
+        "cardiologia": [1.0, 0.0, 0.0],
+        "pediatria": [0.0, 1.0, 0.0],
+        "dermatologia": [0.7, 0.7, 0.0],
+        "emergencias": [0.0, 0.0, 1.0],
+    }
+    partners = [
+        {"_id": "cardio", "partner_services": ["Cardiología", "cardiologia"]},
+        {"_id": "pedia", "partner_services": ["Pediatria"]},
+        {"_id": "derma", "partner_services": ["Dermatologia", "Pediatria"]},
+        {"_id": "urgencias", "partner_services": ["Emergencias"]},
+    ]
+    return RankingEngine(partners, ServiceEmbeddings.from_map(service_embedding_map))
+
+
+def test_brute_force_search_returns_the_nearest_services():
+    matrix = np.eye(4, dtype=np.float32)
+    query = np.array([0.1, 0.9, 0.0, 0.5], dtype=np.float32)
+
+    assert sorted(BruteForceServiceIndex(matrix).search(query, 2).tolist()) == [1, 3]
+    assert BruteForceServiceIndex(matrix).search(query, 9).tolist() == [0, 1, 2, 3]
+
+
+def test_candidates_are_the_owners_of_the_nearest_services(engine):
+    query = engine.normalize_query([0.0, 1.0, 0.0])
+
+    assert engine.candidate_partners(query, False, 1).tolist() == [1, 2]
+    assert engine.candidate_partners(query, True, 1).tolist() == [1, 2, 3]
+    assert engine.candidate_partners(query, False, 0) is None
+    assert engine.candidate_partners(query, False, 4) is None
+
+
+def test_candidates_keep_their_exhaustive_scores(engine):
+    query = engine.normalize_query([0.2, 1.0, 0.0])
+    candidates = engine.candidate_partners(query, False, 2)
+
+    pruned = engine.service_scores(query, False, candidates)
+    exhaustive = engine.service_scores(query, False)
+
+    np.testing.assert_allclose(pruned[candidates], exhaustive[candidates])
+    assert not pruned[np.setdiff1d(np.arange(4), candidates)].any()
+
+
+def test_hnsw_falls_back_to_brute_force_when_unavailable(db_tools, fresh_import, monkeypatch):
+    logs = []
+    db_tools.log_to_db = lambda level, message, extra: logs.append(message)
+    service_index = fresh_import("utils.service_index")
+
+    def unavailable(matrix):
+        raise ImportError("No module named 'hnswlib'")
+
+    monkeypatch.setattr(service_index, "HnswServiceIndex", unavailable)
+    index = service_index.build_service_index(np.eye(3, dtype=np.float32), "hnsw")
+
+    assert index.name == "brute"
+    assert logs == ["HNSW service index unavailable, using brute force"]
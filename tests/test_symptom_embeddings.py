@@ -0,0 +1,72 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from tests.fakes import FakeCollection
+
+
+@pytest.fixture
+def referral(db_tools, fresh_import, monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    collection = FakeCollection([{"sender_id": "50255550000", "symptoms": []}])
+
+    db_tools.ongoing_conversations = collection
+    db_tools.embedding_cache = MagicMock()
+    embedding_cache = fresh_import("utils.embedding_cache")
+    import utils.embedding_service as embedding_service
+
+    monkeypatch.setattr(embedding_cache, "PERSIST_EMBEDDINGS", False)
+
+    class Encoder:
+        model_key = "test-model"
+
+        async def encode(self, texts):
+            # Deterministic per text, so cache hits and fresh encodes agree
+            return np.stack([
+                np.random.default_rng(sum(map(ord, t))).normal(size=8).astype(np.float32) for t in texts
+            ])
+
+    encoder = Encoder()
+    monkeypatch.setattr(embedding_service, "_service", encoder)
+
+    symptom_embeddings = fresh_import("utils.symptom_embeddings")
+    medical_referral = fresh_import("utils.medical_referral")
+
+    monkeypatch.setattr(medical_referral, "INCREMENTAL_SYMPTOM_EMBEDDINGS", True)
+    monkeypatch.setattr(symptom_embeddings, "INCREMENTAL_SYMPTOM_EMBEDDINGS", True)
+    return medical_referral, symptom_embeddings, collection, encoder
+
+
+def test_stored_and_fallback_queries_are_the_same_vector(referral):
+    medical_referral, symptom_embeddings, collection, encoder = referral
+    symptoms = ["Fiebre", "dolor de cabeza", "fiebre", "tos"]
+    extracted = {"symptoms": ["cefalea"], "possible_services": ["medicina general"]}
+    query_chunks = [", ".join(symptoms), "cefalea", "medicina general"]
+
+    async def run():
+        # Symptoms saved over two turns, as the background task sees them
+        await symptom_embeddings.add_symptom_embeddings("50255550000", symptoms[:2])
+        await symptom_embeddings.add_symptom_embeddings("50255550000", symptoms)
+        stored = symptom_embeddings.stored_symptom_embedding(collection.docs[0], symptoms)
+        assert stored is not None and stored[0].dtype == np.float32
+
+        with_sum = await medical_referral.build_query_embedding(symptoms, query_chunks, extracted, stored, encoder)
+        # Referral that ran before the background task finished
+        fallback = await medical_referral.build_query_embedding(symptoms, query_chunks, extracted, None, encoder)
+        return with_sum, fallback
+
+    with_sum, fallback = asyncio.run(run())
+
+    np.testing.assert_allclose(with_sum, fallback, rtol=1e-6, atol=1e-7)
+
+
+def test_symptom_sum_is_stored_as_float32_bytes(referral):
+    _, symptom_embeddings, collection, _ = referral
+
+    asyncio.run(symptom_embeddings.add_symptom_embeddings("50255550000", ["fiebre", "tos"]))
+
+    state = collection.docs[0][symptom_embeddings.SYMPTOM_EMBEDDING_FIELD]
+    assert isinstance(state["sum"], bytes) and len(state["sum"]) == 8 * 4
+    assert state["count"] == 2
@@ -0,0 +1,48 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+
+@pytest.fixture
+def translation(db_tools, fresh_import, monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    logs = []
+    db_tools.translation_templates = MagicMock(**{"find_one.return_value": None})
+    db_tools.log_to_db = lambda level, message, extra: logs.append(message)
+    translation = fresh_import("utils.translation")
+
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        # Drops the placeholder, so the translation is rejected
+        message = MagicMock(content="Distancia desconocida")
+        return MagicMock(choices=[MagicMock(message=message)])
+
+    monkeypatch.setattr(translation.groq_client.chat.completions, "create", create)
+    return translation, calls, logs
+
+
+def test_rejected_translation_is_not_retried_within_the_ttl(translation):
+    module, calls, logs = translation
+    template = "Distance: {km} km"
+
+    first = asyncio.run(module.translate_template(template, "Spanish"))
+    second = asyncio.run(module.translate_template(template, "Spanish"))
+
+    assert first == second == template
+    assert len(calls) == 1
+    assert logs == ["Translated template rejected, using original"]
+
+
+def test_rejection_expires_and_is_logged_once(translation):
+    module, calls, logs = translation
+    template = "Distance: {km} km"
+
+    asyncio.run(module.translate_template(template, "Spanish"))
+    module._rejected_templates[("spanish", template)] = 0
+    asyncio.run(module.translate_template(template, "Spanish"))
+
+    assert len(calls) == 2
+    assert len(logs) == 1
@@ -6,8 +6,19 @@ from utils.symptoms import process_symptoms_message, request_symptoms
 from utils.medical_referral import provide_medical_referral
 from utils.whatsapp import send_text_message
 from utils.language import process_language_message
+from utils.outbound import outbound_turn
+from utils.context import conversation_scope, set_conversation_context, update_conversation_context
 
-async def handle_message(message): 
+async def handle_message(message):
+    sender_id = message["from"]
+    # The conversation state is loaded once and shared by every helper of the
+    # turn; everything sent back is translated in one batch and delivered in
+    # order when the turn ends.
+    with conversation_scope(sender_id):
+        async with outbound_turn(sender_id):
+            await _handle_message(message)
+
+async def _handle_message(message): 
     sender_id = message["from"]
     message_type = message.get("type", "text")
 
@@ -23,6 +34,8 @@ async def handle_message(message):
         if timeout_applied:
             conversation = get_conversation(sender_id)  # Refresh after reset so language/symptoms are null
 
+    set_conversation_context(sender_id, conversation)
+
     # Update last activity timestamp on every incoming message
     update_last_activity(sender_id)
 
@@ -40,6 +53,7 @@ async def handle_message(message):
             success = reset_conversation(sender_id)
             
             if success:
+                update_conversation_context(sender_id, language=None, symptoms=[], referral_count=0)
                 from utils.translation import send_translated_message
                 confirmation_msg = "Your conversation has been reset. All your previous information (symptoms, location, language) has been cleared. You can start fresh now!"
                 await send_translated_message(sender_id, confirmation_msg)
@@ -86,7 +100,7 @@ async def handle_message(message):
         location_data = {
             "lat": latitude,
             "lon": longitude,
-            "text_description": f"Coordinates {latitude}, {longitude}",
+            "text_description": describe_gps_location(latitude, longitude),
             "location_type": "gps"
         }
         
@@ -114,6 +128,7 @@ async def handle_message(message):
     
     # Refresh conversation
     conversation = get_conversation(sender_id=sender_id)
+    set_conversation_context(sender_id, conversation)
     
     # Check conditions
     has_location_now = has_location(conversation)
@@ -197,6 +212,25 @@ async def save_patient_data_from_gps(sender_id, conversation, location_data):
             "error": str(e)
         })
 
+def describe_gps_location(latitude, longitude):
+    """Readable area for a GPS pin from the offline gazetteer, coordinates otherwise."""
+    from utils.gazetteer import reverse_lookup_area
+
+    try:
+        area = reverse_lookup_area(float(latitude), float(longitude))
+    except Exception as e:
+        log_to_db("ERROR", "Error in reverse geocoding", {
+            "sender_id": None,
+            "lat": latitude,
+            "lon": longitude,
+            "error": str(e)
+        })
+        area = None
+
+    if area:
+        return f"Near {area} ({latitude}, {longitude})"
+    return f"Coordinates {latitude}, {longitude}"
+
 def has_symptoms(conversation): 
     symptoms = conversation.get("symptoms")
     if symptoms:
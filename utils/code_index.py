@@ -0,0 +1,234 @@
+import os
+import re
+import threading
+import time
+import unicodedata
+from datetime import datetime
+
+from utils.db_tools import db, log_to_db
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Seconds between checks of the version document (edits from other workers)
+CODE_INDEX_POLL_SECONDS = float(os.getenv("CODE_INDEX_POLL_SECONDS", "30"))
+
+# save_specialties / save_ichi bump this document in `catalog_versions`
+CODE_INDEX_VERSION_ID = "specialties"
+
+# A phrase shorter than this (in significant words) only matches a code whose
+# title is exactly that phrase: "dolor" or "fiebre" alone would otherwise match
+# every title containing the word
+CODE_MATCH_MIN_TERMS = int(os.getenv("CODE_MATCH_MIN_TERMS", "2"))
+
+# Title words too common to identify a code on their own
+STOPWORDS = frozenset({
+    "de", "del", "la", "las", "el", "los", "en", "y", "o", "u", "a", "al", "con", "sin",
+    "por", "para", "que", "se", "su", "sus", "un", "una", "otro", "otros", "otra", "otras",
+    "especificado", "especificada", "no", "sitio", "tipo", "of", "the", "and", "or", "with",
+})
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize_terms(text: str) -> frozenset[str]:
+    """'Dolor de cabeza, agudo' -> {'dolor', 'cabeza', 'agudo'} (accents and stopwords dropped)."""
+    text = unicodedata.normalize("NFKD", str(text or "").lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return frozenset(w for w in _WORD.findall(text) if len(w) > 2 and w not in STOPWORDS)
+
+
+class CodeIndex:
+    """
+    In-memory inverted index over the partners' curated CIE-11 (`cie`) and
+    ICHI (`ichi`) codes in the `specialties` collection.
+
+      - code_partners: "cie:BA00" / "ichi:XYZ" -> partner ids (str)
+      - code_terms:    code -> normalized words of its title
+      - term_codes:    normalized title word -> codes whose title contains it
+
+    A query phrase matches a code when its words are exactly the title's
+    words, or when it has at least CODE_MATCH_MIN_TERMS words and all of them
+    appear in the title. Matching is a handful of set intersections and needs
+    no embeddings. Rebuilt when specialties are saved through the API and, in
+    other workers, by a background thread watching the version document, so
+    lookups on the referral path never touch Mongo.
+    """
+
+    def __init__(self):
+        self.code_partners: dict[str, frozenset[str]] = {}
+        self.code_titles: dict[str, str] = {}
+        self.code_terms: dict[str, frozenset[str]] = {}
+        self.term_codes: dict[str, frozenset[str]] = {}
+        self.version = 0
+        self.loaded_at: datetime | None = None
+        self.load_seconds = 0.0
+        self._stored_version = None
+        self._lock = threading.Lock()
+        # Serializes rebuilds: first load, API saves and the watcher
+        self._rebuild_lock = threading.Lock()
+        self._watcher: threading.Thread | None = None
+
+    # -- loading ---------------------------------------------------------------
+
+    def rebuild(self, reason: str = "manual") -> int:
+        with self._rebuild_lock:
+            return self._rebuild(reason)
+
+    def _rebuild(self, reason: str) -> int:
+        start = time.perf_counter()
+        stored_version = self._read_stored_version()
+        code_partners: dict[str, set[str]] = {}
+        code_titles: dict[str, str] = {}
+        code_terms: dict[str, frozenset[str]] = {}
+        term_codes: dict[str, set[str]] = {}
+
+        for doc in db["specialties"].find({}, {"partner_id": 1, "cie": 1, "ichi": 1}):
+            partner_id = str(doc.get("partner_id") or "")
+            if not partner_id:
+                continue
+            for system in ("cie", "ichi"):
+                for item in doc.get(system) or []:
+                    if not isinstance(item, dict) or not item.get("code"):
+                        continue
+                    code = f"{system}:{str(item['code']).strip().upper()}"
+                    code_partners.setdefault(code, set()).add(partner_id)
+                    title = str(item.get("title") or "")
+                    if title and code not in code_titles:
+                        code_titles[code] = title
+                        code_terms[code] = normalize_terms(title)
+                        for term in code_terms[code]:
+                            term_codes.setdefault(term, set()).add(code)
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.code_partners = {c: frozenset(p) for c, p in code_partners.items()}
+            self.code_titles = code_titles
+            self.code_terms = code_terms
+            self.term_codes = {t: frozenset(c) for t, c in term_codes.items()}
+            self.version += 1
+            self.loaded_at = datetime.utcnow()
+            self.load_seconds = elapsed
+            self._stored_version = stored_version
+
+        log_to_db("INFO", "Code index rebuilt", {
+            "sender_id": None,
+            "reason": reason,
+            "codes": len(code_partners),
+            "terms": len(term_codes),
+            "version": self.version,
+            "load_ms": round(elapsed * 1000, 1),
+        })
+        return len(code_partners)
+
+    @staticmethod
+    def _read_stored_version():
+        doc = db["catalog_versions"].find_one({"_id": CODE_INDEX_VERSION_ID})
+        return doc.get("version") if doc else None
+
+    def ensure_loaded(self) -> None:
+        """Blocking first load (warmup, scripts); the referral path never waits on it."""
+        if self.loaded_at is None:
+            with self._rebuild_lock:
+                if self.loaded_at is None:
+                    self._rebuild("initial")
+
+    def start_watcher(self) -> None:
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        with self._lock:
+            if self._watcher is not None and self._watcher.is_alive():
+                return
+            self._watcher = threading.Thread(target=self._watch, name="code-index-watcher", daemon=True)
+            self._watcher.start()
+
+    def _watch(self) -> None:
+        """Load if needed, then re-read the version document every poll interval."""
+        while True:
+            try:
+                if self.loaded_at is None:
+                    self.ensure_loaded()
+                elif self._read_stored_version() != self._stored_version:
+                    self.rebuild("version_changed")
+            except Exception as e:
+                log_to_db("ERROR", "Error checking code index version", {
+                    "sender_id": None,
+                    "error": str(e),
+                })
+            time.sleep(CODE_INDEX_POLL_SECONDS)
+
+    # -- lookups ---------------------------------------------------------------
+
+    def match_codes(self, phrases: list[str]) -> set[str]:
+        """
+        Codes whose title words equal a phrase's significant words, or contain
+        all of them when the phrase has at least CODE_MATCH_MIN_TERMS words.
+        """
+        term_codes, code_terms = self.term_codes, self.code_terms
+        matched: set[str] = set()
+        for phrase in phrases:
+            terms = normalize_terms(phrase)
+            if not terms:
+                continue
+            postings = sorted((term_codes.get(t, frozenset()) for t in terms), key=len)
+            codes = set(postings[0])
+            for posting in postings[1:]:
+                if not codes:
+                    break
+                codes &= posting
+            if len(terms) < CODE_MATCH_MIN_TERMS:
+                # Too generic on its own: only the code named exactly by it
+                codes = {c for c in codes if code_terms.get(c) == terms}
+            matched |= codes
+        return matched
+
+    def partners_for_codes(self, codes) -> set[str]:
+        code_partners = self.code_partners
+        partners: set[str] = set()
+        for code in codes:
+            partners |= code_partners.get(code, frozenset())
+        return partners
+
+    def match_partners(self, phrases: list[str]) -> tuple[set[str], set[str]]:
+        """(matched codes, partner ids curating any of them) for the query phrases."""
+        codes = self.match_codes(phrases)
+        return codes, self.partners_for_codes(codes)
+
+    def stats(self) -> dict:
+        return {
+            "codes": len(self.code_partners),
+            "cie_codes": sum(1 for c in self.code_partners if c.startswith("cie:")),
+            "ichi_codes": sum(1 for c in self.code_partners if c.startswith("ichi:")),
+            "terms": len(self.term_codes),
+            "partners": len({p for ps in self.code_partners.values() for p in ps}),
+            "version": self.version,
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+            "load_ms": round(self.load_seconds * 1000, 1),
+        }
+
+
+_index = CodeIndex()
+
+
+def get_code_index() -> CodeIndex:
+    """The shared index; empty (no matches) until the watcher's first load finishes."""
+    _index.start_watcher()
+    return _index
+
+
+def refresh_code_index(reason: str) -> None:
+    """Rebuild this worker's index right away and notify the others."""
+    try:
+        db["catalog_versions"].update_one(
+            {"_id": CODE_INDEX_VERSION_ID},
+            {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True,
+        )
+        _index.rebuild(reason)
+    except Exception as e:
+        log_to_db("ERROR", "Error rebuilding code index", {
+            "sender_id": None,
+            "reason": reason,
+            "error": str(e),
+        })
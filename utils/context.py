@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Conversation state loaded once at the start of a webhook turn. Send helpers
+# read the language from here instead of fetching the whole conversation
+# document (transcript included) before every outbound message.
+_conversation_context: ContextVar[dict | None] = ContextVar("conversation_context", default=None)
+
+
+def get_conversation_context(sender_id: str) -> dict | None:
+    """Return the conversation loaded for this turn, if it belongs to sender_id."""
+    context = _conversation_context.get()
+    if context is not None and context.get("sender_id") == sender_id:
+        return context
+    return None
+
+
+def set_conversation_context(sender_id: str, conversation: dict | None) -> None:
+    """Replace the turn's conversation state (e.g. after a refresh from Mongo)."""
+    context = _conversation_context.get()
+    if context is None or context.get("sender_id") != sender_id:
+        return
+    context.clear()
+    context.update(conversation or {})
+    context["sender_id"] = sender_id
+
+
+def update_conversation_context(sender_id: str, **fields) -> None:
+    """Mirror a write made to ongoing_conversations into the turn's state."""
+    context = get_conversation_context(sender_id)
+    if context is not None:
+        context.update(fields)
+
+
+@contextmanager
+def conversation_scope(sender_id: str, conversation: dict | None = None):
+    """Make the conversation state available to every helper called in the block."""
+    context = dict(conversation or {})
+    context["sender_id"] = sender_id
+    token = _conversation_context.set(context)
+    try:
+        yield context
+    finally:
+        _conversation_context.reset(token)
@@ -17,6 +17,9 @@ patients = db["patients"]
 partners = db["partners"]
 referrals = db["referrals"]
 feedback_conversations = db["feedback_conversations"]
+translation_templates = db["translation_templates"]
+geocode_cache = db["geocode_cache"]
+embedding_cache = db["embedding_cache"]
 
 def log_to_db(level, message, extra_data=None):
     try:
@@ -59,6 +62,7 @@ def new_conversation(sender_id):
     new_conversation = {
         "sender_id": sender_id,
         "symptoms": [],
+        "symptom_embedding": None,
         "location": {"lat": None, "lon": None, "text_description": None},
         "language": None,
         "messages": [],
@@ -113,6 +117,7 @@ def reset_conversation(sender_id):
             {
                 "$set": {
                     "symptoms": [],
+                    "symptom_embedding": None,
                     "location": {"lat": None, "lon": None, "text_description": None},
                     "language": None,
                     "recommendation": None,
@@ -290,6 +295,7 @@ def reset_symptoms_only(sender_id):
             {
                 "$set": {
                     "symptoms": [],
+                    "symptom_embedding": None,
                     "recommendation": None,
                     "referral_provided": False,
                     "waiting_for_another_referral": False
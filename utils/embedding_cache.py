@@ -0,0 +1,184 @@
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from utils.db_tools import log_to_db, embedding_cache
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+LRU_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "4096"))
+# Persist chunk vectors in Mongo so they survive restarts and are shared by workers
+PERSIST_EMBEDDINGS = os.getenv("EMBEDDING_CACHE_PERSIST", "true").lower() in ("1", "true", "yes")
+PERSISTED_TTL = timedelta(days=180)
+
+# ---------------------------------------------------------------------------
+# State
+# ---------------------------------------------------------------------------
+
+# (model_name, normalized_text) -> read-only float32 vector
+_lru: "OrderedDict[tuple[str, str], np.ndarray]" = OrderedDict()
+_lock = threading.Lock()
+_indexes_ready = False
+
+_stats = {
+    "lru_hits": 0,
+    "mongo_hits": 0,
+    "misses": 0,
+    "encoded_batches": 0,
+}
+
+
+def normalize_chunk(text: str) -> str:
+    """
+    '  Dolor  de MUELAS. ' -> 'dolor de muelas'. Only the cache key: the
+    encoder is given the text as written.
+    """
+    text = unicodedata.normalize("NFC", str(text or ""))
+    text = re.sub(r"\s+", " ", text.lower()).strip()
+    return text.strip(" .,;:")
+
+
+def _ensure_indexes() -> None:
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    try:
+        embedding_cache.create_index([("model", 1), ("text", 1)], unique=True)
+        embedding_cache.create_index("expires_at", expireAfterSeconds=0)
+        _indexes_ready = True
+    except Exception as e:
+        log_to_db("ERROR", "Error creating embedding cache indexes", {
+            "sender_id": None,
+            "error": str(e),
+        })
+
+
+def _remember(key: tuple[str, str], vector: np.ndarray) -> None:
+    with _lock:
+        _lru[key] = vector
+        _lru.move_to_end(key)
+        while len(_lru) > LRU_MAX_ENTRIES:
+            _lru.popitem(last=False)
+
+
+def _load_persisted(model_name: str, texts: list[str]) -> dict[str, np.ndarray]:
+    if not PERSIST_EMBEDDINGS or not texts:
+        return {}
+    try:
+        docs = embedding_cache.find(
+            {"model": model_name, "text": {"$in": texts}, "expires_at": {"$gt": datetime.utcnow()}},
+            {"text": 1, "vector": 1},
+        )
+        found = {}
+        for doc in docs:
+            vector = np.frombuffer(bytes(doc["vector"]), dtype=np.float32)
+            vector.setflags(write=False)
+            found[doc["text"]] = vector
+        return found
+    except Exception as e:
+        log_to_db("ERROR", "Error reading embedding cache", {
+            "sender_id": None,
+            "error": str(e),
+        })
+        return {}
+
+
+def _persist(model_name: str, vectors: dict[str, np.ndarray]) -> None:
+    if not PERSIST_EMBEDDINGS or not vectors:
+        return
+    from pymongo import UpdateOne
+
+    _ensure_indexes()
+    now = datetime.utcnow()
+    try:
+        embedding_cache.bulk_write([
+            UpdateOne(
+                {"model": model_name, "text": text},
+                {"$set": {
+                    "model": model_name,
+                    "text": text,
+                    "dim": int(vector.shape[0]),
+                    "vector": np.ascontiguousarray(vector, dtype=np.float32).tobytes(),
+                    "expires_at": now + PERSISTED_TTL,
+                    "updated_at": now,
+                }},
+                upsert=True,
+            )
+            for text, vector in vectors.items()
+        ], ordered=False)
+    except Exception as e:
+        log_to_db("ERROR", "Error writing embedding cache", {
+            "sender_id": None,
+            "error": str(e),
+        })
+
+
+async def embed_texts(texts: list[str], model_name: str, encode) -> np.ndarray:
+    """
+    Embed each text (one row per input, duplicates included) using cached
+    chunk vectors; only chunks never seen before are passed to `encode`
+    (an async callable, e.g. EmbeddingService.encode), in a single batch.
+
+    Texts are cached under their normalized form but encoded as written, so
+    spellings that differ only in case, spacing or trailing punctuation share
+    the vector of whichever one was encoded first.
+    """
+    keys = [normalize_chunk(t) for t in texts]
+    # First spelling seen for each key is the one sent to the encoder
+    originals: dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        originals.setdefault(key, str(text).strip())
+    unique = list(originals)
+    vectors: dict[str, np.ndarray] = {}
+
+    with _lock:
+        for text in unique:
+            vector = _lru.get((model_name, text))
+            if vector is not None:
+                _lru.move_to_end((model_name, text))
+                vectors[text] = vector
+        _stats["lru_hits"] += len(vectors)
+
+    missing = [t for t in unique if t not in vectors]
+    persisted = _load_persisted(model_name, missing)
+    for text, vector in persisted.items():
+        _remember((model_name, text), vector)
+    vectors.update(persisted)
+
+    missing = [t for t in missing if t not in vectors]
+    if missing:
+        encoded = np.asarray(await encode([originals[t] for t in missing]), dtype=np.float32)
+        encoded = encoded.reshape(len(missing), -1)
+        fresh = {}
+        for text, vector in zip(missing, encoded):
+            vector = vector.copy()
+            vector.setflags(write=False)
+            fresh[text] = vector
+            _remember((model_name, text), vector)
+        vectors.update(fresh)
+        _persist(model_name, fresh)
+
+    with _lock:
+        _stats["mongo_hits"] += len(persisted)
+        _stats["misses"] += len(missing)
+        _stats["encoded_batches"] += bool(missing)
+
+    return np.stack([vectors[k] for k in keys]) if keys else np.zeros((0, 0), dtype=np.float32)
+
+
+def get_embedding_cache_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+        stats["lru_size"] = len(_lru)
+    lookups = stats["lru_hits"] + stats["mongo_hits"] + stats["misses"]
+    stats["lookups"] = lookups
+    stats["hit_rate"] = round((stats["lru_hits"] + stats["mongo_hits"]) / lookups, 4) if lookups else 0.0
+    stats["persist"] = PERSIST_EMBEDDINGS
+    return stats
@@ -0,0 +1,203 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Most texts encoded in one model call (a single request is never split)
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "32"))
+# How long the first request of a batch waits for others to join
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))
+
+# Batches kept for the latency/batch-size metrics
+METRICS_WINDOW = 1000
+
+
+class _Request:
+    __slots__ = ("texts", "future", "enqueued_at")
+
+    def __init__(self, texts: list[str], future: asyncio.Future):
+        self.texts = texts
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class EmbeddingService:
+    """
+    Runs SentenceTransformer inference on a dedicated thread so the event loop
+    keeps serving webhooks while a query is encoded.
+
+    Requests that arrive within EMBEDDING_MAX_WAIT_MS of the first queued one
+    are merged into a single `encode` call of up to EMBEDDING_MAX_BATCH_SIZE
+    texts, and each caller gets its own rows back.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE,
+        max_wait_ms: float = EMBEDDING_MAX_WAIT_MS,
+    ):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        # One thread: torch already parallelizes a single encode across cores
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._metrics_lock = threading.Lock()
+        self._batches: deque = deque(maxlen=METRICS_WINDOW)
+        self._queue_ms: deque = deque(maxlen=METRICS_WINDOW)
+        self._totals = {"requests": 0, "texts": 0, "batches": 0, "errors": 0}
+
+    # -- public API ------------------------------------------------------------
+
+    async def encode(self, texts: list[str]) -> np.ndarray:
+        """Embed texts (one float32 row each) through the shared batcher."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Request(list(texts), future))
+        return await future
+
+    @property
+    def model_key(self) -> str:
+        """Embedding-cache key of the encoder this service runs."""
+        from utils.medical_referral import get_embedding_model_key
+
+        return get_embedding_model_key()
+
+    def encode_sync(self, texts: list[str]) -> np.ndarray:
+        """Blocking encode on the inference thread, for background jobs (bypasses the batcher)."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._executor.submit(self._encode_batch, list(texts)).result()
+
+    def warm_up(self) -> None:
+        """Load the model on the inference thread (blocking)."""
+        self._executor.submit(self._encode_batch, ["warm up"]).result()
+
+    # -- batching --------------------------------------------------------------
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _collect(self, first: _Request) -> tuple[list[_Request], _Request | None]:
+        batch, size = [first], len(first.texts)
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            if size + len(request.texts) > self.max_batch_size:
+                return batch, request
+            batch.append(request)
+            size += len(request.texts)
+        return batch, None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        carry: _Request | None = None
+        while True:
+            first = carry or await self._queue.get()
+            batch, carry = await self._collect(first)
+            started = time.perf_counter()
+            texts = [t for request in batch for t in request.texts]
+
+            try:
+                vectors = await loop.run_in_executor(self._executor, self._encode_batch, texts)
+            except Exception as e:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                with self._metrics_lock:
+                    self._totals["errors"] += 1
+                continue
+
+            offset = 0
+            for request in batch:
+                rows = vectors[offset:offset + len(request.texts)]
+                offset += len(request.texts)
+                if not request.future.done():
+                    request.future.set_result(rows)
+
+            self._record(batch, len(texts), started, time.perf_counter())
+
+    @staticmethod
+    def _encode_batch(texts: list[str]) -> np.ndarray:
+        from utils.medical_referral import get_embedding_model
+
+        vectors = get_embedding_model().encode(texts, convert_to_numpy=True)
+        return np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+
+    # -- metrics ---------------------------------------------------------------
+
+    def _record(self, batch: list[_Request], n_texts: int, started: float, finished: float) -> None:
+        with self._metrics_lock:
+            self._batches.append((len(batch), n_texts, (finished - started) * 1000))
+            self._queue_ms.extend((started - r.enqueued_at) * 1000 for r in batch)
+            self._totals["requests"] += len(batch)
+            self._totals["texts"] += n_texts
+            self._totals["batches"] += 1
+
+    def stats(self) -> dict:
+        with self._metrics_lock:
+            batches = list(self._batches)
+            queue_ms = np.asarray(self._queue_ms, dtype=np.float64)
+            totals = dict(self._totals)
+
+        def percentile(values, q):
+            return round(float(np.percentile(values, q)), 3) if len(values) else None
+
+        requests_per_batch = np.asarray([b[0] for b in batches], dtype=np.float64)
+        texts_per_batch = np.asarray([b[1] for b in batches], dtype=np.float64)
+        encode_ms = np.asarray([b[2] for b in batches], dtype=np.float64)
+        return {
+            **totals,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "window_batches": len(batches),
+            "queue_ms_p50": percentile(queue_ms, 50),
+            "queue_ms_p95": percentile(queue_ms, 95),
+            "encode_ms_p50": percentile(encode_ms, 50),
+            "encode_ms_p95": percentile(encode_ms, 95),
+            "requests_per_batch_mean": round(float(requests_per_batch.mean()), 2) if len(batches) else None,
+            "texts_per_batch_mean": round(float(texts_per_batch.mean()), 2) if len(batches) else None,
+            "texts_per_batch_max": int(texts_per_batch.max()) if len(batches) else None,
+        }
+
+
+_service = None
+
+
+def get_embedding_service():
+    """
+    The process-wide encoder: a local EmbeddingService, or a client of the
+    shared embedding sidecar when EMBEDDING_SIDECAR_SOCKET is set (see
+    utils.embedding_sidecar). Both expose `encode`, `model_key` and `stats`.
+    """
+    global _service
+    if _service is None:
+        socket_path = os.getenv("EMBEDDING_SIDECAR_SOCKET")
+        if socket_path:
+            from utils.embedding_sidecar import SidecarClient
+
+            _service = SidecarClient(socket_path)
+        else:
+            _service = EmbeddingService()
+    return _service
@@ -0,0 +1,337 @@
+"""
+Local embedding sidecar shared by every uvicorn worker on a host.
+
+The sidecar loads the sentence encoder once, serves batched `encode`
+requests over a Unix socket and publishes the L2-normalized
+service matrix as an .npy file that workers map read-only (the page cache is
+shared, so N workers hold one copy).
+
+    python -m utils.embedding_sidecar --socket /tmp/embedding-sidecar.sock
+
+Workers use it when EMBEDDING_SIDECAR_SOCKET points at that socket.
+
+Wire format (both directions): a frame is
+    >II  header_len, body_len
+    header (UTF-8 JSON), body (raw bytes, e.g. a float32 array)
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import struct
+import time
+
+import numpy as np
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+DEFAULT_SOCKET = "/tmp/embedding-sidecar.sock"
+DEFAULT_PUBLISH_DIR = "/tmp/embedding-sidecar"
+# Published matrix versions kept on disk (older ones may still be mapped)
+KEEP_PUBLISHED_VERSIONS = 3
+SIDECAR_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_SIDECAR_TIMEOUT_SECONDS", "10"))
+
+_FRAME = struct.Struct(">II")
+
+
+# ---------------------------------------------------------------------------
+# Framing
+# ---------------------------------------------------------------------------
+
+def pack_frame(header: dict, body: bytes = b"") -> bytes:
+    raw = json.dumps(header).encode("utf-8")
+    return _FRAME.pack(len(raw), len(body)) + raw + body
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple[dict, bytes]:
+    header_len, body_len = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+    header = json.loads(await reader.readexactly(header_len))
+    body = await reader.readexactly(body_len) if body_len else b""
+    return header, body
+
+
+def _recv_exactly(sock: socket.socket, n: int) -> bytes:
+    chunks, remaining = [], n
+    while remaining:
+        chunk = sock.recv(remaining)
+        if not chunk:
+            raise ConnectionError("embedding sidecar closed the connection")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def _array_frame(array: np.ndarray) -> bytes:
+    array = np.ascontiguousarray(array, dtype=np.float32)
+    return pack_frame({"ok": True, "shape": list(array.shape), "dtype": "float32"}, array.tobytes())
+
+
+def _decode_array(header: dict, body: bytes) -> np.ndarray:
+    if not header.get("ok"):
+        raise RuntimeError(f"embedding sidecar error: {header.get('error')}")
+    return np.frombuffer(body, dtype=np.float32).reshape(header["shape"])
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+class EmbeddingSidecar:
+    def __init__(self, socket_path: str, publish_dir: str, poll_seconds: float):
+        from utils.embedding_service import EmbeddingService
+
+        self.socket_path = socket_path
+        self.publish_dir = publish_dir
+        self.poll_seconds = poll_seconds
+        self._stored_version = None
+        self.service = EmbeddingService()
+        self.services = None
+        self.published: dict | None = None
+        self.started_at = time.time()
+
+    # -- service matrix ----------------------------------------------------------
+
+    def publish(self, snapshot) -> dict:
+        """Write the snapshot as <version>.npy + names, atomically, and drop old versions."""
+        os.makedirs(self.publish_dir, exist_ok=True)
+        matrix_path = os.path.join(self.publish_dir, f"services-{snapshot.version}.npy")
+        names_path = os.path.join(self.publish_dir, f"services-{snapshot.version}.json")
+        if not os.path.exists(matrix_path):
+            tmp = matrix_path + ".tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(snapshot.matrix, dtype=np.float32))
+            os.replace(tmp, matrix_path)
+            ids = snapshot.service_ids.tolist() if snapshot.service_ids is not None else None
+            with open(names_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"names": snapshot.names, "service_ids": ids}, f, ensure_ascii=False)
+            os.replace(names_path + ".tmp", names_path)
+
+        published = sorted(
+            (os.path.join(self.publish_dir, n) for n in os.listdir(self.publish_dir) if n.endswith(".npy")),
+            key=os.path.getmtime,
+            reverse=True,
+        )
+        for old in published[KEEP_PUBLISHED_VERSIONS:]:
+            for path in (old, old[:-4] + ".json"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        self.services = snapshot
+        self.published = {
+            "version": snapshot.version,
+            "matrix_path": matrix_path,
+            "names_path": names_path,
+            "services": len(snapshot),
+            "dim": snapshot.dim,
+            "loaded_at": snapshot.loaded_at.isoformat(),
+        }
+        return self.published
+
+    async def refresh_services(self) -> None:
+        from utils.embedding_store import ServiceEmbeddings, read_services_version
+
+        self._stored_version = await asyncio.to_thread(read_services_version)
+        snapshot = await asyncio.to_thread(ServiceEmbeddings.load_from_db)
+        if self.services is None or snapshot.version != self.services.version:
+            await asyncio.to_thread(self.publish, snapshot)
+
+    async def _refresh_loop(self) -> None:
+        """Reload when the services version document changes (same trigger as the workers)."""
+        from utils.db_tools import log_to_db
+        from utils.embedding_store import read_services_version
+
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                if await asyncio.to_thread(read_services_version) != self._stored_version:
+                    await self.refresh_services()
+            except Exception as e:
+                log_to_db("ERROR", "Embedding sidecar could not refresh services", {
+                    "sender_id": None,
+                    "error": str(e),
+                })
+
+    # -- requests ----------------------------------------------------------------
+
+    async def handle_request(self, header: dict) -> bytes:
+        op = header.get("op")
+        if op == "encode":
+            return _array_frame(await self.service.encode(header.get("texts") or []))
+        if op == "info":
+            from utils.medical_referral import get_embedding_model_key
+
+            return pack_frame({"ok": True, "model_key": get_embedding_model_key(), **(self.published or {})})
+        if op == "stats":
+            return pack_frame({
+                "ok": True,
+                "uptime_s": round(time.time() - self.started_at, 1),
+                "services_version": self.published["version"] if self.published else None,
+                **self.service.stats(),
+            })
+        if op == "reload":
+            await self.refresh_services()
+            return pack_frame({"ok": True, **(self.published or {})})
+        return pack_frame({"ok": False, "error": f"unknown op {op!r}"})
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    header, _ = await read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                try:
+                    response = await self.handle_request(header)
+                except Exception as e:
+                    response = pack_frame({"ok": False, "error": str(e)})
+                writer.write(response)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        from utils.db_tools import log_to_db
+
+        await asyncio.to_thread(self.service.warm_up)
+        await self.refresh_services()
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        if self.poll_seconds:
+            asyncio.get_running_loop().create_task(self._refresh_loop())
+
+        log_to_db("INFO", "Embedding sidecar listening", {
+            "sender_id": None,
+            "socket": self.socket_path,
+            "services": len(self.services),
+            "version": self.services.version,
+        })
+        async with server:
+            await server.serve_forever()
+
+
+# ---------------------------------------------------------------------------
+# Client (used by the app workers)
+# ---------------------------------------------------------------------------
+
+class SidecarClient:
+    """
+    Talks to the sidecar in place of a local EmbeddingService: same
+    `encode(texts)` coroutine, `model_key` and `stats()`.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = SIDECAR_TIMEOUT_SECONDS):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._model_key: str | None = None
+
+    async def _request(self, header: dict) -> tuple[dict, bytes]:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_unix_connection(self.socket_path), timeout=self.timeout,
+        )
+        try:
+            writer.write(pack_frame(header))
+            await writer.drain()
+            return await asyncio.wait_for(read_frame(reader), timeout=self.timeout)
+        finally:
+            writer.close()
+
+    def request_sync(self, header: dict) -> tuple[dict, bytes]:
+        """Blocking variant for code running outside the event loop (store reloads)."""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            sock.sendall(pack_frame(header))
+            header_len, body_len = _FRAME.unpack(_recv_exactly(sock, _FRAME.size))
+            response = json.loads(_recv_exactly(sock, header_len))
+            body = _recv_exactly(sock, body_len) if body_len else b""
+        if not response.get("ok"):
+            raise RuntimeError(f"embedding sidecar error: {response.get('error')}")
+        return response, body
+
+    async def encode(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return _decode_array(*await self._request({"op": "encode", "texts": list(texts)}))
+
+    def encode_sync(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return _decode_array(*self.request_sync({"op": "encode", "texts": list(texts)}))
+
+    def info(self) -> dict:
+        """Blocking; for threads only (store loads). Coroutines use fetch_info()."""
+        info = self.request_sync({"op": "info"})[0]
+        self._model_key = info["model_key"]
+        return info
+
+    async def fetch_info(self) -> dict:
+        info, _ = await self._request({"op": "info"})
+        if not info.get("ok"):
+            raise RuntimeError(f"embedding sidecar error: {info.get('error')}")
+        self._model_key = info["model_key"]
+        return info
+
+    @property
+    def model_key(self) -> str:
+        # Fetched by the readiness warmup (fetch_info) before traffic arrives;
+        # the blocking call is only a fallback for workers started without it
+        if self._model_key is None:
+            self.info()
+        return self._model_key
+
+    def stats(self) -> dict:
+        """Blocking; served from a sync endpoint, so it runs in the threadpool."""
+        try:
+            remote = self.request_sync({"op": "stats"})[0]
+        except Exception as e:
+            return {"mode": "sidecar", "socket": self.socket_path, "error": str(e)}
+        remote.pop("ok", None)
+        return {"mode": "sidecar", "socket": self.socket_path, **remote}
+
+
+def load_shared_service_embeddings():
+    """Map the sidecar's published service matrix (read-only, zero-copy)."""
+    from utils.embedding_service import get_embedding_service
+    from utils.embedding_store import ServiceEmbeddings
+
+    start = time.perf_counter()
+    client = get_embedding_service()
+    if not isinstance(client, SidecarClient):
+        client = SidecarClient(os.environ["EMBEDDING_SIDECAR_SOCKET"])
+    info = client.info()
+    matrix = np.load(info["matrix_path"], mmap_mode="r")
+    with open(info["names_path"], encoding="utf-8") as f:
+        published = json.load(f)
+    return ServiceEmbeddings(
+        published["names"],
+        matrix,
+        load_seconds=time.perf_counter() - start,
+        version=info["version"],
+        normalized=True,
+        service_ids=published["service_ids"],
+    )
+
+
+def main():
+    from utils.embedding_store import SERVICE_EMBEDDINGS_POLL_SECONDS
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=os.getenv("EMBEDDING_SIDECAR_SOCKET", DEFAULT_SOCKET))
+    parser.add_argument("--publish-dir", default=os.getenv("EMBEDDING_SIDECAR_DIR", DEFAULT_PUBLISH_DIR))
+    parser.add_argument("--poll-seconds", type=float, default=SERVICE_EMBEDDINGS_POLL_SECONDS)
+    args = parser.parse_args()
+
+    sidecar = EmbeddingSidecar(args.socket, args.publish_dir, args.poll_seconds)
+    asyncio.run(sidecar.serve())
+
+
+if __name__ == "__main__":
+    main()
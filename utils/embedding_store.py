@@ -0,0 +1,311 @@
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Seconds between checks of the services version document (reloads made by
+# other workers or the sidecar); 0 disables the watcher
+SERVICE_EMBEDDINGS_POLL_SECONDS = float(os.getenv("SERVICE_EMBEDDINGS_POLL_SECONDS", "30"))
+
+# reload_service_embeddings bumps this document in `catalog_versions`
+SERVICES_VERSION_ID = "services"
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms != 0)
+
+
+class ServiceEmbeddings:
+    """
+    Immutable snapshot of the `services` embeddings:
+      - names:  og_service_name (stripped, lowercased) per row
+      - index:  name -> row
+      - matrix: contiguous, L2-normalized float32 (n_services, dim)
+      - service_ids: int32 `service_id` per row (-1 if unassigned), or None
+      - version: content hash of names + ids + vectors. It only labels the
+        snapshot (published files, logs, cache keys); when to reload is
+        decided by the services version document, see ServiceEmbeddingStore.
+    """
+
+    def __init__(
+        self,
+        names: list[str],
+        vectors: np.ndarray,
+        loaded_at: datetime | None = None,
+        load_seconds: float = 0.0,
+        version: str | None = None,
+        normalized: bool = False,
+        service_ids=None,
+    ):
+        self.names = names
+        self.index: dict[str, int] = {name: row for row, name in enumerate(names)}
+        self.service_ids = None if service_ids is None else np.asarray(service_ids, dtype=np.int32)
+        self._row_of_id: np.ndarray | None = None
+        if normalized:
+            # Already L2-normalized float32 (e.g. the sidecar's mmapped .npy): no copy
+            self.matrix = vectors
+        else:
+            matrix = np.asarray(vectors, dtype=np.float32)
+            if matrix.ndim != 2:
+                matrix = matrix.reshape(len(names), -1)
+            self.matrix = np.ascontiguousarray(_normalize_rows(matrix))
+            self.matrix.setflags(write=False)
+
+        if version is None:
+            digest = hashlib.sha1()
+            digest.update("\n".join(names).encode("utf-8"))
+            if self.service_ids is not None:
+                digest.update(self.service_ids.tobytes())
+            digest.update(self.matrix.tobytes())
+            version = digest.hexdigest()[:16]
+        self.version = version
+        self.loaded_at = loaded_at or datetime.utcnow()
+        self.load_seconds = load_seconds
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def dim(self) -> int:
+        return int(self.matrix.shape[1]) if self.matrix.ndim == 2 else 0
+
+    def rows_for_ids(self, ids: np.ndarray) -> np.ndarray:
+        """Matrix row of each service_id (-1 for unknown ids or -1 entries)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.service_ids is None:
+            return np.full(ids.shape, -1, dtype=np.int64)
+        if self._row_of_id is None:
+            assigned = self.service_ids >= 0
+            size = int(self.service_ids.max()) + 1 if assigned.any() else 0
+            row_of_id = np.full(size, -1, dtype=np.int64)
+            row_of_id[self.service_ids[assigned]] = np.flatnonzero(assigned)
+            self._row_of_id = row_of_id
+        rows = np.full(ids.shape, -1, dtype=np.int64)
+        known = (ids >= 0) & (ids < len(self._row_of_id))
+        rows[known] = self._row_of_id[ids[known]]
+        return rows
+
+    @classmethod
+    def from_map(cls, embedding_map: dict[str, np.ndarray], **kwargs) -> "ServiceEmbeddings":
+        names = list(embedding_map)
+        if names:
+            vectors = np.stack([np.asarray(embedding_map[n], dtype=np.float32) for n in names])
+        else:
+            vectors = np.zeros((0, 0), dtype=np.float32)
+        return cls(names, vectors, **kwargs)
+
+    @classmethod
+    def load(cls) -> "ServiceEmbeddings":
+        """
+        Read every service embedding: from the embedding sidecar's shared
+        matrix when EMBEDDING_SIDECAR_SOCKET is set, otherwise from MongoDB.
+        """
+        if os.getenv("EMBEDDING_SIDECAR_SOCKET"):
+            from utils.embedding_sidecar import load_shared_service_embeddings
+
+            return load_shared_service_embeddings()
+        return cls.load_from_db()
+
+    @classmethod
+    def load_from_db(cls) -> "ServiceEmbeddings":
+        """Read every service embedding from MongoDB."""
+        from utils.db_tools import db
+
+        start = time.perf_counter()
+        embedding_map: dict[str, np.ndarray] = {}
+        id_map: dict[str, int] = {}
+        for item in db["services"].find({}, {"og_service_name": 1, "embedding": 1, "service_id": 1}):
+            name = str(item.get("og_service_name", "")).strip().lower()
+            emb = item.get("embedding")
+            if name and isinstance(emb, list) and emb:
+                embedding_map[name] = np.asarray(emb, dtype=np.float32)
+                id_map[name] = int(item["service_id"]) if item.get("service_id") is not None else -1
+        return cls.from_map(
+            embedding_map,
+            load_seconds=time.perf_counter() - start,
+            service_ids=[id_map[name] for name in embedding_map],
+        )
+
+    def stats(self) -> dict:
+        return {
+            "services": len(self),
+            "dim": self.dim,
+            "version": self.version,
+            "loaded_at": self.loaded_at.isoformat(),
+            "load_ms": round(self.load_seconds * 1000, 1),
+            "matrix_bytes": int(self.matrix.nbytes),
+        }
+
+
+def read_services_version():
+    from utils.db_tools import db
+
+    doc = db["catalog_versions"].find_one({"_id": SERVICES_VERSION_ID})
+    return doc.get("version") if doc else None
+
+
+def bump_services_version() -> None:
+    """Tell the other workers (and the sidecar) that `services` changed."""
+    from utils.db_tools import db
+
+    db["catalog_versions"].update_one(
+        {"_id": SERVICES_VERSION_ID},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+class ServiceEmbeddingStore:
+    """
+    Holds the current ServiceEmbeddings snapshot. Reloads build a new snapshot
+    off to the side and swap the reference, so readers never block on Mongo
+    once the first load is done.
+
+    One invalidation path decides when to reload: whoever changes `services`
+    (backfill, admin reload) calls reload_service_embeddings, which bumps the
+    services version document; every other process notices the bump on its
+    watcher thread. Each swap is then pushed to subscribers (the partner
+    catalog rebuilds its RankingEngine), so the engine is always built against
+    the snapshot this store holds.
+    """
+
+    def __init__(self, poll_seconds: float = SERVICE_EMBEDDINGS_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._current: ServiceEmbeddings | None = None
+        self._stored_version = None
+        self._lock = threading.Lock()
+        self._reloading = threading.Event()
+        self._listeners: list = []
+        self._watcher: threading.Thread | None = None
+
+    def subscribe(self, callback) -> None:
+        """Call `callback(snapshot)` after every swap (on the thread that loaded it)."""
+        self._listeners.append(callback)
+
+    def get(self) -> ServiceEmbeddings:
+        current = self._current
+        if current is None:
+            with self._lock:
+                loaded = self._current is None
+                if loaded:
+                    self._stored_version = read_services_version()
+                    self._swap(ServiceEmbeddings.load(), "initial")
+                current = self._current
+            if loaded:
+                self._notify(current)
+                self.start_watcher()
+        return current
+
+    def reload(self, reason: str = "manual") -> ServiceEmbeddings:
+        """Load a fresh snapshot and swap it in (blocking for the caller only)."""
+        self._reloading.set()
+        try:
+            stored_version = read_services_version()
+            snapshot = ServiceEmbeddings.load()
+            with self._lock:
+                self._swap(snapshot, reason)
+                self._stored_version = stored_version
+        finally:
+            self._reloading.clear()
+        self._notify(snapshot)
+        return snapshot
+
+    def start_watcher(self) -> None:
+        if not self.poll_seconds or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        with self._lock:
+            if self._watcher is not None and self._watcher.is_alive():
+                return
+            self._watcher = threading.Thread(target=self._watch, name="service-embeddings-watcher", daemon=True)
+            self._watcher.start()
+
+    def check_version(self) -> bool:
+        """Reload if the services version document moved since the last load."""
+        if read_services_version() == self._stored_version:
+            return False
+        self.reload("version_changed")
+        return True
+
+    def _watch(self) -> None:
+        from utils.db_tools import log_to_db
+
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                self.check_version()
+            except Exception as e:
+                log_to_db("ERROR", "Error reloading service embeddings", {
+                    "sender_id": None,
+                    "error": str(e),
+                })
+
+    def _swap(self, snapshot: ServiceEmbeddings, reason: str) -> None:
+        from utils.db_tools import log_to_db
+
+        previous = self._current
+        self._current = snapshot
+        log_to_db("INFO", "Service embeddings loaded", {
+            "sender_id": None,
+            "reason": reason,
+            "total_services": len(snapshot),
+            "version": snapshot.version,
+            "changed": previous is None or previous.version != snapshot.version,
+            "load_ms": round(snapshot.load_seconds * 1000, 1),
+        })
+
+    def _notify(self, snapshot: ServiceEmbeddings) -> None:
+        from utils.db_tools import log_to_db
+
+        for callback in list(self._listeners):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                log_to_db("ERROR", "Error applying reloaded service embeddings", {
+                    "sender_id": None,
+                    "error": str(e),
+                })
+
+    def stats(self) -> dict:
+        current = self._current
+        stats = current.stats() if current is not None else {"services": 0, "version": None, "loaded_at": None}
+        stats["reloading"] = self._reloading.is_set()
+        stats["poll_seconds"] = self.poll_seconds
+        stats["stored_version"] = self._stored_version
+        return stats
+
+
+_store = ServiceEmbeddingStore()
+
+
+def get_service_embedding_store() -> ServiceEmbeddingStore:
+    return _store
+
+
+def reload_service_embeddings(reason: str) -> ServiceEmbeddings:
+    """
+    Reload from `services` everywhere this worker reads them: with the
+    embedding sidecar, ask it to re-read Mongo and republish its matrix first
+    (otherwise the store would only re-map the matrix already published).
+    """
+    from utils.embedding_service import get_embedding_service
+    from utils.embedding_sidecar import SidecarClient
+
+    encoder = get_embedding_service()
+    if isinstance(encoder, SidecarClient):
+        encoder.request_sync({"op": "reload"})
+    # After the sidecar has republished, so other workers map the new matrix
+    bump_services_version()
+    return _store.reload(reason)
+
+
+def get_service_embeddings() -> ServiceEmbeddings:
+    """Current service embeddings snapshot (loaded on first use)."""
+    return _store.get()
@@ -0,0 +1,238 @@
+import json
+import math
+import os
+import re
+from collections import defaultdict
+
+import numpy as np
+
+from utils.geocode_cache import normalize_location_text
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), "data", "gazetteer_gt.json")
+# Names and aliases there must each denote one place: a bare department name
+# ("peten") or a name shared by several municipalities ("santa lucia") is left
+# out, so it goes to the geocoder instead of being answered with confidence.
+
+# Minimum 1 - edit_distance / len for a fuzzy match ("quetzaltenago" -> 0.93)
+FUZZY_MIN_SIMILARITY = 0.85
+# Names shorter than this are only matched exactly ("reu", "pana")
+FUZZY_MIN_LENGTH = 5
+# How many trigram candidates are verified with the edit distance
+FUZZY_CANDIDATES = 8
+
+# GPS pins farther than this from any municipality/zona centroid get no area
+REVERSE_GEOCODE_MAX_KM = 25.0
+REVERSE_GEOCODE_TYPES = ("municipality", "zona")
+
+EARTH_RADIUS_KM = 6371.0
+
+COUNTRY_TOKENS = ("guatemala", "gt", "guate")
+ZONA_PATTERN = re.compile(r"^(?:zona|z)\s*\.?\s*(\d{1,2})\b\s*(?:,|de|del)?\s*(.*)$")
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _unit_vectors(lat, lon) -> np.ndarray:
+    """(lat, lon) in degrees -> points on the unit sphere, so that Euclidean
+    nearest neighbours are great-circle nearest neighbours."""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, giving up early once it exceeds `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class Gazetteer:
+    """
+    Offline lookup of Guatemalan departments, municipalities, zonas of the
+    capital and common landmarks. Exact names/nicknames are a dict lookup;
+    typos go through a trigram index verified with the edit distance.
+    """
+
+    def __init__(self, entries: list[dict]):
+        self.entries = entries
+        self._by_name: dict[str, int] = {}
+        self._trigram_index: dict[str, set[str]] = defaultdict(set)
+        self._zonas: dict[int, int] = {}
+
+        for idx, entry in enumerate(entries):
+            entry["formatted_address"] = self._format_address(entry)
+            if entry["type"] == "zona":
+                self._zonas[int(entry["name"].split()[-1])] = idx
+            for name in [entry["name"], *entry.get("aliases", [])]:
+                key = normalize_location_text(name)
+                # First entry wins: department heads are listed first
+                self._by_name.setdefault(key, idx)
+
+        for key in self._by_name:
+            for gram in _trigrams(key):
+                self._trigram_index[gram].add(key)
+
+        self._capital_idx = self._by_name.get("ciudad de guatemala")
+        self._reverse_tree = None
+        self._reverse_entries: list[int] = []
+
+    @staticmethod
+    def _format_address(entry: dict) -> str:
+        parts = [entry["name"]]
+        for field in ("municipality", "department"):
+            value = entry.get(field)
+            if value and value not in parts:
+                parts.append(value)
+        parts.append("Guatemala")
+        return ", ".join(dict.fromkeys(parts))
+
+    @classmethod
+    def load(cls, path: str = GAZETTEER_PATH) -> "Gazetteer":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    # -- matching -------------------------------------------------------------
+
+    def _match_name(self, key: str) -> int | None:
+        idx = self._by_name.get(key)
+        if idx is not None or len(key) < FUZZY_MIN_LENGTH:
+            return idx
+
+        grams = _trigrams(key)
+        overlap: dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for name in self._trigram_index.get(gram, ()):
+                overlap[name] += 1
+        candidates = sorted(overlap, key=overlap.get, reverse=True)[:FUZZY_CANDIDATES]
+
+        best_idx, best_similarity = None, FUZZY_MIN_SIMILARITY
+        for name in candidates:
+            if len(name) < FUZZY_MIN_LENGTH:
+                continue
+            longest = max(len(name), len(key))
+            limit = int(longest * (1 - FUZZY_MIN_SIMILARITY))
+            distance = _edit_distance(key, name, limit)
+            similarity = 1 - distance / longest
+            if similarity >= best_similarity:
+                best_idx, best_similarity = self._by_name[name], similarity
+        return best_idx
+
+    def _is_qualifier(self, part: str, entry: dict) -> bool:
+        """True if a trailing ', xxx' only restates the entry's city/department/country."""
+        if part in COUNTRY_TOKENS:
+            return True
+        for field in ("municipality", "department"):
+            if entry.get(field) and normalize_location_text(entry[field]) == part:
+                return True
+        idx = self._match_name(part)
+        return idx is not None and self.entries[idx] is entry
+
+    def lookup(self, location_text: str) -> tuple[float, float, str] | None:
+        """Return (lat, lon, formatted_address) or None when not confidently known."""
+        key = normalize_location_text(location_text)
+        if not key:
+            return None
+
+        parts = [p.strip() for p in key.split(",") if p.strip()]
+        # "antigua guatemala" is a name, but "mixco guatemala" means Mixco
+        while len(parts) == 1 and parts[0] not in self._by_name:
+            head, _, tail = parts[0].rpartition(" ")
+            if head and tail in COUNTRY_TOKENS:
+                parts = [head]
+            else:
+                break
+        if not parts:
+            return None
+
+        zona = ZONA_PATTERN.match(parts[0])
+        if zona:
+            idx = self._zonas.get(int(zona.group(1)))
+            rest = [p for p in [zona.group(2).strip(), *parts[1:]] if p]
+            capital = self.entries[self._capital_idx] if self._capital_idx is not None else None
+            if idx is None or capital is None:
+                return None
+            if all(p in COUNTRY_TOKENS or self._match_name(p) == self._capital_idx for p in rest):
+                entry = self.entries[idx]
+                return entry["lat"], entry["lon"], entry["formatted_address"]
+            # A zona of another municipality: leave it to Google
+            return None
+
+        idx = self._match_name(parts[0])
+        if idx is None:
+            return None
+        entry = self.entries[idx]
+        if not all(self._is_qualifier(p, entry) for p in parts[1:]):
+            return None
+        return entry["lat"], entry["lon"], entry["formatted_address"]
+
+    # -- reverse geocoding -----------------------------------------------------
+
+    def _build_reverse_index(self) -> None:
+        from sklearn.neighbors import KDTree
+
+        self._reverse_entries = [
+            idx for idx, entry in enumerate(self.entries)
+            if entry["type"] in REVERSE_GEOCODE_TYPES
+        ]
+        points = _unit_vectors(
+            [self.entries[i]["lat"] for i in self._reverse_entries],
+            [self.entries[i]["lon"] for i in self._reverse_entries],
+        )
+        self._reverse_tree = KDTree(points)
+
+    def reverse_lookup(
+        self,
+        lat: float,
+        lon: float,
+        max_km: float = REVERSE_GEOCODE_MAX_KM,
+    ) -> tuple[dict, float] | None:
+        """Nearest municipality/zona centroid to a GPS pin: (entry, distance_km)."""
+        if self._reverse_tree is None:
+            self._build_reverse_index()
+
+        chord, row = self._reverse_tree.query(_unit_vectors([lat], [lon]), k=1)
+        distance_km = 2 * EARTH_RADIUS_KM * math.asin(min(1.0, float(chord[0][0]) / 2))
+        if distance_km > max_km:
+            return None
+        return self.entries[self._reverse_entries[int(row[0][0])]], distance_km
+
+
+_gazetteer: Gazetteer | None = None
+
+
+def get_gazetteer() -> Gazetteer:
+    """Lazy-load the bundled gazetteer."""
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = Gazetteer.load()
+    return _gazetteer
+
+
+def lookup_location(location_text: str) -> tuple[float, float, str] | None:
+    return get_gazetteer().lookup(location_text)
+
+
+def reverse_lookup_area(lat: float, lon: float) -> str | None:
+    """Human-readable area ("Zona 10, Ciudad de Guatemala, Guatemala") for a GPS pin."""
+    match = get_gazetteer().reverse_lookup(lat, lon)
+    return match[0]["formatted_address"] if match else None
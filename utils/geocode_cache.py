@@ -0,0 +1,161 @@
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from utils.db_tools import log_to_db, geocode_cache
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+LRU_MAX_ENTRIES = 2048
+POSITIVE_TTL = timedelta(days=90)   # places do not move
+NEGATIVE_TTL = timedelta(days=1)    # "not found in Guatemala" may be a transient miss
+
+# ---------------------------------------------------------------------------
+# State
+# ---------------------------------------------------------------------------
+
+# key -> (expires_at, (lat, lon, formatted_address) | None)
+_lru: "OrderedDict[str, tuple[datetime, tuple | None]]" = OrderedDict()
+_lock = threading.Lock()
+_indexes_ready = False
+
+_stats = {
+    "lru_hits": 0,
+    "mongo_hits": 0,
+    "negative_hits": 0,
+    "misses": 0,
+    "stores": 0,
+    "negative_stores": 0,
+}
+
+
+def normalize_location_text(text: str) -> str:
+    """'  Zona 10 ,  Ciudad de GUATEMALA ' -> 'zona 10, ciudad de guatemala'."""
+    text = unicodedata.normalize("NFKD", str(text or ""))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"\s+", " ", text.lower()).strip()
+    text = re.sub(r"\s+,", ",", text)
+    return text.strip(" .,;")
+
+
+def _ensure_indexes() -> None:
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    try:
+        geocode_cache.create_index("key", unique=True)
+        geocode_cache.create_index("expires_at", expireAfterSeconds=0)
+        _indexes_ready = True
+    except Exception as e:
+        log_to_db("ERROR", "Error creating geocode cache indexes", {
+            "sender_id": None,
+            "error": str(e),
+        })
+
+
+def _remember(key: str, expires_at: datetime, result: tuple | None) -> None:
+    with _lock:
+        _lru[key] = (expires_at, result)
+        _lru.move_to_end(key)
+        while len(_lru) > LRU_MAX_ENTRIES:
+            _lru.popitem(last=False)
+
+
+def get_cached_geocode(location_text: str) -> tuple[bool, tuple | None]:
+    """
+    Look a location up in the LRU, then in Mongo.
+    Returns (hit, result) where result is (lat, lon, formatted_address) or
+    None for a cached "not found".
+    """
+    key = normalize_location_text(location_text)
+    if not key:
+        return False, None
+
+    now = datetime.utcnow()
+    with _lock:
+        entry = _lru.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                _lru.move_to_end(key)
+                _stats["lru_hits"] += 1
+                if entry[1] is None:
+                    _stats["negative_hits"] += 1
+                return True, entry[1]
+            del _lru[key]
+
+    try:
+        doc = geocode_cache.find_one({"key": key, "expires_at": {"$gt": now}})
+    except Exception as e:
+        log_to_db("ERROR", "Error reading geocode cache", {
+            "sender_id": None,
+            "location_text": location_text,
+            "error": str(e),
+        })
+        doc = None
+
+    if doc:
+        result = None
+        if doc.get("found"):
+            result = (doc["lat"], doc["lon"], doc.get("formatted_address"))
+        _remember(key, doc["expires_at"], result)
+        with _lock:
+            _stats["mongo_hits"] += 1
+            if result is None:
+                _stats["negative_hits"] += 1
+        return True, result
+
+    with _lock:
+        _stats["misses"] += 1
+    return False, None
+
+
+def store_geocode(location_text: str, lat, lon, formatted_address) -> None:
+    """Cache a geocoding answer; lat/lon of None stores a negative result."""
+    key = normalize_location_text(location_text)
+    if not key:
+        return
+
+    found = lat is not None and lon is not None
+    expires_at = datetime.utcnow() + (POSITIVE_TTL if found else NEGATIVE_TTL)
+    result = (lat, lon, formatted_address) if found else None
+    _remember(key, expires_at, result)
+
+    with _lock:
+        _stats["stores" if found else "negative_stores"] += 1
+
+    _ensure_indexes()
+    try:
+        geocode_cache.update_one(
+            {"key": key},
+            {"$set": {
+                "key": key,
+                "query": location_text,
+                "found": found,
+                "lat": lat,
+                "lon": lon,
+                "formatted_address": formatted_address,
+                "expires_at": expires_at,
+                "updated_at": datetime.utcnow(),
+            }},
+            upsert=True,
+        )
+    except Exception as e:
+        log_to_db("ERROR", "Error writing geocode cache", {
+            "sender_id": None,
+            "location_text": location_text,
+            "error": str(e),
+        })
+
+
+def get_geocode_cache_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+        stats["lru_size"] = len(_lru)
+    lookups = stats["lru_hits"] + stats["mongo_hits"] + stats["misses"]
+    stats["lookups"] = lookups
+    stats["hit_rate"] = round((stats["lru_hits"] + stats["mongo_hits"]) / lookups, 4) if lookups else 0.0
+    return stats
@@ -1,4 +1,5 @@
 from utils.db_tools import log_to_db, save_patient_data
+from utils.context import update_conversation_context
 
 async def process_language_message(sender_id, conversation, message_data):
     # Process language from extracted message data
@@ -17,6 +18,7 @@ async def update_conversation_language(sender_id, language):
         {"sender_id": sender_id},
         {"$set": {"language": language}}
     )
+    update_conversation_context(sender_id, language=language)
 
 async def update_patient_language(sender_id, conversation, language):
     try:
@@ -1,13 +1,15 @@
 import os 
-import httpx
 from groq import AsyncGroq
 from datetime import datetime
 import json 
 import asyncio 
 from utils.db_tools import log_to_db, ongoing_conversations
+from utils.http_client import get_http_client
 
 groq_client = AsyncGroq()
 
+GEOCODING_API_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+
 async def extract_data(message):
     try:
         completion = await groq_client.chat.completions.create(
@@ -171,6 +173,26 @@ def is_waiting_for_location_reference(sender_id):
 
 async def geocode_location(location_text):
     """Use Google Maps Geocoding API to get coordinates from location text"""
+    from utils.gazetteer import lookup_location
+    from utils.geocode_cache import get_cached_geocode, store_geocode
+
+    # Well-known places resolve offline; Google only handles the long tail
+    try:
+        local = lookup_location(location_text)
+    except Exception as e:
+        log_to_db("ERROR", "Error in gazetteer lookup", {
+            "sender_id": None,
+            "location_text": location_text,
+            "error": str(e)
+        })
+        local = None
+    if local:
+        return local
+
+    hit, cached = get_cached_geocode(location_text)
+    if hit:
+        return cached if cached else (None, None, None)
+
     api_key = os.getenv('GOOGLE_MAPS_API_KEY')
     
     if not api_key:
@@ -183,53 +205,76 @@ async def geocode_location(location_text):
         f"{location_text}, GT"
     ]
     
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
+    # All variants go out at once on the pooled client, but they are read in
+    # priority order: the first variant that resolves inside Guatemala wins
+    # regardless of which answer arrives first, and the rest are cancelled.
+    client = get_http_client()
+    tasks = [
+        asyncio.create_task(_geocode_query(client, search_query, api_key))
+        for search_query in search_queries
+    ]
+    had_error = False
     
-    for search_query in search_queries:
-        params = {
-            'address': search_query,
-            'key': api_key,
-            'region': 'gt',
-        }
-        
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params)
-                data = response.json()
-                
-                if data['status'] == 'OK' and data['results']:
-                    result = data['results'][0]
-                    
-                    country_found = False
-                    country_short = ""
-                    for component in result['address_components']:
-                        if 'country' in component['types']:
-                            country_short = component['short_name']
-                            if component['short_name'] == 'GT':
-                                country_found = True
-                            break
-                    
-                    if country_found:
-                        location = result['geometry']['location']
-                        lat = location['lat']
-                        lon = location['lng']
-                        formatted_address = result['formatted_address']
-                        return lat, lon, formatted_address
-                    else:
-                        continue
-                else:
-                    continue
-                    
-        except Exception as e:
-            log_to_db("ERROR", "Exception in geocoding", {
-                "sender_id": None,
-                "search_query": search_query,
-                "error": str(e)
-            })
-            continue
+    try:
+        for task in tasks:
+            status, result = await task
+            if status == "ok":
+                lat, lon, formatted_address = result
+                store_geocode(location_text, lat, lon, formatted_address)
+                return lat, lon, formatted_address
+            if status == "error":
+                had_error = True
+    finally:
+        for task in tasks:
+            task.cancel()
     
+    # Only a clean "not in Guatemala" answer is cached; errors are retried
+    if not had_error:
+        store_geocode(location_text, None, None, None)
+
     return None, None, None
 
+async def _geocode_query(client, search_query, api_key):
+    """
+    Geocode one query variant.
+    Returns ("ok", (lat, lon, formatted_address)) for a result in Guatemala,
+    ("miss", None) for no usable result and ("error", None) on failure.
+    """
+    params = {
+        'address': search_query,
+        'key': api_key,
+        'region': 'gt',
+    }
+    
+    try:
+        response = await client.get(GEOCODING_API_URL, params=params)
+        data = response.json()
+        
+        if data['status'] == 'OK' and data['results']:
+            result = data['results'][0]
+            
+            for component in result['address_components']:
+                if 'country' in component['types']:
+                    if component['short_name'] == 'GT':
+                        location = result['geometry']['location']
+                        return "ok", (location['lat'], location['lng'], result['formatted_address'])
+                    break
+            return "miss", None
+        
+        if data['status'] == 'ZERO_RESULTS':
+            return "miss", None
+        return "error", None
+            
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        log_to_db("ERROR", "Exception in geocoding", {
+            "sender_id": None,
+            "search_query": search_query,
+            "error": str(e)
+        })
+        return "error", None
+
 groq_api = os.getenv('GROQ_API_KEY')
 client = AsyncGroq(api_key = groq_api)
 
@@ -6,7 +6,10 @@ from utils.db_tools import (
 )
 from utils.llm import geocode_location, detect_confirmation
 from utils.whatsapp import send_initial_location_request
-from utils.translation import send_translated_message
+from utils.outbound import flush_current_turn
+from utils.translation import send_translated_message, send_translated_template
+
+LOCATION_CONFIRMATION_TEMPLATE = "I found this location: {address}. Is this correct? Please reply with 'yes' or 'no'."
 
 async def process_location_message(sender_id, conversation, message_data, location_data):
     if not has_location(conversation):
@@ -37,6 +40,8 @@ async def process_location_message(sender_id, conversation, message_data, locati
             if has_symptoms(conversation_refreshed):
                 searching_message = "Thank you for confirming your location! I'm now finding the best medical recommendations for you. This may take a moment..."
                 await send_translated_message(sender_id, searching_message)
+                # Let the user see this before the (slow) referral search starts
+                await flush_current_turn(sender_id)
             else:
                 confirmation_message = "Perfect! Your location has been saved."
                 await send_translated_message(sender_id, confirmation_message)
@@ -88,6 +93,8 @@ async def handle_location_confirmation(sender_id, message_data, pending_location
             if has_symptoms(conversation_refreshed):
                 searching_message = "Thank you for confirming your location! I'm now finding the best medical recommendations for you. This may take a moment..."
                 await send_translated_message(sender_id, searching_message)
+                # Let the user see this before the (slow) referral search starts
+                await flush_current_turn(sender_id)
             else:
                 confirmation_message = "Perfect! Your location has been saved."
                 await send_translated_message(sender_id, confirmation_message)
@@ -164,8 +171,11 @@ async def process_location_reference(sender_id, location_text):
 
 async def ask_location_confirmation(sender_id, location_data):
     """Ask user to confirm if the found location is correct"""
-    confirmation_message = f"I found this location: {location_data['text_description']}. Is this correct? Please reply with 'yes' or 'no'."
-    await send_translated_message(sender_id, confirmation_message)
+    await send_translated_template(
+        sender_id,
+        LOCATION_CONFIRMATION_TEMPLATE,
+        address=location_data['text_description']
+    )
 
 async def request_location(sender_id):
     await send_initial_location_request(sender_id)
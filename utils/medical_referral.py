@@ -1,123 +1,78 @@
+import asyncio
 import json
-import math
+import os
 import re
 from datetime import datetime
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
 from utils.db_tools import log_to_db
-from utils.translation import send_translated_message
+from utils.whatsapp import send_text_message
+from utils.translation import send_translated_message, translate_template, render_template
+from utils.partner_cards import render_partner_card
+from utils.context import update_conversation_context
+from utils.embedding_cache import embed_texts
+from utils.embedding_service import get_embedding_service
+from utils.ranking import RankingResult
+from utils.symptom_embeddings import INCREMENTAL_SYMPTOM_EMBEDDINGS, embed_symptom_sum, stored_symptom_embedding
 
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
 
 MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+# "torch" (SentenceTransformer) or "onnx" (int8 ONNX export, see
+# scripts/export_onnx_encoder.py); EMBEDDING_ONNX_DIR points at the export
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR")
 GROQ_MODEL = "openai/gpt-oss-120b"
 
 # Distance limits used for the hard-radius filter (fallback path)
 MAX_DISTANCE_GPS = 30    # km — GPS locations
 MAX_DISTANCE_TEXT = 60   # km — text-based locations
 
-# Gaussian scoring parameters
-DISTANCE_SIGMA_KM = 20.0   # controls how fast distance score decays
-SIMILARITY_SIGMA = 0.3     # controls how fast similarity score decays
-
-# Emergency boost multiplier applied to matching emergency services
-EMERGENCY_SERVICE_BOOST_FACTOR = 3.0
-
-# Keywords that identify "emergency" services/symptoms
-EMERGENCY_KEYWORDS = (
-    "emergencias dentales en niños",
-    "emergencias dentales a niños",
-    "emergencias dentales",
-    "emergencias",
-)
-
 # How many top partners to return
 TOP_K = 2
 
+# Scoring parameters (Gaussian sigmas, emergency boost) live in utils.ranking;
+# service embeddings are served by utils.embedding_store
+
 # ---------------------------------------------------------------------------
 # Model (lazy-loaded)
 # ---------------------------------------------------------------------------
 
-_model: SentenceTransformer | None = None
+_model = None
 
 
-def get_embedding_model() -> SentenceTransformer:
-    """Lazy-load the sentence-transformer model."""
+def get_embedding_model():
+    """
+    Lazy-load the sentence encoder for EMBEDDING_BACKEND. Both backends expose
+    the same `encode(texts, convert_to_numpy=True)`; torch is only imported
+    for the torch backend.
+    """
     global _model
     if _model is None:
-        _model = SentenceTransformer(MODEL_NAME)
-    return _model
-
+        if EMBEDDING_BACKEND == "onnx":
+            from utils.onnx_encoder import DEFAULT_ONNX_DIR, OnnxSentenceEncoder
 
-# ---------------------------------------------------------------------------
-# Service-embedding cache (loaded once from MongoDB at first use)
-# ---------------------------------------------------------------------------
-
-_service_embedding_map: dict[str, np.ndarray] | None = None
-
-
-def get_service_embedding_map() -> dict[str, np.ndarray]:
-    """
-    Build a dict {og_service_name -> embedding} from the `services` collection.
-    Cached after the first call.
-    """
-    global _service_embedding_map
-    if _service_embedding_map is not None:
-        return _service_embedding_map
+            _model = OnnxSentenceEncoder(EMBEDDING_ONNX_DIR or DEFAULT_ONNX_DIR)
+        else:
+            from sentence_transformers import SentenceTransformer
 
-    from utils.db_tools import db
+            _model = SentenceTransformer(MODEL_NAME)
+    return _model
 
-    _service_embedding_map = {}
-    for item in db["services"].find({}, {"og_service_name": 1, "embedding": 1}):
-        name = str(item.get("og_service_name", "")).strip().lower()
-        emb = item.get("embedding")
-        if name and isinstance(emb, list) and emb:
-            _service_embedding_map[name] = np.asarray(emb, dtype=np.float32)
 
-    log_to_db("INFO", "Service embedding map loaded", {
-        "sender_id": None,
-        "total_services": len(_service_embedding_map),
-    })
-    return _service_embedding_map
+def get_embedding_model_key() -> str:
+    """Cache key for vectors produced by the active backend (int8 vectors differ slightly)."""
+    return MODEL_NAME if EMBEDDING_BACKEND != "onnx" else f"{MODEL_NAME}@onnx-int8"
 
 
 # ---------------------------------------------------------------------------
-# Math helpers
+# Parsing helpers
 # ---------------------------------------------------------------------------
 
-def _cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
-    denom = np.linalg.norm(a) * np.linalg.norm(b)
-    return float(np.dot(a, b) / denom) if denom != 0 else 0.0
-
-
-def _gaussian_similarity(similarity: float, sigma: float = SIMILARITY_SIGMA) -> float:
-    """Map raw cosine similarity to [0, 1] with a Gaussian centred at 1."""
-    return float(math.exp(-0.5 * ((similarity - 1.0) / sigma) ** 2))
-
-
-def _gaussian_distance_km(distance_km: float, sigma_km: float = DISTANCE_SIGMA_KM) -> float:
-    """Map distance (km) to a score in (0, 1] — score decays as distance grows."""
-    return float(math.exp(-0.5 * (distance_km / sigma_km) ** 2))
-
-
-def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Great-circle distance between two (lat, lon) points in km."""
-    r = 6371.0
-    p1, p2 = math.radians(lat1), math.radians(lat2)
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = math.sin(dlat / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dlon / 2) ** 2
-    return r * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-
-
-def _has_emergency_signal(items: list[str]) -> bool:
-    return any(k in items for k in EMERGENCY_KEYWORDS)
-
-
 def _safe_json_parse(content: str):
     content = (content or "").strip()
     if not content:
@@ -144,13 +99,12 @@ async def extract_symptoms_services(text: str) -> dict:
     Use Groq LLM to extract symptoms, possible services, and emergency flag.
     Returns: {"symptoms": [...], "possible_services": [...], "is_emergency": bool}
     """
-    from groq import AsyncGroq
+    # Shared client: reuses the connection pool opened at startup
+    from utils.llm import groq_client as client
 
     if not text or not str(text).strip():
         return {"symptoms": [], "possible_services": [], "is_emergency": False}
 
-    client = AsyncGroq()
-
     try:
         completion = await client.chat.completions.create(
             model=GROQ_MODEL,
@@ -213,33 +167,102 @@ async def extract_symptoms_services(text: str) -> dict:
 # Core ranking logic
 # ---------------------------------------------------------------------------
 
-async def find_matching_partners(
+async def build_query_embedding(
+    symptoms: list[str],
+    query_chunks: list[str],
+    extracted: dict,
+    symptom_embedding: tuple[np.ndarray, int] | None,
+    encoder,
+) -> np.ndarray:
+    """
+    Mean embedding of the query. Per-chunk vectors come from the embedding
+    cache; unseen chunks are encoded off the event loop, batched with
+    concurrent referrals.
+
+    With INCREMENTAL_SYMPTOM_EMBEDDINGS it is the mean of each distinct
+    symptom plus the extracted chunks, whether the symptom sum was stored by
+    the background task or is built here because that task has not finished.
+    Otherwise it is the mean of `query_chunks` (joined symptoms + extracted).
+    """
+    if INCREMENTAL_SYMPTOM_EMBEDDINGS and symptom_embedding is None:
+        symptom_embedding = await embed_symptom_sum(symptoms)
+    if symptom_embedding is None:
+        query_vectors = await embed_texts(query_chunks, encoder.model_key, encoder.encode)
+        return np.mean(query_vectors, axis=0).astype(np.float32)
+
+    symptom_sum, symptom_count = symptom_embedding
+    extracted_chunks = [
+        q for q in extracted["symptoms"] + extracted["possible_services"] if q and str(q).strip()
+    ]
+    total = symptom_sum.astype(np.float64)
+    if extracted_chunks:
+        extracted_vectors = await embed_texts(extracted_chunks, encoder.model_key, encoder.encode)
+        total += extracted_vectors.astype(np.float64).sum(axis=0)
+    return (total / (symptom_count + len(extracted_chunks))).astype(np.float32)
+
+
+async def rank_partners(
     symptoms: list[str],
     location: dict,
     max_distance_km: float | None = MAX_DISTANCE_GPS,
-) -> list[dict]:
+    symptom_embedding: tuple[np.ndarray, int] | None = None,
+) -> RankingResult | None:
     """
     Rank all partners by a combined service-similarity × distance score.
 
     The approach follows the notebook (partner_emb_ranking.ipynb):
       1. Build a query embedding from the symptom text + LLM-extracted signals.
       2. For each partner, compute a Gaussian service similarity score using the
-         pre-computed embeddings stored in the `services` collection.
+         pre-computed embeddings stored in the `services` collection (one matrix
+         product for the whole catalog, see utils.ranking.RankingEngine).
       3. For each partner location, compute a Gaussian distance score.
       4. Final score = service_score × distance_score (multiplicative).
       5. If max_distance_km is not None, only partners whose closest location is
          within the radius are considered (hard filter applied AFTER ranking).
       6. Return the top-2 partners.
+
+    The Groq extraction and the encode run once; the returned RankingResult
+    gives the in-radius top-2 and the global top-2 (fallback) from the same
+    scores. None if ranking failed.
+
+    `symptom_embedding` is the conversation's running (sum, count) of its
+    symptom embeddings (utils.symptom_embeddings): the query is then the mean
+    of those plus the extracted chunks, and only the latter are encoded here.
+    Without it (the background task has not finished yet) the same per-symptom
+    sum is built here, so the query does not depend on that timing.
     """
-    from utils.db_tools import db
+    from utils.code_index import get_code_index
+    from utils.partner_catalog import get_partner_catalog
+    from utils.ranking_cache import get_ranking_cache
 
     try:
-        service_embedding_map = get_service_embedding_map()
-        model = get_embedding_model()
-
         patient_lat = location.get("lat")
         patient_lon = location.get("lon")
 
+        # In-memory snapshot of the active partners (kept current by a change
+        # stream) with its engine prebuilt, so ranking never goes back to Mongo
+        # for the catalog; only the very first load waits, off the event loop
+        catalog = get_partner_catalog()
+        engine = catalog.current_engine() or await asyncio.to_thread(catalog.get_engine)
+
+        # Same symptoms from the same area within the TTL: reuse extraction,
+        # embedding and service scores; only distances are recomputed
+        code_index = get_code_index()
+        cache = get_ranking_cache()
+        # The query vector depends on how it is built (per-symptom sum or
+        # joined symptom string) and on the encoder, so both are part of the key
+        encoder = get_embedding_service()
+        query_mode = "symptom_sum" if INCREMENTAL_SYMPTOM_EMBEDDINGS else "joined"
+        cache_key = (
+            *cache.key(symptoms, patient_lat, patient_lon),
+            code_index.version,
+            query_mode,
+            encoder.model_key,
+        )
+        cached = cache.get(cache_key, engine, patient_lat, patient_lon, max_distance_km, TOP_K)
+        if cached is not None:
+            return cached
+
         symptoms_query = ", ".join(symptoms)
         extracted = await extract_symptoms_services(symptoms_query)
 
@@ -250,125 +273,29 @@ async def find_matching_partners(
             + extracted["possible_services"]
         )
         query_chunks = [q for q in query_chunks if q and str(q).strip()]
-        query_vectors = model.encode(query_chunks, convert_to_numpy=True).astype(np.float32)
-        query_emb: np.ndarray = (
-            query_vectors if query_vectors.ndim == 1
-            else np.mean(query_vectors, axis=0).astype(np.float32)
-        )
-
-        all_partners = list(db["partners"].find({"is_active": True}))
-        ranked: list[dict] = []
-
-        for partner in all_partners:
-            partner_services = [
-                str(s).strip().lower()
-                for s in partner.get("partner_services", [])
-            ]
-
-            # --- Service similarity score --------------------------------
-            service_scores: list[float] = []
-            for svc_name in partner_services:
-                emb = service_embedding_map.get(svc_name)
-                if emb is None:
-                    continue
-
-                raw_sim = _cosine_similarity(query_emb, emb)
-                sim_score = _gaussian_similarity(raw_sim, sigma=SIMILARITY_SIGMA)
-
-                # Boost emergency services when the patient query is an emergency
-                if _has_emergency_signal([svc_name]) and extracted["is_emergency"]:
-                    sim_score = sim_score * EMERGENCY_SERVICE_BOOST_FACTOR
-
-                service_scores.append(sim_score)
-
-            # Use best service score (top-1)
-            service_score: float = max(service_scores) if service_scores else 0.0
-
-            # --- Best location by combined score -------------------------
-            best_location: dict | None = None
-            best_combined: float = -1.0
-
-            for idx, geo in enumerate(partner.get("partner_geo_locations", [])):
-                if not isinstance(geo, dict):
-                    continue
-                glat, glon = geo.get("lat"), geo.get("lon")
-                if glat is None or glon is None:
-                    continue
-
-                try:
-                    distance_km = _haversine_km(
-                        float(patient_lat), float(patient_lon),
-                        float(glat), float(glon),
-                    ) if patient_lat and patient_lon else None
-                except (TypeError, ValueError):
-                    distance_km = None
-
-                distance_score = (
-                    _gaussian_distance_km(distance_km, sigma_km=DISTANCE_SIGMA_KM)
-                    if distance_km is not None else 0.0
-                )
-                combined = service_score * distance_score
-
-                location_result = {
-                    "location_index": idx,
-                    "query": geo.get("query"),
-                    "name": geo.get("name"),
-                    "direccion": geo.get("address"),
-                    "lat": float(glat),
-                    "lon": float(glon),
-                    "maps_url": geo.get("maps_url"),
-                    "distance_km": distance_km,
-                    "distance_score": distance_score,
-                    "combined_score": combined,
-                }
-
-                if combined > best_combined:
-                    best_combined = combined
-                    best_location = location_result
-
-            # Fallback when no geo-location is available
-            if best_location is None:
-                best_location = {
-                    "location_index": None,
-                    "query": None,
-                    "name": None,
-                    "direccion": None,
-                    "lat": None,
-                    "lon": None,
-                    "maps_url": None,
-                    "distance_km": None,
-                    "distance_score": 0.0,
-                    "combined_score": service_score,  # distance-agnostic
-                }
-                best_combined = service_score
-
-            ranked.append({
-                # Original MongoDB document fields
-                **{k: v for k, v in partner.items() if k != "_id"},
-                "_id": partner.get("_id"),
-                # Scoring metadata
-                "service_score": service_score,
-                "overall_similarity": service_score,
-                "final_score": best_combined,
-                # Location fields expected by format helpers
-                "closest_location": best_location,
-                "distance_km": best_location["distance_km"],
-                # Extra signals for audit trail
-                "extracted_signals": extracted,
-            })
-
-        ranked.sort(key=lambda x: x["final_score"], reverse=True)
-
-        # Hard distance filter (only applied when a radius is specified)
-        if max_distance_km is not None:
-            within_radius = [
-                p for p in ranked
-                if p["distance_km"] is not None and p["distance_km"] <= max_distance_km
-            ]
-            return within_radius[:TOP_K]
 
-        # No radius filter — return global top-2
-        return ranked[:TOP_K]
+        # Partners curating a CIE-11/ICHI code whose title matches the query:
+        # a dictionary lookup, done before any embedding work
+        matched_codes, code_partner_ids = code_index.match_partners(query_chunks)
+        extracted["matched_codes"] = sorted(matched_codes)
+        query_emb = await build_query_embedding(symptoms, query_chunks, extracted, symptom_embedding, encoder)
+
+        # Hard distance filter (only applied when a radius is specified),
+        # otherwise the global top-2
+        ranking = engine.score(
+            query_emb,
+            extracted["is_emergency"],
+            patient_lat,
+            patient_lon,
+            max_distance_km,
+            TOP_K,
+            extracted,
+            code_partner_ids=code_partner_ids,
+        )
+        # A failed Groq call comes back empty; don't pin that ranking for the TTL
+        if extracted["symptoms"] or extracted["possible_services"]:
+            cache.put(cache_key, ranking)
+        return ranking
 
     except Exception as e:
         log_to_db("ERROR", "Error searching for partners", {
@@ -378,27 +305,38 @@ async def find_matching_partners(
             "symptoms": symptoms,
             "location": location,
         })
-        return []
+        return None
 
 
-# ---------------------------------------------------------------------------
-# Public entry point
-# ---------------------------------------------------------------------------
+async def find_matching_partners(
+    symptoms: list[str],
+    location: dict,
+    max_distance_km: float | None = MAX_DISTANCE_GPS,
+) -> list[dict]:
+    """Top-2 partners within max_distance_km (global top-2 if None); see rank_partners."""
+    ranking = await rank_partners(symptoms, location, max_distance_km)
+    return ranking.in_radius if ranking is not None else []
+
 
 async def provide_medical_referral(sender_id: str, conversation: dict):
     """Generate and send a medical referral based on symptoms and location."""
     symptoms: list[str] = conversation.get("symptoms", [])
     location: dict = conversation.get("location", {})
 
+    language: str | None = conversation.get("language")
+
     location_type = location.get("location_type", "gps")
     max_distance_km = MAX_DISTANCE_GPS if location_type == "gps" else MAX_DISTANCE_TEXT
 
     try:
-        matching_partners = await find_matching_partners(symptoms, location, max_distance_km)
+        ranking = await rank_partners(
+            symptoms, location, max_distance_km, stored_symptom_embedding(conversation, symptoms),
+        )
+        matching_partners = ranking.in_radius if ranking is not None else []
 
         if matching_partners:
-            referral_message = await format_partner_referrals(matching_partners)
-            await send_translated_message(sender_id, referral_message)
+            referral_message = await format_partner_referrals(matching_partners, language)
+            await send_text_message(sender_id, referral_message)
             await save_referrals(sender_id, matching_partners, symptoms, location)
 
             log_to_db("INFO", "Partner match found", {
@@ -415,12 +353,12 @@ async def provide_medical_referral(sender_id: str, conversation: dict):
                 ],
             })
         else:
-            # Fallback: best global match ignoring radius
-            best_match = await find_matching_partners(symptoms, location, max_distance_km=None)
+            # Fallback: best global match ignoring radius, from the same scores
+            best_match = ranking.global_top if ranking is not None else []
 
             if best_match:
-                fallback_message = await format_fallback_referral(best_match[0], max_distance_km)
-                await send_translated_message(sender_id, fallback_message)
+                fallback_message = await format_fallback_referral(best_match[0], max_distance_km, language)
+                await send_text_message(sender_id, fallback_message)
                 await save_referrals(sender_id, [best_match[0]], symptoms, location, is_fallback=True)
 
                 log_to_db("INFO", "Partner match found (outside radius fallback)", {
@@ -449,14 +387,13 @@ async def provide_medical_referral(sender_id: str, conversation: dict):
         )
 
         from utils.db_tools import (
-            get_conversation,
             increment_referral_count,
             set_waiting_for_another_referral,
         )
 
         increment_referral_count(sender_id)
-        conversation = get_conversation(sender_id)
-        referral_count = conversation.get("referral_count", 0)
+        referral_count = conversation.get("referral_count", 0) + 1
+        update_conversation_context(sender_id, referral_count=referral_count)
 
         if referral_count < 4:
             await send_translated_message(
@@ -486,106 +423,57 @@ async def provide_medical_referral(sender_id: str, conversation: dict):
 # Formatting helpers
 # ---------------------------------------------------------------------------
 
-def _format_partner_block(partner: dict, index: int | None = None) -> str:
-    """
-    Build the WhatsApp message block for a single partner using the fields
-    that exist in the partners collection:
-      - partner_name
-      - partner_category
-      - partner_locations     → human-readable address strings
-      - partner_geo_locations → structured geo data with maps_url and place_id
-      - partner_phone_number
-      - partner_whatsapp
-      - closest_location      → best geo location selected during ranking
-      - distance_km
-    """
-    name = partner.get("partner_name", "Unknown")
-    category = partner.get("partner_category", "")
-    distance = partner.get("distance_km")
-    distance_text = f" · {round(distance, 1)} km" if distance is not None else ""
-
-    # --- Address: prefer human-readable partner_locations, fall back to geo address ---
-    locations_text = partner.get("partner_locations", [])
-    closest = partner.get("closest_location") or {}
-
-    if locations_text:
-        # Use the text address that corresponds to the matched geo-location index
-        loc_idx = closest.get("location_index")
-        if loc_idx is not None and loc_idx < len(locations_text):
-            address = locations_text[loc_idx]
-        else:
-            address = locations_text[0]
-    else:
-        address = closest.get("direccion") or closest.get("address") or "Address not available"
-
-    # --- Google Maps URL: use the stored maps_url (includes place_id) ---
-    maps_url = (closest.get("maps_url") or "").strip()
-
-    # --- Contact ---
-    phones = partner.get("partner_phone_number", [])
-    phone_text = ", ".join(phones) if phones else "Not available"
+# Message templates: translated once per language (see translate_template) and
+# filled in locally. Partner blocks come from the pre-rendered card cache.
+REFERRAL_INTRO_TEMPLATE = "🏥 *I found the following medical partners for you:*\n"
 
-    whatsapps = partner.get("partner_whatsapp", [])
-    whatsapp_text = ", ".join(whatsapps) if whatsapps else "Not available"
+REFERRAL_FOOTER_TEMPLATE = "\n━━━━━━━━━━━━━━━\n\n💡 Contact them directly to schedule an appointment."
 
-    # Build block
-    prefix = f"*{index}. " if index is not None else "*"
-    header = f"{prefix}{name}*"
-    if category:
-        header += f"\n_{category}{distance_text}_"
-    else:
-        header += distance_text
-
-    block = f"""━━━━━━━━━━━━━━━
-{header}
-
-📍 *Address:*
-{address}"""
-
-    if maps_url:
-        block += f"\n🗺️ *Google Maps:* {maps_url}"
-
-    block += f"""
+FALLBACK_INTRO_TEMPLATE = (
+    "⚠️ *I couldn't find medical partners within {km} km of your location.*\n\n"
+    "However, this partner may be able to help with your symptoms:\n\n"
+)
 
-📞 *Phone:* {phone_text}
-💬 *WhatsApp:* {whatsapp_text}"""
+FALLBACK_FOOTER_TEMPLATE = (
+    "\n\n━━━━━━━━━━━━━━━\n\n"
+    "⚠️ *Note:* This partner is outside your search radius but may still be able to help.\n\n"
+    "💡 Contact them to confirm they can assist you, or consider contacting your local hospital."
+)
 
-    return block
+NO_PARTNERS_TEMPLATE = "No medical partners were found for your needs."
 
 
-async def format_partner_referrals(partners: list[dict]) -> str:
-    """Format partner list into a WhatsApp-friendly message."""
+async def format_partner_referrals(partners: list[dict], language: str | None = None) -> str:
+    """Format partner list into a localized WhatsApp-friendly message."""
     if not partners:
-        return "No medical partners were found for your needs."
+        return await translate_template(NO_PARTNERS_TEMPLATE, language)
 
-    parts = ["🏥 *I found the following medical partners for you:*\n"]
+    parts = [await translate_template(REFERRAL_INTRO_TEMPLATE, language)]
 
     for i, partner in enumerate(partners, 1):
-        parts.append(_format_partner_block(partner, index=i))
+        parts.append(await render_partner_card(partner, index=i, language=language))
 
-    parts.append(
-        "\n━━━━━━━━━━━━━━━\n\n💡 Contact them directly to schedule an appointment."
-    )
+    parts.append(await translate_template(REFERRAL_FOOTER_TEMPLATE, language))
     return "\n\n".join(parts)
 
 
-async def format_fallback_referral(partner: dict, max_distance_searched: float | None) -> str:
-    """Format a fallback referral when no partners are within the search radius."""
+async def format_fallback_referral(
+    partner: dict,
+    max_distance_searched: float | None,
+    language: str | None = None,
+) -> str:
+    """Format a localized fallback referral when no partners are within the search radius."""
     if not partner:
-        return "No medical partners were found for your needs."
+        return await translate_template(NO_PARTNERS_TEMPLATE, language)
 
-    intro = (
-        f"⚠️ *I couldn't find medical partners within {max_distance_searched} km of your location.*\n\n"
-        "However, this partner may be able to help with your symptoms:\n\n"
+    intro = render_template(
+        await translate_template(FALLBACK_INTRO_TEMPLATE, language),
+        {"km": max_distance_searched},
     )
 
-    block = _format_partner_block(partner, index=None)
+    block = await render_partner_card(partner, index=None, language=language)
 
-    footer = (
-        "\n\n━━━━━━━━━━━━━━━\n\n"
-        "⚠️ *Note:* This partner is outside your search radius but may still be able to help.\n\n"
-        "💡 Contact them to confirm they can assist you, or consider contacting your local hospital."
-    )
+    footer = await translate_template(FALLBACK_FOOTER_TEMPLATE, language)
 
     return intro + block + footer
 
@@ -623,12 +511,12 @@ async def save_referrals(
 ) -> bool:
     """Persist referral records and notify partners via WhatsApp template."""
     try:
-        from utils.db_tools import db, get_conversation
+        from utils.db_tools import db
+        from utils.translation import get_user_language
         from utils.whatsapp import send_template_message
 
         referrals = db["referrals"]
-        conversation = get_conversation(sender_id)
-        patient_language = (conversation.get("language", "Unknown") if conversation else "Unknown")
+        patient_language = await get_user_language(sender_id) or "Unknown"
         symptoms_text = ", ".join(symptoms) if symptoms else "Not specified"
 
         records = []
@@ -652,6 +540,7 @@ async def save_referrals(
                 "symptoms_extracted": extracted.get("symptoms", []),
                 "services_extracted": extracted.get("possible_services", []),
                 "is_emergency": extracted.get("is_emergency", False),
+                "codes_matched": extracted.get("matched_codes", []),
 
                 # --- Partner identity ---
                 "partner_id": partner.get("_id"),
@@ -0,0 +1,84 @@
+import json
+import os
+
+import numpy as np
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+DEFAULT_ONNX_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models", "minilm-int8")
+ONNX_MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+CONFIG_FILE = "encoder_config.json"
+
+
+class OnnxSentenceEncoder:
+    """
+    Drop-in for the subset of SentenceTransformer.encode the app uses, backed
+    by an int8-quantized ONNX export of the transformer (see
+    scripts/export_onnx_encoder.py) and the `tokenizers` fast tokenizer.
+
+    Pooling matches paraphrase-multilingual-MiniLM-L12-v2: attention-masked
+    mean of the last hidden state, no normalization.
+    """
+
+    def __init__(self, model_dir: str = DEFAULT_ONNX_DIR, intra_op_threads: int | None = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, CONFIG_FILE), encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.max_seq_length = int(self.config.get("max_seq_length", 128))
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding(
+            pad_id=int(self.config.get("pad_token_id", 1)),
+            pad_token=self.config.get("pad_token", "<pad>"),
+        )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, self.config.get("model_file", ONNX_MODEL_FILE)),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.asarray([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, feeds)[0]
+
+        mask = attention_mask[..., None].astype(np.float32)
+        summed = (hidden * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        return (summed / counts).astype(np.float32)
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True, **_):
+        """Same shapes as SentenceTransformer.encode: (n, dim) for a list, (dim,) for a string."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, int(self.config.get("dim", 0))), dtype=np.float32)
+
+        # Sort by length so each batch pads to similar lengths
+        order = np.argsort([len(t) for t in texts])
+        chunks = []
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            chunks.append((idx, self._encode_batch([texts[i] for i in idx])))
+        dim = chunks[0][1].shape[1]
+        out = np.empty((len(texts), dim), dtype=np.float32)
+        for idx, vectors in chunks:
+            out[idx] = vectors
+        return out[0] if single else out
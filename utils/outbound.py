@@ -0,0 +1,121 @@
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from utils.db_tools import log_to_db
+
+# The turn being built for the incoming message currently handled (if any).
+_current_turn: ContextVar["OutboundTurn | None"] = ContextVar("outbound_turn", default=None)
+
+
+class OutboundTurn:
+    """
+    Collects every message the bot produces while handling one incoming
+    message, then translates the pending ones in a single LLM call and sends
+    them all in order over the pooled HTTP client.
+    """
+
+    def __init__(self, sender_id: str):
+        self.sender_id = sender_id
+        self.items: list[dict] = []
+
+    def add_text(self, text: str, translate: bool = True, force_language: str | None = None) -> None:
+        self.items.append({
+            "kind": "text",
+            "text": text,
+            "translate": translate,
+            "force_language": force_language,
+        })
+
+    def add_location_request(self, text: str) -> None:
+        self.items.append({
+            "kind": "location_request",
+            "text": text,
+            "translate": True,
+            "force_language": None,
+        })
+
+    async def _translate_pending(self, items: list[dict]) -> list[str]:
+        from utils.translation import get_user_language, translate_messages
+
+        texts = [item["text"] for item in items]
+        pending = [i for i, item in enumerate(items) if item["translate"]]
+        if not pending:
+            return texts
+
+        user_language = None
+        if any(not items[i]["force_language"] for i in pending):
+            user_language = await get_user_language(self.sender_id)
+
+        # Group by target language; normally everything goes in one call.
+        by_language: dict[str, list[int]] = {}
+        for i in pending:
+            language = items[i]["force_language"] or user_language
+            if language and language.lower() not in ['english', 'en']:
+                by_language.setdefault(language, []).append(i)
+
+        for language, indexes in by_language.items():
+            translated = await translate_messages([texts[i] for i in indexes], language, self.sender_id)
+            for i, text in zip(indexes, translated):
+                if len(text) < 3:
+                    log_to_db("ERROR", "Translated message too short, using original", {
+                        "sender_id": self.sender_id,
+                        "original_message": texts[i],
+                        "translated_message": text,
+                        "target_language": language
+                    })
+                    continue
+                texts[i] = text
+
+        return texts
+
+    async def flush(self) -> int:
+        """Translate and send everything queued so far. Returns how many were sent."""
+        from utils.whatsapp import deliver_location_request, deliver_text_message
+
+        items, self.items = self.items, []
+        if not items:
+            return 0
+
+        texts = await self._translate_pending(items)
+
+        sent = 0
+        for item, text in zip(items, texts):
+            try:
+                if item["kind"] == "location_request":
+                    await deliver_location_request(self.sender_id, text)
+                else:
+                    await deliver_text_message(self.sender_id, text)
+                sent += 1
+            except Exception as e:
+                log_to_db("ERROR", "Error sending queued message", {
+                    "sender_id": self.sender_id,
+                    "kind": item["kind"],
+                    "error": str(e)
+                })
+        return sent
+
+
+def get_current_turn(sender_id: str) -> OutboundTurn | None:
+    """Return the active turn if it belongs to this recipient."""
+    turn = _current_turn.get()
+    if turn is not None and turn.sender_id == sender_id:
+        return turn
+    return None
+
+
+async def flush_current_turn(sender_id: str) -> int:
+    """Send what is queued now, e.g. a 'please wait' before a slow step."""
+    turn = get_current_turn(sender_id)
+    return await turn.flush() if turn is not None else 0
+
+
+@asynccontextmanager
+async def outbound_turn(sender_id: str):
+    """Batch every outbound message to sender_id produced inside the block."""
+    turn = OutboundTurn(sender_id)
+    token = _current_turn.set(turn)
+    try:
+        yield turn
+    finally:
+        _current_turn.reset(token)
+        await turn.flush()
@@ -0,0 +1,222 @@
+import hashlib
+import json
+from typing import NamedTuple
+
+from utils.db_tools import log_to_db
+from utils.translation import translate_label, translate_template, render_template
+
+# ---------------------------------------------------------------------------
+# Templates
+# ---------------------------------------------------------------------------
+
+# Labels are translated once per language (translate_template); partner data
+# is filled in locally, so names, addresses and URLs never reach the LLM. The
+# category is the one data value translated, through translate_label.
+PARTNER_BLOCK_TEMPLATE = """━━━━━━━━━━━━━━━
+{header}
+
+📍 *Address:*
+{address}{maps_line}
+
+📞 *Phone:* {phone}
+💬 *WhatsApp:* {whatsapp}"""
+
+NOT_AVAILABLE_TEMPLATE = "Not available"
+ADDRESS_NOT_AVAILABLE_TEMPLATE = "Address not available"
+
+# ---------------------------------------------------------------------------
+# Card cache
+# ---------------------------------------------------------------------------
+
+class PartnerCard(NamedTuple):
+    """
+    A rendered card split around its header. The list number and the distance
+    depend on the referral being sent and are joined in by plain
+    concatenation, so partner data is never scanned for placeholders again.
+    """
+    before: str
+    name: str
+    category: str
+    after: str
+
+    def render(self, prefix: str, distance_text: str) -> str:
+        header = f"{prefix}{self.name}*"
+        if self.category:
+            header += f"\n_{self.category}{distance_text}_"
+        else:
+            header += distance_text
+        return self.before + header + self.after
+
+
+# (partner_id, location_index, language) -> (fingerprint, card)
+_card_cache: dict[tuple[str, int | None, str], tuple[str, PartnerCard]] = {}
+
+# Languages cards have been requested in (normalized like the cache keys);
+# used when pre-rendering.
+_rendered_languages: set[str] = {"spanish"}
+
+
+def _language_key(language: str | None) -> str:
+    return (language or "english").strip().lower()
+
+
+def _partner_fingerprint(partner: dict) -> str:
+    """Hash of every field that ends up in a card."""
+    relevant = {
+        "partner_name": partner.get("partner_name"),
+        "partner_category": partner.get("partner_category"),
+        "partner_locations": partner.get("partner_locations"),
+        "partner_geo_locations": partner.get("partner_geo_locations"),
+        "partner_phone_number": partner.get("partner_phone_number"),
+        "partner_whatsapp": partner.get("partner_whatsapp"),
+    }
+    raw = json.dumps(relevant, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _location_for_index(partner: dict, location_index: int | None) -> dict:
+    geo_locations = partner.get("partner_geo_locations") or []
+    if location_index is not None and 0 <= location_index < len(geo_locations):
+        geo = geo_locations[location_index]
+        return geo if isinstance(geo, dict) else {}
+    return {}
+
+
+async def _build_partner_card(partner: dict, closest: dict, language: str | None) -> PartnerCard:
+    """Render the localized card for one partner location (no prefix/distance yet)."""
+    name = partner.get("partner_name", "Unknown")
+    category = partner.get("partner_category", "")
+    if category:
+        category = await translate_label(category, language)
+
+    not_available = await translate_template(NOT_AVAILABLE_TEMPLATE, language)
+
+    # --- Address: prefer human-readable partner_locations, fall back to geo address ---
+    locations_text = partner.get("partner_locations", [])
+    if locations_text:
+        # Use the text address that corresponds to the matched geo-location index
+        loc_idx = closest.get("location_index")
+        if loc_idx is not None and loc_idx < len(locations_text):
+            address = locations_text[loc_idx]
+        else:
+            address = locations_text[0]
+    else:
+        address = (
+            closest.get("direccion")
+            or closest.get("address")
+            or await translate_template(ADDRESS_NOT_AVAILABLE_TEMPLATE, language)
+        )
+
+    # --- Google Maps URL: use the stored maps_url (includes place_id) ---
+    maps_url = (closest.get("maps_url") or "").strip()
+
+    # --- Contact ---
+    phones = partner.get("partner_phone_number", [])
+    phone_text = ", ".join(phones) if phones else not_available
+
+    whatsapps = partner.get("partner_whatsapp", [])
+    whatsapp_text = ", ".join(whatsapps) if whatsapps else not_available
+
+    template = await translate_template(PARTNER_BLOCK_TEMPLATE, language)
+    before, _, after = template.partition("{header}")
+    values = {
+        "address": address,
+        "maps_line": f"\n🗺️ *Google Maps:* {maps_url}" if maps_url else "",
+        "phone": phone_text,
+        "whatsapp": whatsapp_text,
+    }
+    return PartnerCard(render_template(before, values), name, category, render_template(after, values))
+
+
+async def get_partner_card(partner: dict, closest: dict | None, language: str | None) -> PartnerCard:
+    """Return the cached card for (partner, location, language), rendering it on a miss."""
+    closest = closest or {}
+    location_index = closest.get("location_index")
+    key = (str(partner.get("_id")), location_index, _language_key(language))
+    fingerprint = _partner_fingerprint(partner)
+
+    cached = _card_cache.get(key)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    card = await _build_partner_card(partner, closest, language)
+    _card_cache[key] = (fingerprint, card)
+    if language:
+        _rendered_languages.add(_language_key(language))
+    return card
+
+
+async def render_partner_card(
+    partner: dict,
+    index: int | None = None,
+    language: str | None = None,
+) -> str:
+    """
+    Build the WhatsApp message block for a single partner from its cached card:
+      - partner_name, partner_category
+      - partner_locations     → human-readable address strings
+      - partner_geo_locations → structured geo data with maps_url and place_id
+      - partner_phone_number, partner_whatsapp
+      - closest_location      → best geo location selected during ranking
+      - distance_km
+    """
+    card = await get_partner_card(partner, partner.get("closest_location"), language)
+
+    distance = partner.get("distance_km")
+    return card.render(
+        f"*{index}. " if index is not None else "*",
+        f" · {round(distance, 1)} km" if distance is not None else "",
+    )
+
+
+def invalidate_partner_cards(partner_id) -> int:
+    """Drop every cached card of a partner. Returns how many were removed."""
+    partner_id = str(partner_id)
+    stale = [key for key in _card_cache if key[0] == partner_id]
+    for key in stale:
+        _card_cache.pop(key, None)
+    return len(stale)
+
+
+async def prerender_partner_cards(partner: dict, languages: list[str] | None = None) -> int:
+    """Render the cards of every location of a partner ahead of the next referral."""
+    if not partner or not partner.get("is_active", True):
+        return 0
+
+    languages = languages or sorted(_rendered_languages)
+    geo_locations = partner.get("partner_geo_locations") or []
+    location_indexes = [idx for idx, geo in enumerate(geo_locations) if isinstance(geo, dict)] or [None]
+
+    rendered = 0
+    try:
+        for language in languages:
+            for location_index in location_indexes:
+                closest = dict(_location_for_index(partner, location_index))
+                closest["location_index"] = location_index
+                if "address" in closest:
+                    closest["direccion"] = closest["address"]
+                await get_partner_card(partner, closest, language)
+                rendered += 1
+    except Exception as e:
+        log_to_db("ERROR", "Error pre-rendering partner cards", {
+            "sender_id": None,
+            "partner_id": str(partner.get("_id")),
+            "error": str(e),
+        })
+    return rendered
+
+
+async def prerender_all_partner_cards(languages: list[str] | None = None) -> int:
+    """Render the cards of all active partners (used at startup)."""
+    from utils.partner_catalog import get_partner_catalog
+
+    rendered = 0
+    for partner in get_partner_catalog().get_partners():
+        rendered += await prerender_partner_cards(partner, languages)
+
+    log_to_db("INFO", "Partner cards pre-rendered", {
+        "sender_id": None,
+        "cards": rendered,
+        "languages": languages or sorted(_rendered_languages),
+    })
+    return rendered
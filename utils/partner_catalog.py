@@ -0,0 +1,282 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+from utils.db_tools import db, log_to_db
+from utils.service_ids import pack_partner_service_ids
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Seconds between version checks when change streams are not available
+PARTNER_CATALOG_POLL_SECONDS = float(os.getenv("PARTNER_CATALOG_POLL_SECONDS", "30"))
+
+# Writers bump this document so other workers notice edits while polling
+CATALOG_VERSION_ID = "partners"
+
+# Fields ranking, cards and referral audits read; anything else on a partner
+# document is never loaded into the snapshot
+PARTNER_FIELDS = {
+    "partner_name": 1,
+    "partner_category": 1,
+    "partner_locations": 1,
+    "partner_geo_locations": 1,
+    "partner_phone_number": 1,
+    "partner_whatsapp": 1,
+    "partner_services": 1,
+    "partner_service_ids": 1,
+    "partner_service_names_hash": 1,
+    "is_active": 1,
+}
+
+# Packed into CatalogSnapshot.service_ids, then dropped from the partner dicts
+_PACKED_FIELDS = ("partner_service_ids", "partner_service_names_hash")
+
+# Change events arriving within this many seconds of the first one are folded
+# into a single reload (bulk edits emit one event per partner)
+PARTNER_CATALOG_DEBOUNCE_SECONDS = float(os.getenv("PARTNER_CATALOG_DEBOUNCE_SECONDS", "1"))
+
+
+class CatalogSnapshot(NamedTuple):
+    """One immutable load of the catalog; replaced as a whole, never mutated."""
+    partners: list[dict]
+    # CSR (ptr, ids) of the stored integer service ids, see utils.service_ids
+    service_ids: tuple
+    version: int
+    loaded_at: datetime
+    load_seconds: float
+    # RankingEngine over these partners and the service embeddings current at
+    # publish time, built on the loading thread (never on the event loop)
+    engine: object
+
+
+class PartnerCatalog:
+    """
+    Process-wide snapshot of the active partners.
+
+    Loaded once, then kept current by a MongoDB change stream on `partners`
+    (or by polling a version document when change streams are unavailable)
+    and refreshed explicitly after edits made through the API. Ranking reads
+    only from this snapshot, never from Mongo.
+
+    Each load builds the RankingEngine before publishing, and a swap of the
+    service embeddings (utils.embedding_store) publishes a new snapshot with a
+    rebuilt engine, so request handlers only read `self._snapshot`. Readers
+    take it once and use only that object: a refresh on another thread can
+    never hand them partners from one load and an engine from another.
+    """
+
+    def __init__(self):
+        self.watch_mode: str | None = None
+        self._snapshot: CatalogSnapshot | None = None
+        self._lock = threading.Lock()
+        # Serializes loads and engine rebuilds: first load, explicit
+        # refreshes, the watcher and service-embedding swaps. Reentrant: the
+        # store's first load notifies from inside _load
+        self._load_lock = threading.RLock()
+        self._watcher: threading.Thread | None = None
+        self._subscribed = False
+
+    @property
+    def partners(self) -> list[dict]:
+        snapshot = self._snapshot
+        return snapshot.partners if snapshot else []
+
+    @property
+    def version(self) -> int:
+        snapshot = self._snapshot
+        return snapshot.version if snapshot else 0
+
+    # -- loading ---------------------------------------------------------------
+
+    def refresh(self, reason: str = "manual") -> int:
+        """Reload the active partners from Mongo and swap the snapshot in."""
+        with self._load_lock:
+            return self._load(reason)
+
+    @staticmethod
+    def _build_engine(partners: list[dict], service_ids: tuple, services):
+        from utils.ranking import RankingEngine
+
+        engine = RankingEngine(partners, services, service_ids)
+        engine.warm()
+        return engine
+
+    def _load(self, reason: str) -> int:
+        from utils.embedding_store import get_service_embedding_store
+
+        store = get_service_embedding_store()
+        if not self._subscribed:
+            # Before reading the store, so a swap during this load is not missed
+            store.subscribe(self._on_services_swapped)
+            self._subscribed = True
+
+        start = time.perf_counter()
+        partners = list(db["partners"].find({"is_active": True}, PARTNER_FIELDS))
+        service_ids = pack_partner_service_ids(partners)
+        for partner in partners:
+            for field in _PACKED_FIELDS:
+                partner.pop(field, None)
+        engine = self._build_engine(partners, service_ids, store.get())
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            version = self.version + 1
+            self._snapshot = CatalogSnapshot(partners, service_ids, version, datetime.utcnow(), elapsed, engine)
+
+        log_to_db("INFO", "Partner catalog snapshot loaded", {
+            "sender_id": None,
+            "reason": reason,
+            "partners": len(partners),
+            "version": version,
+            "load_ms": round(elapsed * 1000, 1),
+        })
+        return len(partners)
+
+    def _on_services_swapped(self, services) -> None:
+        """Store callback (runs on the reloading thread): rebuild the engine for the new services."""
+        with self._load_lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.engine.services is services:
+                return
+            engine = self._build_engine(snapshot.partners, snapshot.service_ids, services)
+            with self._lock:
+                self._snapshot = snapshot._replace(engine=engine)
+
+    def ensure_loaded(self) -> None:
+        if self._snapshot is None:
+            with self._load_lock:
+                # Concurrent first callers wait here for the one load
+                if self._snapshot is None:
+                    self._load("initial")
+        self.start_watcher()
+
+    def snapshot(self) -> CatalogSnapshot:
+        """Current snapshot; blocks on the first load (warmup, scripts, threads)."""
+        self.ensure_loaded()
+        return self._snapshot
+
+    def get_partners(self) -> list[dict]:
+        return self.snapshot().partners
+
+    def get_engine(self):
+        """RankingEngine of the current snapshot; blocks only on the first load."""
+        return self.snapshot().engine
+
+    def current_engine(self):
+        """RankingEngine of the current snapshot, or None before the first load. Never blocks."""
+        snapshot = self._snapshot
+        return snapshot.engine if snapshot else None
+
+    # -- keeping current -------------------------------------------------------
+
+    def start_watcher(self) -> None:
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        with self._lock:
+            if self._watcher is not None and self._watcher.is_alive():
+                return
+            self._watcher = threading.Thread(target=self._watch, name="partner-catalog-watcher", daemon=True)
+            self._watcher.start()
+
+    def _watch(self) -> None:
+        from pymongo.errors import OperationFailure
+
+        try:
+            self.watch_mode = "change_stream"
+            # Short server waits let the debounce loop below check its deadline
+            with db["partners"].watch(max_await_time_ms=100) as stream:
+                for _change in stream:
+                    self._drain(stream)
+                    self.refresh("change_stream")
+        except OperationFailure as e:
+            # Standalone servers / restricted users: no change streams
+            log_to_db("INFO", "Partner change stream unavailable, polling instead", {
+                "sender_id": None,
+                "error": str(e),
+            })
+        except Exception as e:
+            log_to_db("ERROR", "Partner change stream stopped, polling instead", {
+                "sender_id": None,
+                "error": str(e),
+            })
+        self._poll()
+
+    @staticmethod
+    def _drain(stream) -> int:
+        """Consume the events that follow within the debounce window; returns how many."""
+        drained = 0
+        deadline = time.monotonic() + PARTNER_CATALOG_DEBOUNCE_SECONDS
+        while stream.alive and time.monotonic() < deadline:
+            if stream.try_next() is not None:
+                drained += 1
+        return drained
+
+    def _poll(self) -> None:
+        self.watch_mode = "polling"
+        last_signature = self._version_signature()
+        while True:
+            time.sleep(PARTNER_CATALOG_POLL_SECONDS)
+            try:
+                signature = self._version_signature()
+                if signature != last_signature:
+                    last_signature = signature
+                    self.refresh("version_poll")
+            except Exception as e:
+                log_to_db("ERROR", "Error polling partner catalog version", {
+                    "sender_id": None,
+                    "error": str(e),
+                })
+
+    @staticmethod
+    def _version_signature():
+        doc = db["catalog_versions"].find_one({"_id": CATALOG_VERSION_ID}) or {}
+        return doc.get("version", 0), db["partners"].count_documents({"is_active": True})
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "partners": len(snapshot.partners) if snapshot else 0,
+            "version": snapshot.version if snapshot else 0,
+            "loaded_at": snapshot.loaded_at.isoformat() if snapshot else None,
+            "load_ms": round(snapshot.load_seconds * 1000, 1) if snapshot else 0.0,
+            "watch_mode": self.watch_mode,
+        }
+
+
+_catalog = PartnerCatalog()
+
+
+def get_partner_catalog() -> PartnerCatalog:
+    return _catalog
+
+
+def bump_catalog_version() -> None:
+    """Mark the partners collection as changed for workers that poll."""
+    try:
+        db["catalog_versions"].update_one(
+            {"_id": CATALOG_VERSION_ID},
+            {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True,
+        )
+    except Exception as e:
+        log_to_db("ERROR", "Error bumping partner catalog version", {
+            "sender_id": None,
+            "error": str(e),
+        })
+
+
+def refresh_partner_catalog(reason: str) -> None:
+    """Refresh this worker's snapshot right away and notify the others."""
+    bump_catalog_version()
+    try:
+        _catalog.refresh(reason)
+    except Exception as e:
+        log_to_db("ERROR", "Error refreshing partner catalog", {
+            "sender_id": None,
+            "reason": reason,
+            "error": str(e),
+        })
@@ -0,0 +1,616 @@
+import os
+
+import numpy as np
+
+from utils.embedding_store import ServiceEmbeddings
+from utils.service_ids import normalize_service_name, pack_partner_service_ids
+from utils.service_index import build_service_index
+from utils.spatial_index import LocationIndex, RADIUS_SLACK_KM, SPATIAL_INDEX_MIN_LOCATIONS
+
+# ---------------------------------------------------------------------------
+# Scoring configuration
+# ---------------------------------------------------------------------------
+
+# Gaussian scoring parameters
+DISTANCE_SIGMA_KM = 20.0   # controls how fast distance score decays
+SIMILARITY_SIGMA = 0.3     # controls how fast similarity score decays
+
+# Emergency boost multiplier applied to matching emergency services
+EMERGENCY_SERVICE_BOOST_FACTOR = 3.0
+
+# Keywords that identify "emergency" services/symptoms
+EMERGENCY_KEYWORDS = (
+    "emergencias dentales en niños",
+    "emergencias dentales a niños",
+    "emergencias dentales",
+    "emergencias",
+)
+
+EARTH_RADIUS_KM = 6371.0
+
+# Nearest locations examined first when ranking without a radius
+NEAREST_K_START = 32
+
+# Two-stage retrieval: only partners offering one of the N services nearest
+# to the query (plus emergency services for emergencies) are scored. 0 scores
+# every partner (exact); pruning pays off once the service catalog is large.
+SERVICE_CANDIDATES_TOP_N = int(os.getenv("SERVICE_CANDIDATES_TOP_N", "0"))
+
+# Service-score multiplier for partners that curate a CIE-11/ICHI code matching
+# the query (utils.code_index). Off by default: code matches are only added to
+# the candidates until scripts.evaluate_ranking shows the boost helps
+CODE_MATCH_BOOST_FACTOR = float(os.getenv("CODE_MATCH_BOOST_FACTOR", "1.0"))
+
+
+# ---------------------------------------------------------------------------
+# Vectorized math
+# ---------------------------------------------------------------------------
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row; all-zero rows stay zero (cosine 0, as before)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms != 0)
+
+
+def gaussian_similarity(similarity: np.ndarray, sigma: float = SIMILARITY_SIGMA) -> np.ndarray:
+    """Map raw cosine similarity to [0, 1] with a Gaussian centred at 1."""
+    return np.exp(-0.5 * ((similarity - 1.0) / sigma) ** 2)
+
+
+def gaussian_distance_km(distance_km: np.ndarray, sigma_km: float = DISTANCE_SIGMA_KM) -> np.ndarray:
+    """Map distance (km) to a score in (0, 1] — score decays as distance grows."""
+    return np.exp(-0.5 * (distance_km / sigma_km) ** 2)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Great-circle distance from one (lat, lon) point to arrays of points, in km."""
+    p1, p2 = np.radians(lat1), np.radians(lat2)
+    dlat = np.radians(lat2 - lat1)
+    dlon = np.radians(lon2 - lon1)
+    a = np.sin(dlat / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dlon / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def _segment_max(values: np.ndarray, ptr: np.ndarray, empty: float) -> np.ndarray:
+    """Max of values[ptr[i]:ptr[i+1]] for every segment i (`empty` if none)."""
+    starts = ptr[:-1]
+    nonempty = ptr[1:] > starts
+    out = np.full(len(starts), empty, dtype=np.float64)
+    if values.size and nonempty.any():
+        out[nonempty] = np.maximum.reduceat(values, starts[nonempty])
+    return out
+
+
+def _gather_ranges(ptr: np.ndarray, segments: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Concatenated positions ptr[s]:ptr[s+1] for every segment s (in order),
+    plus the CSR pointer of the result.
+    """
+    starts = ptr[segments]
+    counts = ptr[segments + 1] - starts
+    sub_ptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    positions = np.arange(sub_ptr[-1], dtype=np.int64) - np.repeat(sub_ptr[:-1] - starts, counts)
+    return positions, sub_ptr
+
+
+def top_k_indices(scores: np.ndarray, mask: np.ndarray | None, k: int) -> np.ndarray:
+    """
+    Indices of the k best scores (descending). Ties keep catalog order, exactly
+    like a stable `sort(reverse=True)` over the partner list.
+    """
+    candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(scores))
+    if k <= 0 or candidates.size == 0:
+        return candidates[:0]
+    if candidates.size > k:
+        candidate_scores = scores[candidates]
+        kth = candidate_scores[np.argpartition(-candidate_scores, k - 1)[k - 1]]
+        candidates = candidates[candidate_scores >= kth]
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][:k]
+
+
+# ---------------------------------------------------------------------------
+# Ranking engine
+# ---------------------------------------------------------------------------
+
+class RankingEngine:
+    """
+    Array form of the partner catalog used to rank every partner at once.
+
+      - services:  L2-normalized float32 embedding matrix (ServiceEmbeddings)
+      - incidence: CSR-style (partner -> service rows) via svc_ptr / svc_rows
+      - locations: flat coordinate arrays with the owning partner of each row
+
+    Scoring is the same as the per-partner loop it replaces:
+      service_score = max over the partner's services of gauss(cos(query, svc)),
+                      ×EMERGENCY_SERVICE_BOOST_FACTOR for emergency services
+                      when the query is an emergency
+      final_score   = service_score × gauss(distance) of the best location,
+                      or service_score alone for partners without locations.
+
+    Two-stage retrieval: with SERVICE_CANDIDATES_TOP_N > 0, the query is first
+    matched against the service matrix (utils.service_index) and the inverted
+    postings (post_ptr / post_partners) turn the top-N services into the only
+    partners whose services and locations are scored.
+
+    Partners whose curated CIE-11/ICHI codes match the query (utils.code_index)
+    are always candidates; their service score is multiplied by
+    CODE_MATCH_BOOST_FACTOR only when that is set above its default of 1.0.
+
+    With patient coordinates, a BallTree over the locations (utils.spatial_index)
+    limits exact location scoring to partners near the patient: those with a
+    location inside the radius, or the owners of the nearest locations when
+    ranking without a radius.
+    """
+
+    def __init__(
+        self,
+        partners: list[dict],
+        services: ServiceEmbeddings,
+        partner_service_ids: tuple[np.ndarray, np.ndarray] | None = None,
+    ):
+        self.partners = partners
+
+        # --- Services (already L2-normalized by the store) -----------------
+        self.services = services
+        self.service_index: dict[str, int] = services.index
+        self.service_matrix = services.matrix
+        self.service_is_emergency = np.array([n in EMERGENCY_KEYWORDS for n in services.names], dtype=bool)
+
+        # --- Partner -> service incidence ------------------------------------
+        # Stored integer service ids resolve with one array lookup; names are
+        # only normalized for entries without a usable id
+        ids_ptr, ids = partner_service_ids or pack_partner_service_ids(partners)
+        rows = services.rows_for_ids(ids)
+        unresolved = np.flatnonzero(rows < 0)
+        if len(unresolved):
+            owners = np.searchsorted(ids_ptr, unresolved, side="right") - 1
+            for j, p in zip(unresolved.tolist(), owners.tolist()):
+                name = partners[p]["partner_services"][j - int(ids_ptr[p])]
+                rows[j] = self.service_index.get(normalize_service_name(name), -1)
+        valid = rows >= 0
+        self.svc_rows = rows[valid]
+        self.svc_ptr = np.concatenate(([0], np.cumsum(valid, dtype=np.int64)))[ids_ptr]
+
+        # --- Locations -----------------------------------------------------------
+        loc_partner: list[int] = []
+        loc_index: list[int] = []
+        loc_lat: list[float] = []
+        loc_lon: list[float] = []
+
+        for p, partner in enumerate(partners):
+            for idx, geo in enumerate(partner.get("partner_geo_locations", [])):
+                if not isinstance(geo, dict):
+                    continue
+                glat, glon = geo.get("lat"), geo.get("lon")
+                if glat is None or glon is None:
+                    continue
+                try:
+                    glat, glon = float(glat), float(glon)
+                except (TypeError, ValueError):
+                    continue
+                loc_partner.append(p)
+                loc_index.append(idx)
+                loc_lat.append(glat)
+                loc_lon.append(glon)
+
+        self.loc_partner = np.asarray(loc_partner, dtype=np.int64)
+        self.loc_index = np.asarray(loc_index, dtype=np.int64)
+        self.loc_lat = np.asarray(loc_lat, dtype=np.float64)
+        self.loc_lon = np.asarray(loc_lon, dtype=np.float64)
+        # Locations are appended partner by partner, so they are already
+        # grouped; loc_ptr delimits each partner's slice.
+        self.loc_ptr = np.searchsorted(self.loc_partner, np.arange(len(partners) + 1)).astype(np.int64)
+        self.has_location = self.loc_ptr[1:] > self.loc_ptr[:-1]
+        self._location_index: LocationIndex | None = None
+
+        # --- Inverted postings: service row -> partners offering it ---------
+        owners = np.repeat(np.arange(len(partners), dtype=np.int64), np.diff(self.svc_ptr))
+        order = np.argsort(self.svc_rows, kind="stable")
+        self.post_partners = owners[order]
+        self.post_ptr = np.searchsorted(self.svc_rows[order], np.arange(len(services) + 1)).astype(np.int64)
+        self.emergency_rows = np.flatnonzero(self.service_is_emergency).astype(np.int64)
+        self._service_nn_index = None
+
+        # --- Partner id (as stored in `specialties`) -> row -------------------
+        self.partner_row: dict[str, int] = {str(partner.get("_id")): p for p, partner in enumerate(partners)}
+
+    # -- scoring ---------------------------------------------------------------
+
+    @staticmethod
+    def normalize_query(query_emb: np.ndarray) -> np.ndarray:
+        return normalize_rows(np.asarray(query_emb, dtype=np.float32).reshape(1, -1))[0]
+
+    def service_nn_index(self):
+        """Nearest-neighbor index over the service matrix, built on first use."""
+        if self._service_nn_index is None:
+            self._service_nn_index = build_service_index(self.service_matrix)
+        return self._service_nn_index
+
+    def candidate_partners(self, query: np.ndarray, is_emergency: bool, top_n: int) -> np.ndarray | None:
+        """
+        Stage one of two-stage retrieval: partners offering one of the top_n
+        services nearest to the (normalized) query, plus every emergency
+        service when the query is an emergency (the boost can lift them past
+        closer services). None means "no pruning".
+        """
+        n_services = self.service_matrix.shape[0]
+        if top_n <= 0 or top_n >= n_services:
+            return None
+        rows = self.service_nn_index().search(query, top_n)
+        if is_emergency:
+            rows = np.union1d(rows, self.emergency_rows)
+        positions, _ = _gather_ranges(self.post_ptr, np.unique(rows))
+        return np.unique(self.post_partners[positions])
+
+    def partner_rows(self, partner_ids) -> np.ndarray | None:
+        """Rows of the given partner ids that are in this snapshot (None if none are)."""
+        rows = [self.partner_row[i] for i in partner_ids if i in self.partner_row]
+        return np.unique(np.asarray(rows, dtype=np.int64)) if rows else None
+
+    @staticmethod
+    def boost_code_matches(service_score: np.ndarray, code_rows: np.ndarray | None) -> np.ndarray:
+        if code_rows is None or CODE_MATCH_BOOST_FACTOR == 1.0:
+            return service_score
+        service_score = service_score.copy()
+        service_score[code_rows] *= CODE_MATCH_BOOST_FACTOR
+        return service_score
+
+    def service_scores(
+        self,
+        query_emb: np.ndarray,
+        is_emergency: bool,
+        candidates: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """
+        Per-partner service score (best service) for one query embedding.
+        With `candidates`, only those partners' services are compared and every
+        other partner scores 0.
+        """
+        if self.service_matrix.size == 0:
+            return np.zeros(len(self.partners), dtype=np.float64)
+
+        # One score per service (the matrix is small next to the incidences)
+        query = self.normalize_query(query_emb)
+        similarity = (self.service_matrix @ query).astype(np.float64)
+        scores = gaussian_similarity(similarity, sigma=SIMILARITY_SIGMA)
+        if is_emergency:
+            scores = np.where(self.service_is_emergency, scores * EMERGENCY_SERVICE_BOOST_FACTOR, scores)
+
+        if candidates is None:
+            return _segment_max(scores[self.svc_rows], self.svc_ptr, empty=0.0)
+
+        positions, sub_ptr = _gather_ranges(self.svc_ptr, candidates)
+        service_score = np.zeros(len(self.partners), dtype=np.float64)
+        service_score[candidates] = _segment_max(scores[self.svc_rows[positions]], sub_ptr, empty=0.0)
+        return service_score
+
+    def _patient_point(self, patient_lat, patient_lon) -> tuple[float, float] | None:
+        # Same truthiness check as the original loop (0.0 counts as missing)
+        try:
+            if patient_lat and patient_lon:
+                return float(patient_lat), float(patient_lon)
+        except (TypeError, ValueError):
+            pass
+        return None
+
+    def warm(self) -> None:
+        """Build the lazy indexes now (off the request path)."""
+        self.location_index()
+        if 0 < SERVICE_CANDIDATES_TOP_N < self.service_matrix.shape[0]:
+            self.service_nn_index()
+
+    def location_index(self) -> LocationIndex | None:
+        """BallTree over all locations, built on first use (None for small catalogs)."""
+        if self._location_index is None and self.loc_lat.size >= SPATIAL_INDEX_MIN_LOCATIONS:
+            self._location_index = LocationIndex(self.loc_lat, self.loc_lon)
+        return self._location_index
+
+    def score_partners(
+        self,
+        service_score: np.ndarray,
+        patient: tuple[float, float] | None,
+        candidates: np.ndarray | None = None,
+    ) -> dict:
+        """
+        Exact location scoring for `candidates` (sorted partner indices, all
+        partners if None), over every location of each candidate.
+
+        Returns per-candidate arrays: partners, final_score, best_loc (location
+        row, -1 if the partner has no location), distance_km, distance_score
+        and combined for the best location.
+        """
+        if candidates is None:
+            candidates = np.arange(len(self.partners), dtype=np.int64)
+        rows, sub_ptr = _gather_ranges(self.loc_ptr, candidates)
+        counts = np.diff(sub_ptr)
+        owner = np.repeat(np.arange(len(candidates)), counts)
+        has_location = counts > 0
+
+        if patient is not None:
+            distance_km = haversine_km(patient[0], patient[1], self.loc_lat[rows], self.loc_lon[rows])
+            distance_score = gaussian_distance_km(distance_km, sigma_km=DISTANCE_SIGMA_KM)
+        else:
+            distance_km = np.full(rows.shape, np.nan)
+            distance_score = np.zeros(rows.shape)
+
+        candidate_service = service_score[candidates]
+        combined = candidate_service[owner] * distance_score
+
+        # Best location = first location reaching the partner's max combined score
+        best_combined = _segment_max(combined, sub_ptr, empty=-1.0)
+        is_best = combined == best_combined[owner]
+        positions = np.where(is_best, np.arange(combined.size), combined.size)
+        best = np.full(len(candidates), -1, dtype=np.int64)
+        if combined.size:
+            best[has_location] = np.minimum.reduceat(positions, sub_ptr[:-1][has_location])
+        picked = best[has_location]
+
+        best_loc = np.full(len(candidates), -1, dtype=np.int64)
+        best_loc[has_location] = rows[picked]
+        partner_distance = np.full(len(candidates), np.nan)
+        partner_distance[has_location] = distance_km[picked]
+        partner_distance_score = np.zeros(len(candidates))
+        partner_distance_score[has_location] = distance_score[picked]
+        # Partners without locations are ranked distance-agnostic
+        partner_combined = candidate_service.astype(np.float64)
+        partner_combined[has_location] = combined[picked]
+
+        return {
+            "partners": candidates,
+            "final_score": np.where(has_location, best_combined, candidate_service),
+            "best_loc": best_loc,
+            "distance_km": partner_distance,
+            "distance_score": partner_distance_score,
+            "combined": partner_combined,
+        }
+
+    def score_within_radius(
+        self,
+        service_score: np.ndarray,
+        patient,
+        max_distance_km: float,
+        allowed: np.ndarray | None = None,
+    ) -> dict:
+        """Score only partners having at least one location inside the radius (and in `allowed`)."""
+        index = self.location_index()
+        candidates = allowed
+        if index is not None:
+            rows = index.within_radius(patient[0], patient[1], max_distance_km)
+            candidates = np.unique(self.loc_partner[rows])
+            if allowed is not None:
+                candidates = np.intersect1d(candidates, allowed, assume_unique=True)
+        return self.score_partners(service_score, patient, candidates)
+
+    def score_nearest(
+        self,
+        service_score: np.ndarray,
+        patient,
+        top_k: int,
+        allowed: np.ndarray | None = None,
+    ) -> dict:
+        """
+        Score enough partners to know the global top_k: the owners of the k
+        nearest locations plus every partner without locations. k grows until
+        the top_k-th score beats the best score any farther partner could
+        reach (max service score × gauss(distance of the k-th location)).
+        With `allowed`, partners outside it are never scored (they score 0).
+        """
+        index = self.location_index()
+        total = int(self.loc_lat.size)
+        if index is None or patient is None:
+            return self.score_partners(service_score, patient, allowed)
+
+        no_location = np.flatnonzero(~self.has_location)
+        if allowed is not None:
+            no_location = np.intersect1d(no_location, allowed, assume_unique=True)
+        max_service = float(service_score.max()) if service_score.size else 0.0
+        k = max(NEAREST_K_START, 4 * top_k)
+        while k < total:
+            rows, distance = index.nearest(patient[0], patient[1], k)
+            candidates = np.union1d(self.loc_partner[rows], no_location)
+            if allowed is not None:
+                candidates = np.intersect1d(candidates, allowed, assume_unique=True)
+            scored = self.score_partners(service_score, patient, candidates)
+            if len(candidates) >= top_k:
+                kth_best = np.partition(scored["final_score"], -top_k)[-top_k]
+                bound = max_service * float(gaussian_distance_km(max(distance[-1] - RADIUS_SLACK_KM, 0.0)))
+                if kth_best > bound:
+                    return scored
+            k *= 4
+        return self.score_partners(service_score, patient, allowed)
+
+    def score(
+        self,
+        query_emb: np.ndarray,
+        is_emergency: bool,
+        patient_lat,
+        patient_lon,
+        max_distance_km: float | None,
+        top_k: int,
+        extracted: dict | None = None,
+        top_n: int = SERVICE_CANDIDATES_TOP_N,
+        code_partner_ids=None,
+    ) -> "RankingResult":
+        """
+        Score one query; the result serves both the in-radius and the global top-k.
+        `code_partner_ids` are the partners whose curated codes matched the query.
+        """
+        query = self.normalize_query(query_emb)
+        code_rows = self.partner_rows(code_partner_ids or ())
+        candidates = self.candidate_partners(query, is_emergency, top_n)
+        if candidates is not None and code_rows is not None:
+            candidates = np.union1d(candidates, code_rows)
+        service_score = self.boost_code_matches(
+            self.service_scores(query, is_emergency, candidates), code_rows,
+        )
+        patient = self._patient_point(patient_lat, patient_lon)
+        return RankingResult(
+            self, service_score, patient, max_distance_km, top_k, extracted,
+            candidates=candidates, query=query, is_emergency=is_emergency, code_rows=code_rows,
+        )
+
+    def rank(
+        self,
+        query_emb: np.ndarray,
+        is_emergency: bool,
+        patient_lat,
+        patient_lon,
+        max_distance_km: float | None,
+        top_k: int,
+        extracted: dict | None = None,
+        top_n: int = SERVICE_CANDIDATES_TOP_N,
+    ) -> list[dict]:
+        """Top-k partners, optionally restricted to those whose best location is within the radius."""
+        return self.score(
+            query_emb, is_emergency, patient_lat, patient_lon, max_distance_km, top_k, extracted, top_n,
+        ).in_radius
+
+    # -- results ---------------------------------------------------------------
+
+    def build_result(self, scored: dict, i: int, service_score: np.ndarray, extracted: dict | None) -> dict:
+        """Materialize the partner dict expected by the formatting/audit helpers."""
+        p = int(scored["partners"][i])
+        partner = self.partners[p]
+        score = float(service_score[p])
+        loc = int(scored["best_loc"][i])
+
+        if loc >= 0:
+            geo = partner["partner_geo_locations"][int(self.loc_index[loc])]
+            distance = scored["distance_km"][i]
+            distance_km = None if np.isnan(distance) else float(distance)
+            best_location = {
+                "location_index": int(self.loc_index[loc]),
+                "query": geo.get("query"),
+                "name": geo.get("name"),
+                "direccion": geo.get("address"),
+                "lat": float(self.loc_lat[loc]),
+                "lon": float(self.loc_lon[loc]),
+                "maps_url": geo.get("maps_url"),
+                "distance_km": distance_km,
+                "distance_score": float(scored["distance_score"][i]),
+                "combined_score": float(scored["combined"][i]),
+            }
+        else:
+            # Fallback when no geo-location is available
+            best_location = {
+                "location_index": None,
+                "query": None,
+                "name": None,
+                "direccion": None,
+                "lat": None,
+                "lon": None,
+                "maps_url": None,
+                "distance_km": None,
+                "distance_score": 0.0,
+                "combined_score": score,  # distance-agnostic
+            }
+
+        return {
+            # Original MongoDB document fields
+            **{k: v for k, v in partner.items() if k != "_id"},
+            "_id": partner.get("_id"),
+            # Scoring metadata
+            "service_score": score,
+            "overall_similarity": score,
+            "final_score": float(scored["final_score"][i]),
+            # Location fields expected by format helpers
+            "closest_location": best_location,
+            "distance_km": best_location["distance_km"],
+            # Extra signals for audit trail
+            "extracted_signals": extracted,
+        }
+
+
+class RankingResult:
+    """
+    Scores of one query against the catalog. The service scores are computed
+    once; `in_radius` (top-k inside max_distance_km, or the global top-k when
+    no radius is set) and `global_top` (radius ignored, for the fallback
+    message) reuse them and are each computed at most once.
+
+    When two-stage retrieval pruned the catalog (`candidates`) and a list
+    comes back shorter than top_k, it is recomputed over every partner, so
+    pruning never turns a referral into "no partner found".
+    """
+
+    def __init__(
+        self,
+        engine: RankingEngine,
+        service_score: np.ndarray,
+        patient: tuple[float, float] | None,
+        max_distance_km: float | None,
+        top_k: int,
+        extracted: dict | None,
+        candidates: np.ndarray | None = None,
+        query: np.ndarray | None = None,
+        is_emergency: bool = False,
+        code_rows: np.ndarray | None = None,
+    ):
+        self.engine = engine
+        self.service_score = service_score
+        self.patient = patient
+        self.max_distance_km = max_distance_km
+        self.top_k = top_k
+        self.extracted = extracted
+        self.candidates = candidates
+        self.query = query
+        self.is_emergency = is_emergency
+        self.code_rows = code_rows
+        self._in_radius: list[dict] | None = None
+        self._global_top: list[dict] | None = None
+
+    def _widen(self) -> bool:
+        """Drop two-stage pruning and score every partner; False if nothing was pruned."""
+        if self.candidates is None or self.query is None:
+            return False
+        self.candidates = None
+        self.service_score = self.engine.boost_code_matches(
+            self.engine.service_scores(self.query, self.is_emergency), self.code_rows,
+        )
+        return True
+
+    def _select(self, scored: dict, mask: np.ndarray | None) -> list[dict]:
+        selected = top_k_indices(scored["final_score"], mask, self.top_k)
+        return [
+            self.engine.build_result(scored, int(i), self.service_score, self.extracted)
+            for i in selected
+        ]
+
+    def _rank_in_radius(self) -> list[dict]:
+        scored = self.engine.score_within_radius(
+            self.service_score, self.patient, self.max_distance_km, self.candidates,
+        )
+        distance = scored["distance_km"]
+        mask = ~np.isnan(distance) & (distance <= self.max_distance_km)
+        return self._select(scored, mask)
+
+    def _rank_global(self) -> list[dict]:
+        scored = self.engine.score_nearest(self.service_score, self.patient, self.top_k, self.candidates)
+        return self._select(scored, None)
+
+    @property
+    def in_radius(self) -> list[dict]:
+        if self._in_radius is None:
+            if self.max_distance_km is None:
+                self._in_radius = self.global_top
+            elif self.patient is None:
+                # No distances at all: nothing can be inside the radius
+                self._in_radius = []
+            else:
+                results = self._rank_in_radius()
+                if len(results) < self.top_k and self._widen():
+                    self._global_top = None
+                    results = self._rank_in_radius()
+                self._in_radius = results
+        return self._in_radius
+
+    @property
+    def global_top(self) -> list[dict]:
+        if self._global_top is None:
+            results = self._rank_global()
+            if len(results) < self.top_k and self._widen():
+                results = self._rank_global()
+            self._global_top = results
+        return self._global_top
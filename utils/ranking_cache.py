@@ -0,0 +1,194 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.embedding_cache import normalize_chunk
+from utils.ranking import RankingEngine, RankingResult
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+RANKING_CACHE_TTL_SECONDS = float(os.getenv("RANKING_CACHE_TTL_SECONDS", "300"))
+# Each entry holds one float64 score per partner, so keep this modest on big catalogs
+RANKING_CACHE_MAX_ENTRIES = int(os.getenv("RANKING_CACHE_MAX_ENTRIES", "512"))
+# Geohash length of the location cell (5 ≈ 4.9 x 4.9 km); 0 keys on symptoms only
+RANKING_CACHE_GEOHASH_PRECISION = int(os.getenv("RANKING_CACHE_GEOHASH_PRECISION", "5"))
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(lat: float, lon: float, precision: int) -> str:
+    """Standard base32 geohash of a point."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    cell, bits, value, even = [], 0, 0, True
+    while len(cell) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            cell.append(_GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(cell)
+
+
+def symptom_signature(symptoms: list[str]) -> str:
+    """Order- and formatting-insensitive digest of the patient's symptom list."""
+    chunks = sorted({normalize_chunk(s) for s in symptoms or []} - {""})
+    return hashlib.sha1("\x1f".join(chunks).encode("utf-8")).hexdigest()[:20]
+
+
+class _Entry:
+    __slots__ = ("expires_at", "service_score", "candidates", "query", "is_emergency", "extracted", "code_rows")
+
+    def __init__(self, expires_at: float, result: RankingResult):
+        self.expires_at = expires_at
+        # Shared read-only across every hit
+        self.service_score = result.service_score.copy()
+        self.service_score.flags.writeable = False
+        self.candidates = result.candidates
+        self.query = result.query
+        self.is_emergency = result.is_emergency
+        self.extracted = result.extracted
+        self.code_rows = result.code_rows
+
+
+class RankingCache:
+    """
+    Short-lived cache of the expensive half of rank_partners: Groq
+    extraction, query encoding and the per-partner service scores.
+
+    Keyed on the canonical symptom signature plus the geohash cell of the
+    patient. On a hit the distance stage is still run for the patient's exact
+    point (it is the cheap part), so results never come from a neighbour's
+    location. Entries are dropped wholesale when the partner catalog or the
+    service embeddings change version.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = RANKING_CACHE_TTL_SECONDS,
+        max_entries: int = RANKING_CACHE_MAX_ENTRIES,
+        precision: int = RANKING_CACHE_GEOHASH_PRECISION,
+    ):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.precision = precision
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        # The partner catalog publishes a new engine exactly when the partners
+        # or the service embeddings change
+        self._engine: RankingEngine | None = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "stores": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def key(self, symptoms: list[str], lat, lon) -> tuple[str, str]:
+        cell = ""
+        if self.precision > 0:
+            # Same "0.0 counts as missing" rule as RankingEngine._patient_point
+            try:
+                if lat and lon:
+                    cell = geohash(float(lat), float(lon), self.precision)
+            except (TypeError, ValueError):
+                cell = ""
+        return symptom_signature(symptoms), cell
+
+    def _check_engine(self, engine: RankingEngine) -> None:
+        if engine is not self._engine:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+            self._engine = engine
+
+    def get(
+        self,
+        key: tuple,
+        engine: RankingEngine,
+        patient_lat,
+        patient_lon,
+        max_distance_km: float | None,
+        top_k: int,
+    ) -> RankingResult | None:
+        """A fresh RankingResult for this patient from cached scores, or None."""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._check_engine(engine)
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                del self._entries[key]
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+
+        return RankingResult(
+            engine,
+            entry.service_score,
+            engine._patient_point(patient_lat, patient_lon),
+            max_distance_km,
+            top_k,
+            entry.extracted,
+            candidates=entry.candidates,
+            query=entry.query,
+            is_emergency=entry.is_emergency,
+            code_rows=entry.code_rows,
+        )
+
+    def put(self, key: tuple, result: RankingResult) -> None:
+        if not self.enabled:
+            return
+        entry = _Entry(time.monotonic() + self.ttl, result)
+        with self._lock:
+            self._check_engine(result.engine)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            entries = len(self._entries)
+            engine = self._engine
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "entries": entries,
+            "hit_rate": round(stats["hits"] / lookups, 4) if lookups else None,
+            "ttl_seconds": self.ttl,
+            "max_entries": self.max_entries,
+            "geohash_precision": self.precision,
+            "services_version": engine.services.version if engine is not None else None,
+        }
+
+
+_cache: RankingCache | None = None
+
+
+def get_ranking_cache() -> RankingCache:
+    global _cache
+    if _cache is None:
+        _cache = RankingCache()
+    return _cache
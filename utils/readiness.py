@@ -0,0 +1,230 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from utils.db_tools import log_to_db
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Set to "false" to skip warmup (e.g. local development with reload)
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+# Failed required steps are retried so a transient outage at boot (Mongo,
+# sidecar not up yet) does not leave the instance unready forever
+WARMUP_RETRIES = int(os.getenv("WARMUP_RETRIES", "5"))
+WARMUP_RETRY_DELAY_SECONDS = 5.0
+
+# ---------------------------------------------------------------------------
+# State
+# ---------------------------------------------------------------------------
+
+# name -> {"state", "required", "attempts", "load_ms", "error", "detail", "finished_at"}
+_components: dict[str, dict] = {}
+_started_at: datetime | None = None
+
+
+def _register(name: str, required: bool) -> None:
+    _components[name] = {
+        "state": "pending",
+        "required": required,
+        "attempts": 0,
+        "load_ms": None,
+        "error": None,
+        "detail": None,
+        "finished_at": None,
+    }
+
+
+async def _warm(name: str, step) -> None:
+    """Run one warmup step, recording its state and duration."""
+    component = _components[name]
+    component["state"] = "warming"
+    component["attempts"] += 1
+    start = time.perf_counter()
+    try:
+        detail = await step()
+        component["state"] = "ready"
+        component["detail"] = detail
+        component["error"] = None
+    except Exception as e:
+        component["state"] = "failed"
+        component["error"] = str(e)
+        log_to_db("ERROR", "Warmup step failed", {
+            "sender_id": None,
+            "component": name,
+            "attempt": component["attempts"],
+            "error": str(e),
+        })
+    component["load_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    component["finished_at"] = datetime.utcnow().isoformat()
+
+
+# ---------------------------------------------------------------------------
+# Warmup steps
+# ---------------------------------------------------------------------------
+
+async def _warm_mongo():
+    from utils.db_tools import client
+
+    await asyncio.to_thread(client.admin.command, "ping")
+
+
+async def _warm_http():
+    from utils.http_client import get_http_client
+
+    get_http_client()
+
+
+async def _warm_embedding_model():
+    from utils.embedding_service import EmbeddingService, get_embedding_service
+
+    service = get_embedding_service()
+    if isinstance(service, EmbeddingService):
+        # Loads the model on the inference thread and runs one encode
+        await asyncio.to_thread(service.warm_up)
+        return {"mode": "local", "model_key": service.model_key}
+    # Also caches the model key, so request handlers never wait on the socket
+    info = await service.fetch_info()
+    return {"mode": "sidecar", "model_key": info.get("model_key")}
+
+
+async def _warm_service_embeddings():
+    from utils.embedding_store import get_service_embeddings
+
+    services = await asyncio.to_thread(get_service_embeddings)
+    return {"services": len(services), "version": services.version}
+
+
+async def _warm_partner_catalog():
+    from utils.partner_catalog import get_partner_catalog
+
+    catalog = get_partner_catalog()
+    # Loads the partners and builds the engine with its indexes
+    engine = await asyncio.to_thread(catalog.get_engine)
+    partners = len(engine.partners)
+    return {"partners": partners, "version": catalog.version}
+
+
+async def _warm_partner_cards():
+    from utils.partner_cards import prerender_all_partner_cards
+
+    return {"cards": await prerender_all_partner_cards()}
+
+
+async def _warm_code_index():
+    from utils.code_index import get_code_index
+
+    index = get_code_index()
+    await asyncio.to_thread(index.ensure_loaded)
+    return {"codes": len(index.code_partners), "version": index.version}
+
+
+async def _warm_groq():
+    from utils.llm import groq_client
+
+    # Opens the TLS connection pool without spending tokens
+    await groq_client.models.list()
+
+
+async def _warm_gazetteer():
+    from utils.gazetteer import get_gazetteer
+
+    gazetteer = await asyncio.to_thread(get_gazetteer)
+    return {"entries": len(gazetteer.entries)}
+
+
+# (name, step, required for readiness)
+WARMUP_STEPS = (
+    ("mongo", _warm_mongo, True),
+    ("http_pool", _warm_http, True),
+    ("embedding_model", _warm_embedding_model, True),
+    ("service_embeddings", _warm_service_embeddings, True),
+    ("partner_catalog", _warm_partner_catalog, True),
+    ("partner_cards", _warm_partner_cards, False),
+    ("code_index", _warm_code_index, False),
+    ("groq", _warm_groq, False),
+    ("gazetteer", _warm_gazetteer, False),
+)
+
+
+async def warm_up() -> None:
+    """
+    Preload everything the first referral would otherwise load lazily.
+    Independent steps run concurrently; the partner catalog and cards wait
+    for the service embeddings they are built from.
+    """
+    global _started_at
+    _started_at = datetime.utcnow()
+    steps = {name: step for name, step, _ in WARMUP_STEPS}
+    for name, _, required in WARMUP_STEPS:
+        _register(name, required)
+
+    async def catalog_chain():
+        await _warm("service_embeddings", steps["service_embeddings"])
+        await _warm("partner_catalog", steps["partner_catalog"])
+        await _warm("partner_cards", steps["partner_cards"])
+
+    await asyncio.gather(
+        _warm("mongo", steps["mongo"]),
+        _warm("http_pool", steps["http_pool"]),
+        _warm("embedding_model", steps["embedding_model"]),
+        _warm("code_index", steps["code_index"]),
+        _warm("groq", steps["groq"]),
+        _warm("gazetteer", steps["gazetteer"]),
+        catalog_chain(),
+    )
+
+    delay = WARMUP_RETRY_DELAY_SECONDS
+    for retry in range(1, WARMUP_RETRIES + 1):
+        failed = _failed_required()
+        if not failed:
+            break
+        log_to_db("INFO", "Retrying warmup steps", {
+            "sender_id": None,
+            "components": failed,
+            "retry": retry,
+            "delay_seconds": delay,
+        })
+        await asyncio.sleep(delay)
+        delay *= 2
+        # In declaration order, so the catalog still follows the service embeddings
+        for name in failed:
+            await _warm(name, steps[name])
+
+    failed = _failed_required()
+    if failed:
+        log_to_db("ERROR", "Warmup gave up on required steps", {
+            "sender_id": None,
+            "components": {name: _components[name]["error"] for name in failed},
+            "retries": WARMUP_RETRIES,
+        })
+
+    log_to_db("INFO", "Warmup finished", {
+        "sender_id": None,
+        "components": {name: c["state"] for name, c in _components.items()},
+        "ready": is_ready(),
+    })
+
+
+def _failed_required() -> list[str]:
+    return [name for name, _, required in WARMUP_STEPS
+            if required and _components[name]["state"] == "failed"]
+
+
+def is_ready() -> bool:
+    if not WARMUP_ON_STARTUP:
+        return True
+    required = [c for c in _components.values() if c["required"]]
+    return bool(required) and all(c["state"] == "ready" for c in required)
+
+
+def get_readiness() -> dict:
+    return {
+        "ready": is_ready(),
+        "warmup_enabled": WARMUP_ON_STARTUP,
+        "started_at": _started_at.isoformat() if _started_at else None,
+        "components": {name: dict(c) for name, c in _components.items()},
+    }
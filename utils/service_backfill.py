@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from utils.db_tools import db, log_to_db
+from utils.service_ids import ensure_service_ids, normalize_service_name, sync_partner_service_ids
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Service names encoded per model call / written per bulk_write
+SERVICE_BACKFILL_BATCH_SIZE = int(os.getenv("SERVICE_BACKFILL_BATCH_SIZE", "256"))
+
+
+class ServiceBackfill:
+    """
+    Embeds `partner_services` names that have no row in `services`, so a
+    partner edited with new service names is ranked on them instead of
+    scoring 0 until the offline notebook is re-run.
+
+    Runs are serialized; a run requested while another is in progress is
+    folded into one follow-up run.
+    """
+
+    def __init__(self, batch_size: int = SERVICE_BACKFILL_BATCH_SIZE):
+        self.batch_size = max(1, batch_size)
+        self.last_run: dict | None = None
+        self.runs = 0
+        self._lock = threading.Lock()
+        self._rerun = threading.Event()
+
+    @staticmethod
+    def find_missing() -> tuple[list[tuple[str, object]], int]:
+        """
+        ([(service name, _id of its existing `services` doc or None)] for names
+        used by partners but not embedded, distinct names scanned).
+        """
+        embedded = set()
+        # Docs without an embedding, by normalized name: filled in place
+        existing: dict[str, object] = {}
+        for item in db["services"].find({}, {"og_service_name": 1, "embedding": {"$slice": 1}}):
+            name = normalize_service_name(item.get("og_service_name", ""))
+            if not name:
+                continue
+            if item.get("embedding"):
+                embedded.add(name)
+            else:
+                existing.setdefault(name, item["_id"])
+
+        # Keep the first spelling seen; the store matches on the normalized name
+        missing: dict[str, tuple[str, object]] = {}
+        scanned = set()
+        for name in db["partners"].distinct("partner_services"):
+            if not isinstance(name, str) or not name.strip():
+                continue
+            key = normalize_service_name(name)
+            scanned.add(key)
+            if key not in embedded and key not in missing:
+                missing[key] = (name.strip(), existing.get(key))
+        return list(missing.values()), len(scanned)
+
+    def run(self, reason: str = "manual") -> dict:
+        """Embed and upsert every missing service name (blocking)."""
+        if not self._lock.acquire(blocking=False):
+            self._rerun.set()
+            return {"status": "queued", "reason": reason}
+        try:
+            report = self._run_once(reason)
+            while self._rerun.is_set():
+                self._rerun.clear()
+                report = self._run_once(f"{reason}+queued")
+            return report
+        finally:
+            self._lock.release()
+
+    def _run_once(self, reason: str) -> dict:
+        from utils.embedding_service import get_embedding_service
+
+        started = time.perf_counter()
+        missing, scanned = self.find_missing()
+        scan_s = time.perf_counter() - started
+
+        encoder = get_embedding_service()
+        model_key = encoder.model_key if missing else None
+        encode_s = write_s = 0.0
+        embedded = batches = 0
+
+        for offset in range(0, len(missing), self.batch_size):
+            batch = missing[offset:offset + self.batch_size]
+            t0 = time.perf_counter()
+            vectors = encoder.encode_sync([name for name, _ in batch])
+            t1 = time.perf_counter()
+            now = datetime.utcnow()
+            operations = []
+            for (name, existing_id), vector in zip(batch, vectors):
+                fields = {
+                    "embedding": vector.astype(float).tolist(),
+                    "embedding_model": model_key,
+                    "embedded_at": now,
+                    "embedded_by": "backfill",
+                }
+                if existing_id is not None:
+                    # Same service under another spelling: keep its doc (and service_id)
+                    operations.append(UpdateOne({"_id": existing_id}, {"$set": fields}))
+                else:
+                    operations.append(UpdateOne(
+                        {"og_service_name": name},
+                        {"$set": {"og_service_name": name, **fields}},
+                        upsert=True,
+                    ))
+            result = db["services"].bulk_write(operations, ordered=False)
+            write_s += time.perf_counter() - t1
+            encode_s += t1 - t0
+            embedded += result.upserted_count + result.modified_count
+            batches += 1
+
+        if embedded:
+            # New rows get a service_id and partners naming them pick it up
+            ensure_service_ids()
+            sync_partner_service_ids()
+            self._publish()
+
+        report = {
+            "status": "ok",
+            "reason": reason,
+            "scanned_names": scanned,
+            "missing": len(missing),
+            "embedded": embedded,
+            "batches": batches,
+            "model_key": model_key,
+            "scan_ms": round(scan_s * 1000, 1),
+            "encode_ms": round(encode_s * 1000, 1),
+            "write_ms": round(write_s * 1000, 1),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "finished_at": datetime.utcnow().isoformat(),
+        }
+        self.last_run = report
+        self.runs += 1
+        log_to_db("INFO", "Service embedding backfill finished", {"sender_id": None, **report})
+        return report
+
+    @staticmethod
+    def _publish() -> None:
+        """Make the new rows rankable: sidecar matrix first (if any), then this worker's store."""
+        from utils.embedding_store import reload_service_embeddings
+
+        reload_service_embeddings("backfill")
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "running": self._lock.locked(),
+            "batch_size": self.batch_size,
+            "last_run": self.last_run,
+        }
+
+
+_backfill = ServiceBackfill()
+
+
+def get_service_backfill() -> ServiceBackfill:
+    return _backfill
+
+
+def run_service_backfill(reason: str) -> None:
+    """Background-task entry point: errors are logged, never raised."""
+    try:
+        _backfill.run(reason)
+    except Exception as e:
+        log_to_db("ERROR", "Service embedding backfill failed", {
+            "sender_id": None,
+            "reason": reason,
+            "error": str(e),
+        })
@@ -0,0 +1,156 @@
+"""
+Stable integer ids for services.
+
+Every `services` document gets a `service_id` (from a counter, never reused)
+and every partner stores `partner_service_ids`, aligned with its
+`partner_services` (None where the name has no embedded service yet), plus
+`partner_service_names_hash`, a digest of the normalized names the ids were
+resolved from. Any write that changes `partner_services` without resyncing
+leaves the hash stale, and the ids are then ignored. The partner catalog packs them into NumPy arrays so the ranking engine maps a
+partner's services to matrix rows with one array lookup instead of
+normalizing and hashing every name.
+
+    python -m utils.service_ids     # assign missing ids and resync every partner
+"""
+import hashlib
+import json
+
+import numpy as np
+from pymongo import ReturnDocument, UpdateOne
+
+# Document in `counters` holding the last service_id handed out
+SERVICE_ID_COUNTER = "service_id"
+
+_indexes_ready = False
+
+
+def normalize_service_name(name) -> str:
+    """The one normalization used to match partner service names to `services` rows."""
+    return str(name).strip().lower()
+
+
+def _ensure_indexes() -> None:
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    from utils.db_tools import db, log_to_db
+
+    try:
+        db["services"].create_index("service_id", unique=True, sparse=True)
+        _indexes_ready = True
+    except Exception as e:
+        log_to_db("ERROR", "Error creating service_id index", {
+            "sender_id": None,
+            "error": str(e),
+        })
+
+
+def allocate_service_ids(n: int) -> range:
+    """Reserve n consecutive ids atomically."""
+    from utils.db_tools import db
+
+    doc = db["counters"].find_one_and_update(
+        {"_id": SERVICE_ID_COUNTER},
+        {"$inc": {"seq": n}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    end = int(doc["seq"])
+    return range(end - n + 1, end + 1)
+
+
+def ensure_service_ids() -> int:
+    """Give every service without a service_id a new one; returns how many were assigned."""
+    from utils.db_tools import db
+
+    _ensure_indexes()
+    missing = [doc["_id"] for doc in db["services"].find({"service_id": {"$exists": False}}, {"_id": 1})]
+    if not missing:
+        return 0
+    ids = allocate_service_ids(len(missing))
+    db["services"].bulk_write(
+        [UpdateOne({"_id": _id, "service_id": {"$exists": False}}, {"$set": {"service_id": sid}})
+         for _id, sid in zip(missing, ids)],
+        ordered=False,
+    )
+    return len(missing)
+
+
+def service_id_map() -> dict[str, int]:
+    """Normalized service name -> service_id, for services that have an embedding."""
+    from utils.db_tools import db
+
+    id_map: dict[str, int] = {}
+    query = {"embedding.0": {"$exists": True}, "service_id": {"$exists": True}}
+    for item in db["services"].find(query, {"og_service_name": 1, "service_id": 1}):
+        name = normalize_service_name(item.get("og_service_name", ""))
+        if name:
+            id_map[name] = int(item["service_id"])
+    return id_map
+
+
+def partner_service_ids(names: list, id_map: dict[str, int]) -> list[int | None]:
+    return [id_map.get(normalize_service_name(name)) for name in names or []]
+
+
+def service_names_hash(names: list) -> str:
+    """Digest of the normalized, ordered names a partner's ids were resolved from."""
+    normalized = [normalize_service_name(name) for name in names or []]
+    return hashlib.sha1(json.dumps(normalized, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def sync_partner_service_ids(partner_ids: list | None = None) -> int:
+    """
+    Recompute `partner_service_ids` for the given partner _ids (all partners
+    if None); only changed documents are written. Returns that count.
+    """
+    from utils.db_tools import db
+
+    id_map = service_id_map()
+    query = {"_id": {"$in": list(partner_ids)}} if partner_ids is not None else {}
+    updates = []
+    projection = {"partner_services": 1, "partner_service_ids": 1, "partner_service_names_hash": 1}
+    for partner in db["partners"].find(query, projection):
+        names = partner.get("partner_services")
+        ids = partner_service_ids(names, id_map)
+        names_hash = service_names_hash(names)
+        if partner.get("partner_service_ids") != ids or partner.get("partner_service_names_hash") != names_hash:
+            updates.append(UpdateOne({"_id": partner["_id"]}, {"$set": {
+                "partner_service_ids": ids,
+                "partner_service_names_hash": names_hash,
+            }}))
+    if updates:
+        db["partners"].bulk_write(updates, ordered=False)
+    return len(updates)
+
+
+def pack_partner_service_ids(partners: list[dict]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    CSR form of the partners' service ids, aligned with `partner_services`:
+    (ptr int64 of len(partners) + 1, ids int32). -1 marks a name without a
+    stored id, including every name of a partner whose id list is missing or
+    whose names hash no longer matches its names; the engine resolves those
+    by name.
+    """
+    ptr = np.zeros(len(partners) + 1, dtype=np.int64)
+    ids: list[int] = []
+    for p, partner in enumerate(partners):
+        names = partner.get("partner_services", [])
+        stored = partner.get("partner_service_ids")
+        fresh = partner.get("partner_service_names_hash") == service_names_hash(names)
+        if fresh and isinstance(stored, list) and len(stored) == len(names):
+            ids.extend(-1 if i is None else int(i) for i in stored)
+        else:
+            ids.extend([-1] * len(names))
+        ptr[p + 1] = len(ids)
+    return ptr, np.asarray(ids, dtype=np.int32)
+
+
+def main():
+    assigned = ensure_service_ids()
+    synced = sync_partner_service_ids()
+    print(f"service ids assigned: {assigned}, partners updated: {synced}")
+
+
+if __name__ == "__main__":
+    main()
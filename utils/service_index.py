@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# "brute" (exact matrix product) or "hnsw" (hnswlib, optional dependency)
+SERVICE_INDEX_BACKEND = os.getenv("SERVICE_INDEX_BACKEND", "brute").lower()
+
+# HNSW build/search parameters
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 128
+
+
+class BruteForceServiceIndex:
+    """Exact top-N by cosine over the L2-normalized service matrix."""
+
+    name = "brute"
+
+    def __init__(self, matrix: np.ndarray):
+        self.matrix = matrix
+
+    def search(self, query: np.ndarray, n: int) -> np.ndarray:
+        """Rows of the n services most similar to a normalized query (unordered)."""
+        size = self.matrix.shape[0]
+        if n >= size:
+            return np.arange(size, dtype=np.int64)
+        similarity = self.matrix @ query
+        return np.argpartition(-similarity, n - 1)[:n].astype(np.int64)
+
+
+class HnswServiceIndex:
+    """Approximate top-N by cosine with hnswlib (pip install hnswlib)."""
+
+    name = "hnsw"
+
+    def __init__(self, matrix: np.ndarray):
+        import hnswlib
+
+        self.size, dim = matrix.shape
+        self._index = hnswlib.Index(space="ip", dim=dim)
+        self._index.init_index(max_elements=max(self.size, 1), M=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION)
+        if self.size:
+            self._index.add_items(matrix, np.arange(self.size))
+        self._index.set_ef(HNSW_EF_SEARCH)
+
+    def search(self, query: np.ndarray, n: int) -> np.ndarray:
+        if n >= self.size:
+            return np.arange(self.size, dtype=np.int64)
+        self._index.set_ef(max(HNSW_EF_SEARCH, n))
+        labels, _ = self._index.knn_query(query.reshape(1, -1), k=n)
+        return labels[0].astype(np.int64)
+
+
+def build_service_index(matrix: np.ndarray, backend: str = SERVICE_INDEX_BACKEND):
+    """Nearest-neighbor index over the service matrix; falls back to brute force."""
+    if backend == "hnsw" and matrix.size:
+        try:
+            return HnswServiceIndex(matrix)
+        except Exception as e:
+            from utils.db_tools import log_to_db
+
+            log_to_db("ERROR", "HNSW service index unavailable, using brute force", {
+                "sender_id": None,
+                "error": str(e),
+            })
+    return BruteForceServiceIndex(matrix)
@@ -0,0 +1,46 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# Brute force is cheaper than a tree query below this many locations
+SPATIAL_INDEX_MIN_LOCATIONS = 256
+
+# Slack added to radius queries so rounding in the tree's haversine never
+# drops a location that the exact distance keeps
+RADIUS_SLACK_KM = 1e-6
+
+
+class LocationIndex:
+    """
+    BallTree (haversine metric) over partner location coordinates.
+
+    Rows are positions in the arrays it was built from (RankingEngine.loc_lat /
+    loc_lon), so callers map them back to partners themselves.
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray):
+        from sklearn.neighbors import BallTree
+
+        self.size = len(lat)
+        points = np.radians(np.column_stack([lat, lon]).astype(np.float64))
+        self._tree = BallTree(points, metric="haversine")
+
+    @staticmethod
+    def _query_point(lat: float, lon: float) -> np.ndarray:
+        return np.radians(np.array([[lat, lon]], dtype=np.float64))
+
+    def within_radius(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Rows of every location within radius_km of (lat, lon), unordered."""
+        if self.size == 0:
+            return np.zeros(0, dtype=np.int64)
+        radius = (radius_km + RADIUS_SLACK_KM) / EARTH_RADIUS_KM
+        rows = self._tree.query_radius(self._query_point(lat, lon), r=radius)[0]
+        return rows.astype(np.int64)
+
+    def nearest(self, lat: float, lon: float, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """The k nearest locations as (rows, distance_km), closest first."""
+        k = min(k, self.size)
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        distance, rows = self._tree.query(self._query_point(lat, lon), k=k, sort_results=True)
+        return rows[0].astype(np.int64), distance[0] * EARTH_RADIUS_KM
@@ -0,0 +1,139 @@
+import asyncio
+import os
+
+import numpy as np
+
+from utils.embedding_cache import embed_texts, normalize_chunk
+from utils.embedding_service import get_embedding_service
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+
+# Embed each symptom as it is saved and keep a running sum on the conversation,
+# so the referral only encodes the LLM-extracted chunks. "false" restores the
+# old query (joined symptom string + extracted chunks, all encoded at referral).
+INCREMENTAL_SYMPTOM_EMBEDDINGS = os.getenv("INCREMENTAL_SYMPTOM_EMBEDDINGS", "true").lower() in ("1", "true", "yes")
+
+# Conversation field holding {"model", "chunks", "sum" (float32 bytes), "count"}
+SYMPTOM_EMBEDDING_FIELD = "symptom_embedding"
+
+
+def symptom_texts(symptoms: list[str]) -> dict[str, str]:
+    """Normalized chunk -> first spelling of it, in first-seen order."""
+    texts: dict[str, str] = {}
+    for symptom in symptoms or []:
+        chunk = normalize_chunk(symptom) if symptom else ""
+        if chunk:
+            texts.setdefault(chunk, str(symptom).strip())
+    return texts
+
+
+def symptom_chunks(symptoms: list[str]) -> list[str]:
+    """Distinct normalized symptom chunks, in first-seen order."""
+    return list(symptom_texts(symptoms))
+
+
+async def add_symptom_embeddings(sender_id: str, symptoms: list[str]) -> None:
+    """
+    Fold the embeddings of symptoms not yet on the conversation into its
+    running sum. Each chunk is encoded once (through the embedding cache),
+    while the conversation is still going.
+    """
+    from utils.db_tools import ongoing_conversations
+
+    encoder = get_embedding_service()
+    model_key = encoder.model_key
+    doc = ongoing_conversations.find_one({"sender_id": sender_id}, {SYMPTOM_EMBEDDING_FIELD: 1}) or {}
+    state = doc.get(SYMPTOM_EMBEDDING_FIELD) or {}
+    if state.get("model") != model_key:
+        # Vectors from another encoder cannot be mixed in: start over
+        state = {}
+
+    texts = symptom_texts(symptoms)
+    current = list(texts)
+    known = list(state.get("chunks") or [])
+    if not set(known) <= set(current):
+        # The symptom list was replaced, not extended: rebuild from scratch
+        state, known = {}, []
+    known_set = set(known)
+    new_chunks = [c for c in current if c not in known_set]
+    if not new_chunks:
+        return
+
+    vectors = await embed_texts([texts[c] for c in new_chunks], model_key, encoder.encode)
+    total = sum_vectors(vectors)
+    if state.get("sum") is not None:
+        total = sum_vectors(np.stack([_decode_sum(state["sum"]), total]))
+
+    ongoing_conversations.update_one(
+        {"sender_id": sender_id},
+        {"$set": {SYMPTOM_EMBEDDING_FIELD: {
+            "model": model_key,
+            "chunks": known + new_chunks,
+            "sum": total.tobytes(),
+            "count": len(known) + len(new_chunks),
+        }}},
+    )
+
+
+def sum_vectors(vectors: np.ndarray) -> np.ndarray:
+    """Row sum, accumulated in float64 and stored as float32 (the only sum format)."""
+    return vectors.astype(np.float64).sum(axis=0).astype(np.float32)
+
+
+def _decode_sum(raw) -> np.ndarray:
+    return np.frombuffer(bytes(raw), dtype=np.float32)
+
+
+async def embed_symptom_sum(symptoms: list[str]) -> tuple[np.ndarray, int] | None:
+    """
+    (sum, count) over the distinct symptoms, built the same way as the stored
+    one: for referrals that run before the background task has caught up.
+    """
+    texts = symptom_texts(symptoms)
+    if not texts:
+        return None
+    encoder = get_embedding_service()
+    vectors = await embed_texts(list(texts.values()), encoder.model_key, encoder.encode)
+    return sum_vectors(vectors), len(texts)
+
+
+# Keeps scheduled tasks referenced until they finish
+_pending: set[asyncio.Task] = set()
+
+
+def schedule_symptom_embeddings(sender_id: str, symptoms: list[str]) -> None:
+    """Run add_symptom_embeddings as a background task; errors are logged."""
+
+    async def _run():
+        from utils.db_tools import log_to_db
+
+        try:
+            await add_symptom_embeddings(sender_id, list(symptoms))
+        except Exception as e:
+            log_to_db("ERROR", "Error embedding conversation symptoms", {
+                "sender_id": sender_id,
+                "error": str(e),
+            })
+
+    task = asyncio.get_running_loop().create_task(_run())
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+def stored_symptom_embedding(conversation: dict | None, symptoms: list[str]) -> tuple[np.ndarray, int] | None:
+    """
+    (sum, count) of the conversation's symptom embeddings, or None when they
+    are missing, from another model or do not cover exactly these symptoms.
+    """
+    if not INCREMENTAL_SYMPTOM_EMBEDDINGS or not conversation:
+        return None
+    state = conversation.get(SYMPTOM_EMBEDDING_FIELD) or {}
+    if not state.get("count") or state.get("sum") is None:
+        return None
+    if state.get("model") != get_embedding_service().model_key:
+        return None
+    if set(state.get("chunks") or []) != set(symptom_chunks(symptoms)):
+        return None
+    return _decode_sum(state["sum"]), int(state["count"])
@@ -17,11 +17,18 @@ async def request_symptoms(sender_id):
 
 async def update_conversation_symptoms(sender_id, symptoms):
     from utils.db_tools import ongoing_conversations
+    from utils.symptom_embeddings import INCREMENTAL_SYMPTOM_EMBEDDINGS, schedule_symptom_embeddings
+
     ongoing_conversations.update_one(
         {"sender_id": sender_id},
         {"$set": {"symptoms": symptoms}}
     )
 
+    # Embed the new symptoms in the background (off the reply path) so a later
+    # referral only reads the running mean
+    if INCREMENTAL_SYMPTOM_EMBEDDINGS:
+        schedule_symptom_embeddings(sender_id, symptoms)
+
 async def update_patient_symptoms(sender_id, conversation, symptoms):
     try:
         current_location = conversation.get("location")
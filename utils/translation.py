@@ -1,9 +1,32 @@
 import os
+import re
+import json
+import time
+from datetime import datetime
 from groq import AsyncGroq
-from utils.db_tools import log_to_db, get_conversation
+from utils.db_tools import log_to_db, ongoing_conversations, translation_templates
+from utils.context import get_conversation_context
 
 groq_client = AsyncGroq()
 
+# Placeholders look like {address} or {km}; they are never sent through the
+# translator as values, only as opaque tokens that must survive unchanged.
+PLACEHOLDER_PATTERN = re.compile(r"\{([a-zA-Z_][a-zA-Z0-9_]*)\}")
+
+# (language, template) -> translated template
+_template_cache: dict[tuple[str, str], str] = {}
+
+# A translation rejected by the checks below is not retried for this long;
+# the original template is served meanwhile
+TEMPLATE_REJECTION_TTL_SECONDS = float(os.getenv("TEMPLATE_REJECTION_TTL_SECONDS", "600"))
+
+# (language, template) -> monotonic time until which the rejection stands.
+# Entries outlive their TTL so a repeat rejection is not logged again.
+_rejected_templates: dict[tuple[str, str], float] = {}
+
+# (language, label) -> translated label; data values, kept out of translation_templates
+_label_cache: dict[tuple[str, str], str] = {}
+
 async def translate_message(message_text, target_language, sender_id=None):
     if not target_language or target_language.lower() in ['english', 'en']:
         return message_text
@@ -64,9 +87,146 @@ CRITICAL RULES:
         })
         return message_text
 
+def _placeholders(template):
+    return sorted(PLACEHOLDER_PATTERN.findall(template))
+
+def _language_key(language):
+    return language.strip().lower()
+
+def render_template(template, values):
+    """Fill {placeholders} locally; values are inserted verbatim (never translated)."""
+    return PLACEHOLDER_PATTERN.sub(lambda m: str(values.get(m.group(1), m.group(0))), template)
+
+async def translate_template(template, target_language, sender_id=None):
+    """
+    Translate a message template once per language and cache it.
+    The {placeholders} are kept intact so the values (addresses, distances,
+    names) can be filled in locally afterwards.
+    """
+    if not target_language or target_language.lower() in ['english', 'en']:
+        return template
+
+    cache_key = (_language_key(target_language), template)
+    cached = _template_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    if _rejected_templates.get(cache_key, 0) > time.monotonic():
+        return template
+
+    try:
+        stored = translation_templates.find_one(
+            {"language": cache_key[0], "template": template},
+            {"translated": 1}
+        )
+        if stored and stored.get("translated"):
+            _template_cache[cache_key] = stored["translated"]
+            return stored["translated"]
+    except Exception as e:
+        log_to_db("ERROR", "Error reading translation template cache", {
+            "sender_id": sender_id,
+            "target_language": target_language,
+            "error": str(e)
+        })
+
+    try:
+        completion = await groq_client.chat.completions.create(
+            model="openai/gpt-oss-120b",
+            messages=[
+                {
+                    "role": "system",
+                    "content": f"""You are a professional medical translator. Your task is to translate the COMPLETE message template to {target_language}.
+
+The template contains placeholders written between curly braces, for example {{address}} or {{km}}.
+
+EXAMPLE OF CORRECT TRANSLATION:
+Input: "I found this location: {{address}}. Is this correct? Please reply with 'yes' or 'no'."
+Output (if target is Spanish): "Encontré esta ubicación: {{address}}. ¿Es correcto? Por favor responde con 'sí' o 'no'."
+
+CRITICAL RULES:
+- Copy every placeholder EXACTLY as written, including the curly braces - never translate, rename, remove or add placeholders
+- Translate the ENTIRE template - never shorten, summarize, or respond to it
+- Maintain the exact meaning and tone of the entire message
+- Keep medical terminology accurate
+- Preserve ALL formatting (line breaks, punctuation, emojis, *bold* and _italic_ markers)
+- Return ONLY the FULL translated template, no additional commentary or responses
+- If the template is already completely in {target_language}, return it COMPLETELY unchanged"""
+                },
+                {
+                    "role": "user",
+                    "content": template
+                }
+            ],
+            temperature=0,
+            top_p=1,
+            stream=False
+        )
+
+        translated = completion.choices[0].message.content.strip()
+
+    except Exception as e:
+        log_to_db("ERROR", "Template translation failed", {
+            "sender_id": sender_id,
+            "target_language": target_language,
+            "error": str(e)
+        })
+        return template
+
+    if _placeholders(translated) != _placeholders(template) or len(translated) < len(template) * 0.3:
+        if cache_key not in _rejected_templates:
+            log_to_db("ERROR", "Translated template rejected, using original", {
+                "sender_id": sender_id,
+                "template": template,
+                "translated_template": translated,
+                "target_language": target_language,
+                "retry_after_s": TEMPLATE_REJECTION_TTL_SECONDS
+            })
+        _rejected_templates[cache_key] = time.monotonic() + TEMPLATE_REJECTION_TTL_SECONDS
+        return template
+
+    _template_cache[cache_key] = translated
+    _rejected_templates.pop(cache_key, None)
+    try:
+        translation_templates.update_one(
+            {"language": cache_key[0], "template": template},
+            {"$set": {"translated": translated, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+    except Exception as e:
+        log_to_db("ERROR", "Error saving translation template", {
+            "sender_id": sender_id,
+            "target_language": target_language,
+            "error": str(e)
+        })
+
+    return translated
+
+async def translate_label(label, target_language, sender_id=None):
+    """
+    Translate a short data value (e.g. a partner category) once per language
+    per process. Unlike translate_template it is never persisted: labels come
+    from partner records, not from the code, and must not pile up in
+    translation_templates.
+    """
+    if not label or not target_language or target_language.lower() in ['english', 'en']:
+        return label
+
+    cache_key = (_language_key(target_language), label)
+    cached = _label_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    translated = await translate_message(label, target_language, sender_id)
+    _label_cache[cache_key] = translated
+    return translated
+
 async def get_user_language(sender_id):
+    # Within a webhook turn the language is already loaded
+    context = get_conversation_context(sender_id)
+    if context is not None:
+        return context.get('language')
+
     try:
-        conversation = get_conversation(sender_id)
+        conversation = ongoing_conversations.find_one({"sender_id": sender_id}, {"language": 1})
         if conversation:
             return conversation.get('language')
         return None
@@ -77,9 +237,95 @@ async def get_user_language(sender_id):
         })
         return None
 
+async def translate_messages(messages, target_language, sender_id=None):
+    """
+    Translate several messages of the same turn in a single structured LLM call.
+    Falls back to one call per message if the batch answer does not line up.
+    """
+    if not messages or not target_language or target_language.lower() in ['english', 'en']:
+        return list(messages)
+
+    if len(messages) == 1:
+        return [await translate_message(messages[0], target_language, sender_id)]
+
+    try:
+        completion = await groq_client.chat.completions.create(
+            model="openai/gpt-oss-120b",
+            messages=[
+                {
+                    "role": "system",
+                    "content": f"""You are a professional medical translator. You receive a JSON object with a list of messages and must translate EACH COMPLETE message to {target_language}.
+
+CRITICAL RULES:
+- Return {{"translations": [...]}} with exactly one translation per input message, in the same order
+- Translate the ENTIRE message - never shorten, summarize, merge, or respond to it
+- Place names, addresses, and proper nouns should REMAIN in their original form
+- When a message asks for 'yes' or 'no', translate the WHOLE question - do NOT just reply 'yes' or 'no'
+- Keep medical terminology accurate
+- Preserve ALL formatting (line breaks, punctuation, emojis, etc.)
+- If a message is already completely in {target_language}, return it COMPLETELY unchanged"""
+                },
+                {
+                    "role": "user",
+                    "content": json.dumps({"messages": list(messages)}, ensure_ascii=False)
+                }
+            ],
+            temperature=0,
+            top_p=1,
+            stream=False,
+            response_format={
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "batch_translation",
+                    "strict": True,
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "translations": {"type": "array", "items": {"type": "string"}},
+                        },
+                        "required": ["translations"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+        )
+
+        data = json.loads(completion.choices[0].message.content)
+        translations = [str(t).strip() for t in data.get("translations", [])]
+
+        if len(translations) == len(messages):
+            return [
+                translated if len(translated) >= len(original) * 0.3 else original
+                for original, translated in zip(messages, translations)
+            ]
+
+        log_to_db("ERROR", "Batch translation returned wrong number of messages", {
+            "sender_id": sender_id,
+            "expected": len(messages),
+            "received": len(translations),
+            "target_language": target_language
+        })
+
+    except Exception as e:
+        log_to_db("ERROR", "Batch translation failed", {
+            "sender_id": sender_id,
+            "target_language": target_language,
+            "error": str(e)
+        })
+
+    return [await translate_message(m, target_language, sender_id) for m in messages]
+
 async def send_translated_message(sender_id, message_text, force_language=None):
+    from utils.outbound import get_current_turn
     from utils.whatsapp import send_text_message
-    
+
+    # Inside a conversation turn the translation is deferred to the turn flush,
+    # where all pending messages are translated together.
+    turn = get_current_turn(sender_id)
+    if turn is not None:
+        turn.add_text(message_text, translate=True, force_language=force_language)
+        return None
+
     target_language = force_language or await get_user_language(sender_id)
     
     if target_language and target_language.lower() not in ['english', 'en']:
@@ -96,4 +342,13 @@ async def send_translated_message(sender_id, message_text, force_language=None):
         })
         translated_message = message_text
     
-    return await send_text_message(sender_id, translated_message)
\ No newline at end of file
+    return await send_text_message(sender_id, translated_message)
+
+async def send_translated_template(sender_id, template, force_language=None, **values):
+    """Send a template translated from the per-language cache and filled in locally."""
+    from utils.whatsapp import send_text_message
+
+    target_language = force_language or await get_user_language(sender_id)
+    localized = await translate_template(template, target_language, sender_id)
+
+    return await send_text_message(sender_id, render_template(localized, values))
\ No newline at end of file
@@ -1,6 +1,6 @@
 import os
-import httpx
 from utils.db_tools import log_to_db
+from utils.http_client import get_http_client
 
 ACCESS_TOKEN = os.environ.get("WHATSAPP_ACCESS_TOKEN")
 PHONE_NUMBER_ID = os.environ.get("PHONE_NUMBER_ID")
@@ -20,7 +20,10 @@ def _log_whatsapp_response(sender_id, message_type, resp):
         "response": resp.text
     })
 
-async def send_text_message(sender_id, message):
+LOCATION_REQUEST_MESSAGE = "To give you the best medical referrals, I need to know your location. Please share your location using the button below, or simply type the name of your city (e.g., 'Antigua Guatemala')."
+
+async def deliver_text_message(sender_id, message):
+    """POST a text message over the pooled client (no turn batching)."""
     payload = {
         "messaging_product": "whatsapp",
         "to": sender_id,
@@ -30,25 +33,15 @@ async def send_text_message(sender_id, message):
         }
     }
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(WHATSAPP_API_URL, headers=headers, json=payload)
-        _log_whatsapp_response(sender_id, "text", resp)
-        if resp.status_code == 200:
-            from utils.db_tools import log_bot_message
-            log_bot_message(sender_id, message, message_type="text")
-        return resp
+    resp = await get_http_client().post(WHATSAPP_API_URL, headers=headers, json=payload)
+    _log_whatsapp_response(sender_id, "text", resp)
+    if resp.status_code == 200:
+        from utils.db_tools import log_bot_message
+        log_bot_message(sender_id, message, message_type="text")
+    return resp
 
-async def send_initial_location_request(sender_id):
-    from utils.translation import get_user_language, translate_message
-    
-    default_message = "To give you the best medical referrals, I need to know your location. Please share your location using the button below, or simply type the name of your city (e.g., 'Antigua Guatemala')."
-    
-    user_language = await get_user_language(sender_id)
-    if user_language and user_language.lower() not in ['english', 'en']:
-        translated_message = await translate_message(default_message, user_language, sender_id)
-    else:
-        translated_message = default_message
-    
+async def deliver_location_request(sender_id, message):
+    """POST an interactive location request with an already-translated body."""
     payload = {
         "messaging_product": "whatsapp",
         "to": sender_id,
@@ -56,21 +49,49 @@ async def send_initial_location_request(sender_id):
         "interactive": {
             "type": "location_request_message",
             "body": {
-                "text": translated_message
+                "text": message
             },
             "action": {
                 "name": "send_location"
             }
         }
     }
-    
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(WHATSAPP_API_URL, headers=headers, json=payload)
-        _log_whatsapp_response(sender_id, "location_request", resp)
-        if resp.status_code == 200:
-            from utils.db_tools import log_bot_message
-            log_bot_message(sender_id, translated_message, message_type="location_request")
-        return resp
+
+    resp = await get_http_client().post(WHATSAPP_API_URL, headers=headers, json=payload)
+    _log_whatsapp_response(sender_id, "location_request", resp)
+    if resp.status_code == 200:
+        from utils.db_tools import log_bot_message
+        log_bot_message(sender_id, message, message_type="location_request")
+    return resp
+
+async def send_text_message(sender_id, message):
+    from utils.outbound import get_current_turn
+
+    # Inside a conversation turn the message is queued and sent in order when
+    # the turn is flushed; the text is final, so it is not translated again.
+    turn = get_current_turn(sender_id)
+    if turn is not None:
+        turn.add_text(message, translate=False)
+        return None
+
+    return await deliver_text_message(sender_id, message)
+
+async def send_initial_location_request(sender_id):
+    from utils.outbound import get_current_turn
+    from utils.translation import get_user_language, translate_message
+
+    turn = get_current_turn(sender_id)
+    if turn is not None:
+        turn.add_location_request(LOCATION_REQUEST_MESSAGE)
+        return None
+
+    user_language = await get_user_language(sender_id)
+    if user_language and user_language.lower() not in ['english', 'en']:
+        translated_message = await translate_message(LOCATION_REQUEST_MESSAGE, user_language, sender_id)
+    else:
+        translated_message = LOCATION_REQUEST_MESSAGE
+
+    return await deliver_location_request(sender_id, translated_message)
 
 async def echo_message(message): 
     sender_id = message["from"]
@@ -82,10 +103,9 @@ async def echo_message(message):
             "body": message.get("text", {}).get("body", "")
         }
     }
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(WHATSAPP_API_URL, headers=headers, json=payload)
-        _log_whatsapp_response(sender_id, "echo", resp)
-        return resp
+    resp = await get_http_client().post(WHATSAPP_API_URL, headers=headers, json=payload)
+    _log_whatsapp_response(sender_id, "echo", resp)
+    return resp
 
 async def send_template_message(recipient_number, template_name, parameters, language_code="es"):
     """
@@ -120,10 +140,9 @@ async def send_template_message(recipient_number, template_name, parameters, lan
             }
         }
         
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(WHATSAPP_API_URL, headers=headers, json=payload)
-            _log_whatsapp_response(recipient_number, f"template:{template_name}", resp)
-            return resp
+        resp = await get_http_client().post(WHATSAPP_API_URL, headers=headers, json=payload)
+        _log_whatsapp_response(recipient_number, f"template:{template_name}", resp)
+        return resp
             
     except Exception as e:
         log_to_db("ERROR", "Error sending template message", {